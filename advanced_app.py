@@ -1,24 +1,33 @@
 import streamlit as st
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-import json
 from datetime import datetime
-import base64
-from PIL import Image
-import io
+from app_config import (
+    get_openai_client, get_response_cache, get_session_store,
+    current_owner, current_session, start_new_session, chat_window, render_message_page, HISTORY_PAGE_SIZE,
+    start_metrics_endpoint, render_metrics_panel, start_rerun_timer, record_rerun,
+    get_model_router, AUTO_MODEL, get_request_coalescer, get_generation_registry,
+    get_chat_pipeline, get_request_hedger, HEDGE_OFF, HEDGE_SAME_MODEL, hedge_model_for,
+)
+from stream_renderer import StreamRenderer
+from conversation_journal import ConversationJournal
+from image_preprocess import preprocess_image, describe as describe_image
+from upload_registry import UploadRegistry, content_hash
+from document_index import build_index
+from batch_analyzer import analyze_images
 
-# 환경 변수 로드
-load_dotenv()
+# 스크립트 실행 시간 측정 시작 (Streamlit은 상호작용마다 스크립트 전체를 다시 실행)
+rerun_started = start_rerun_timer()
 
-# API 키 설정 (환경 변수에서 로드하거나 직접 설정)
-api_key = os.getenv("OPENAI_API_KEY")
+# 공유 객체는 프로세스당 한 번만 만들어 모든 세션과 재실행이 함께 사용
+client = get_openai_client()
+response_cache = get_response_cache()
+session_store = get_session_store()
+model_router = get_model_router()
+request_coalescer = get_request_coalescer()
+generations = get_generation_registry()
+request_hedger = get_request_hedger()
+chat_pipeline = get_chat_pipeline()
+start_metrics_endpoint()
 
-# OpenAI 클라이언트 초기화 (API 키가 없으면 None으로 설정)
-if api_key:
-    client = OpenAI(api_key=api_key)
-else:
-    client = None
 
 # 페이지 설정
 st.set_page_config(
@@ -27,72 +36,70 @@ st.set_page_config(
     layout="wide"
 )
 
-# 세션 상태 초기화
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+DEFAULT_SYSTEM_PROMPT = "당신은 도움이 되는 AI 어시스턴트입니다."
 
-if "conversation_history" not in st.session_state:
-    st.session_state.conversation_history = []
+# 대화 세션 (대화 내용은 세션 저장소에 있고, URL의 sid로 새로고침해도 이어짐)
+session = current_session(DEFAULT_SYSTEM_PROMPT)
 
-if "system_prompt" not in st.session_state:
-    st.session_state.system_prompt = "당신은 도움이 되는 AI 어시스턴트입니다."
+# 세션 상태 초기화
+if "upload_registry" not in st.session_state:
+    st.session_state.upload_registry = UploadRegistry()
+
+if st.session_state.get("session_id") != session.session_id:
+    # 다른 대화로 바뀌면 이 대화에 속한 화면 상태를 새로 시작
+    st.session_state.session_id = session.session_id
+    st.session_state.journal = ConversationJournal(session.session_id)
+    st.session_state.history_pages = 0
+    st.session_state.upload_registry.reset_inserted()
+    st.session_state.documents = {}
 
 # 파일 업로드 처리 함수
-def process_uploaded_file(uploaded_file):
-    """업로드된 파일을 처리하고 내용을 반환합니다."""
+def process_uploaded_file(uploaded_file, data):
+    """업로드된 파일을 처리하고 대화에 넣을 내용과 문서 색인/전처리된 이미지를 반환합니다."""
+    result = {"content": None, "image": None, "document": None}
     try:
         if uploaded_file.type == "text/plain":
-            content = uploaded_file.read().decode("utf-8")
-            return f"업로드된 텍스트 파일 내용:\n\n{content}"
+            # 전체 내용을 대화에 넣지 않고 조각 단위로 읽어 검색 색인을 만듦
+            uploaded_file.seek(0)
+            index = build_index(uploaded_file, content_hash(data), uploaded_file.name)
+            result["document"] = index
+            result["content"] = (
+                f"텍스트 파일 '{uploaded_file.name}'을 업로드했습니다. "
+                f"({len(index)}개 구절로 색인되었으며, 질문과 관련된 부분이 함께 전달됩니다.)"
+            )
         elif uploaded_file.type.startswith("image/"):
-            # 이미지를 base64로 인코딩
-            image = Image.open(uploaded_file)
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            return f"이미지가 업로드되었습니다. 이미지 분석을 요청해주세요."
+            # 이미지를 모델이 사용하는 해상도로 줄이고 다시 인코딩
+            result["image"] = preprocess_image(data)
+            result["content"] = "이미지가 업로드되었습니다. 이미지 분석을 요청해주세요."
         else:
-            return f"지원되지 않는 파일 형식입니다: {uploaded_file.type}"
+            result["content"] = f"지원되지 않는 파일 형식입니다: {uploaded_file.type}"
     except Exception as e:
-        return f"파일 처리 중 오류가 발생했습니다: {str(e)}"
+        result["content"] = f"파일 처리 중 오류가 발생했습니다: {str(e)}"
+    return result
 
 # 이미지 분석 함수
-def analyze_image(image_data, prompt):
+def analyze_image(image_data, prompt, mime_type="image/jpeg"):
     """이미지를 분석하는 함수"""
     try:
         if client is None:
             return "OpenAI API 키가 설정되지 않아 이미지 분석을 할 수 없습니다."
         
-        response = client.chat.completions.create(
-            model="gpt-4-vision-preview",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_data}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+        # 이미지 단계 모델 중 상태가 좋은 모델로 요청
+        return chat_pipeline.analyze_image(image_data, prompt, mime_type)["ai_response"]
     except Exception as e:
         return f"이미지 분석 중 오류가 발생했습니다: {str(e)}"
 
+# 직접 고를 수 있는 모델 (헤지 요청의 두 번째 모델로도 사용)
+MODEL_OPTIONS = ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo", "gpt-4", "gpt-4-turbo-preview"]
+
 # 사이드바 설정
 with st.sidebar:
     st.title("🤖 고급 AI 설정")
     
-    # AI 모델 선택
+    # AI 모델 선택 (자동이면 요청마다 질문 길이/첨부 파일/시스템 프롬프트를 보고 고름)
     model = st.selectbox(
         "AI 모델 선택",
-        ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo-preview"],
+        [AUTO_MODEL] + MODEL_OPTIONS,
         index=0
     )
     
@@ -106,16 +113,24 @@ with st.sidebar:
         help="높을수록 더 창의적인 응답을 생성합니다"
     )
     
+    # 첫 토큰이 최근 p95보다 늦으면 같은 요청을 한 번 더 보내고 먼저 응답한 쪽을 씀
+    hedge_choice = st.selectbox(
+        "느린 응답 대비 (헤지 요청)",
+        [HEDGE_OFF, HEDGE_SAME_MODEL] + MODEL_OPTIONS,
+        index=0,
+        help="첫 토큰이 평소보다 늦으면 같은 요청을 선택한 모델로 한 번 더 보냅니다. 먼저 응답한 쪽을 쓰고 다른 쪽은 닫습니다."
+    )
+    
     # 시스템 프롬프트 설정
     st.subheader("시스템 프롬프트 설정")
     system_prompt = st.text_area(
         "AI의 역할과 행동을 정의하세요",
-        value=st.session_state.system_prompt,
+        value=session.system_prompt or DEFAULT_SYSTEM_PROMPT,
         height=150
     )
     
     if st.button("시스템 프롬프트 적용"):
-        st.session_state.system_prompt = system_prompt
+        session_store.update_session(session, system_prompt=system_prompt)
         st.success("시스템 프롬프트가 적용되었습니다!")
     
     # 파일 업로드
@@ -127,40 +142,86 @@ with st.sidebar:
     )
     
     if uploaded_file is not None:
-        file_content = process_uploaded_file(uploaded_file)
-        st.session_state.messages.append({"role": "user", "content": file_content})
-        st.success("파일이 업로드되었습니다!")
+        # 같은 내용의 파일은 한 번만 처리하고 대화에도 한 번만 추가
+        upload_registry = st.session_state.upload_registry
+        upload_key, upload = upload_registry.register(
+            uploaded_file.getvalue(),
+            lambda data: process_uploaded_file(uploaded_file, data)
+        )
+        if upload["image"] is not None:
+            st.caption(f"이미지 전처리: {describe_image(upload['image'])}")
+        if upload_registry.claim_insert(upload_key):
+            # 파일 내용은 대화 기록에 넣지 않음 (문서는 요청을 조립할 때 고정 구간이나 참고 구절로 들어감)
+            if upload["document"] is not None:
+                st.session_state.documents[upload_key] = upload["document"]
+            st.success("파일이 업로드되었습니다!")
+            st.caption(upload["content"])
+    
+    for document in st.session_state.documents.values():
+        st.caption(f"📄 {document.name}: {len(document)}개 구절 색인됨")
+    
+    # 마지막 요청의 토큰 사용량
+    history_state = session.state
+    if "last_request_tokens" in history_state:
+        st.caption(
+            f"마지막 요청 토큰: {history_state['last_request_tokens']:,} / "
+            f"{history_state['last_budget']:,}"
+            + (" (이전 대화 요약 포함)" if history_state.get("summary") else "")
+        )
+        if history_state.get("omitted_count"):
+            st.caption(f"⚠️ 예산을 넘어 이번 요청에서 뺀 이전 메시지: {history_state['omitted_count']}개")
+        if history_state.get("summary_error"):
+            st.caption(f"⚠️ 이전 대화 요약 실패 (다음 턴에 다시 시도): {history_state['summary_error']}")
     
     # 대화 초기화
     if st.button("대화 초기화"):
-        st.session_state.messages = []
-        st.session_state.conversation_history = []
+        generations.cancel(session.session_id, "대화 초기화")
+        start_new_session(DEFAULT_SYSTEM_PROMPT)
         st.rerun()
     
-    # 대화 내보내기
+    # 대화 내보내기 (대화는 턴마다 저널 파일에 자동으로 덧붙여 저장됨)
     if st.button("대화 내보내기"):
-        if st.session_state.conversation_history:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"conversation_{timestamp}.json"
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(st.session_state.conversation_history, f, ensure_ascii=False, indent=2)
-            
-            st.success(f"대화가 {filename}에 저장되었습니다!")
+        if session.message_count:
+            st.success(f"대화가 {st.session_state.journal.path}에 자동으로 저장되고 있습니다!")
+    
+    # 이전 대화 불러오기 (세션 저장소의 다른 세션으로 전환)
+    with st.expander("📂 이전 대화 불러오기"):
+        past_sessions = {
+            session_id: f"{datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M} · 메시지 {count}개"
+            for session_id, count, updated_at in session_store.list_sessions(current_owner())
+            if session_id != session.session_id
+        }
+        if past_sessions:
+            selected_session = st.selectbox(
+                "저장된 대화", list(past_sessions), format_func=past_sessions.get
+            )
+            if st.button("불러오기"):
+                st.query_params["sid"] = selected_session
+                st.rerun()
+        else:
+            st.caption("저장된 이전 대화가 없습니다.")
+        st.caption("이 주소(owner)로 만든 대화만 표시됩니다.")
 
 # 메인 화면
 st.title("🤖 고급 개인 AI 어시스턴트")
 st.markdown("---")
 
-# 채팅 인터페이스
-for message in st.session_state.messages:
+# 채팅 인터페이스 (최근 메시지만 말풍선으로 그리고, 이전 메시지는 요청할 때 페이지 단위로 표시)
+earlier_start, window_start = chat_window(session, st.session_state.history_pages)
+if earlier_start > 0 and st.button(f"⬆️ 이전 메시지 더 보기 ({earlier_start}개)"):
+    st.session_state.history_pages += 1
+    st.rerun()
+for page_start in range(earlier_start, window_start, HISTORY_PAGE_SIZE):
+    # 페이지마다 캐시된 마크다운 하나로 그려서 대화가 길어져도 다시 그리는 비용이 늘지 않음
+    with st.container(border=True):
+        st.caption(f"메시지 {page_start + 1}–{page_start + HISTORY_PAGE_SIZE}")
+        st.markdown(render_message_page(session.session_id, page_start, page_start + HISTORY_PAGE_SIZE))
+for message in session_store.messages_from(session, window_start):
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
 # 사용자 입력
 if prompt := st.chat_input("메시지를 입력하세요..."):
-    # 사용자 메시지 추가
-    st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
     
@@ -168,8 +229,16 @@ if prompt := st.chat_input("메시지를 입력하세요..."):
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
         
+        # 생성 중에만 보이는 중지 버튼 (누르면 스크립트가 다시 실행되면서 스트림을 바로 닫음)
+        stop_slot = st.empty()
+        stop_slot.button(
+            "⏹ 생성 중지", key="stop_generation",
+            on_click=generations.cancel, args=(session.session_id, "중지 버튼")
+        )
+        
         try:
             if client is None:
+                stop_slot.empty()
                 st.error("OpenAI API 키가 설정되지 않았습니다.")
                 st.info("""
                 API 키를 설정하는 방법:
@@ -177,77 +246,208 @@ if prompt := st.chat_input("메시지를 입력하세요..."):
                 2. 또는 환경 변수 OPENAI_API_KEY를 설정하세요
                 """)
             else:
-                # OpenAI API 호출
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": m["role"], "content": m["content"]} 
-                        for m in st.session_state.messages
-                    ],
-                    temperature=temperature,
-                    stream=True
+                # 질문을 저장하고 모델 선택 → 이전 대화 정리 → 요청 조립까지 준비
+                # (같은 대화에서 아직 진행 중인 이전 생성은 취소됨)
+                # 시스템 프롬프트 → 고정 문서 → 이전 대화 → 참고 구절 → 질문 순서로 조립해서
+                # 앞부분이 매 턴 같도록 함 (공급자의 프롬프트 캐시가 앞부분을 재사용)
+                turn = chat_pipeline.start_turn(
+                    session, prompt,
+                    documents=st.session_state.documents.values(),
+                    model=None if model == AUTO_MODEL else model,
+                    temperature=temperature
                 )
+                st.session_state.last_route = turn.route.describe()
+                st.session_state.last_prompt = turn.assembled.describe()
                 
-                full_response = ""
-                for chunk in response:
-                    if chunk.choices[0].delta.content:
-                        full_response += chunk.choices[0].delta.content
-                        message_placeholder.markdown(full_response + "▌")
+                # 응답 조각을 모아서 일정 간격으로만 다시 그림 (첫 토큰 시간 측정 시작)
+                renderer = StreamRenderer(message_placeholder)
                 
-                message_placeholder.markdown(full_response)
+                def show_retry(attempt, delay, error):
+                    message_placeholder.markdown(
+                        f"⏳ 요청이 지연되어 {delay:.1f}초 후 다시 시도합니다... ({attempt}회째)"
+                    )
                 
-                # AI 응답을 세션에 추가
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
+                # 캐시된 응답을 재생하거나, 다른 세션이 스트리밍 중인 같은 요청에 붙거나, API를 호출
+                # (헤지 요청을 켜면 첫 토큰이 늦을 때 같은 요청을 한 번 더 보내고 먼저 응답한 쪽을 씀)
+                stream = chat_pipeline.open_stream(
+                    turn, on_retry=show_retry, hedge_model=hedge_model_for(hedge_choice)
+                )
+                st.session_state.last_hedge = turn.hedge
                 
-                # 대화 기록에 추가
-                st.session_state.conversation_history.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "user_message": prompt,
-                    "ai_response": full_response,
-                    "model": model,
-                    "temperature": temperature,
-                    "system_prompt": st.session_state.system_prompt
-                })
+                try:
+                    full_response = renderer.render(stream)
+                except Exception as e:
+                    chat_pipeline.fail(turn, e)
+                    raise
+                except BaseException:
+                    # 중지 버튼, 새 입력, 설정 변경 등으로 Streamlit이 스크립트를 중단함
+                    # 받은 데까지는 대화에 남김 (화면을 그리는 st 함수는 쓰지 않음)
+                    record = chat_pipeline.cancel(turn, "화면이 다시 실행됨", renderer.text, renderer.stats())
+                    st.session_state.last_cancel = turn.cancel_stats
+                    chat_pipeline.save_turn(session, record, st.session_state.journal)
+                    raise
+                stop_slot.empty()
+                stream_stats = renderer.stats()
+                st.session_state.last_stream_stats = stream_stats
+                
+                record = chat_pipeline.complete(turn, full_response, stream_stats)
+                if record["cancelled"]:
+                    # 다른 실행(같은 대화의 새 요청, 대화 초기화)이 이 생성을 취소함
+                    st.session_state.last_cancel = turn.cancel_stats
+                    st.caption(f"⏹ 생성이 중단되었습니다 ({record['cancelled']})")
+                else:
+                    st.session_state.last_route = turn.route.describe()
+                chat_pipeline.save_turn(session, record, st.session_state.journal)
                 
         except Exception as e:
+            stop_slot.empty()
             st.error(f"오류가 발생했습니다: {str(e)}")
             st.info("OpenAI API 키가 올바르게 설정되었는지 확인해주세요.")
 
+# 응답 캐시/스트리밍 통계 (이번 요청까지 반영되도록 응답 처리 뒤에 표시)
+with st.sidebar:
+    st.caption(f"응답 캐시: 적중 {response_cache.hits}회 / 미스 {response_cache.misses}회")
+    st.caption(
+        f"같은 요청 합치기: 진행 중 {len(request_coalescer.in_flight())}건 · "
+        f"API 호출 {request_coalescer.started}회 / 함께 받음 {request_coalescer.joined}회"
+    )
+    st.caption(
+        f"세션 저장소: 메모리에 {session_store.cached_sessions()}개 세션 "
+        f"(적중 {session_store.hits}회 / 미스 {session_store.misses}회)"
+    )
+    last_stats = st.session_state.get("last_stream_stats")
+    if last_stats and last_stats["time_to_first_token"] is not None:
+        st.caption(
+            f"마지막 응답: 첫 토큰 {last_stats['time_to_first_token']:.2f}초 · "
+            f"{last_stats['tokens_per_sec'] or 0:.1f} 토큰/초"
+        )
+    if "last_route" in st.session_state:
+        st.caption(f"🧭 모델 선택: {st.session_state.last_route}")
+    if "last_prompt" in st.session_state:
+        st.caption(f"🧩 요청 구성: {st.session_state.last_prompt}")
+    last_cancel = st.session_state.get("last_cancel")
+    if last_cancel:
+        st.caption(
+            f"⏹ 마지막 중단 ({last_cancel['reason']}): 받은 {last_cancel['generated_tokens']:,} 토큰 보존 · "
+            f"약 {last_cancel['saved_tokens']:,} 토큰 / {last_cancel['saved_seconds']:.1f}초 절약"
+        )
+    if generations.cancelled:
+        st.caption(
+            f"생성 중단 {generations.cancelled}회 누적: "
+            f"약 {generations.saved_tokens:,} 토큰 / {generations.saved_seconds:.0f}초 절약"
+        )
+    last_hedge = st.session_state.get("last_hedge")
+    if last_hedge and last_hedge["hedged"]:
+        st.caption(
+            f"🏁 마지막 헤지: {last_hedge['delay']:.1f}초 뒤 한 번 더 보냄 → "
+            f"{'두 번째' if last_hedge['winner'] == 'hedge' else '첫'} 요청({last_hedge['model']})이 먼저 응답"
+        )
+    hedge_stats = request_hedger.stats()
+    if hedge_stats["requests"]:
+        st.caption(
+            f"헤지 요청: {hedge_stats['requests']}건 중 {hedge_stats['hedged']}건 "
+            f"({hedge_stats['hedge_rate']:.0%}) · 두 번째가 이김 {hedge_stats['hedge_wins']}회 · "
+            f"첫 토큰 최소 {hedge_stats['saved_seconds']:.1f}초 단축"
+        )
+    for unhealthy_model, (remaining, reason) in model_router.health().items():
+        st.caption(f"⚠️ {unhealthy_model}: {reason} → {remaining:.0f}초 동안 다른 모델 우선")
+
 # 이미지 분석 섹션
 st.markdown("---")
 st.subheader("🖼️ 이미지 분석")
 
-# 이미지 업로드
-image_file = st.file_uploader(
-    "분석할 이미지를 업로드하세요",
-    type=["png", "jpg", "jpeg"],
-    key="image_analyzer"
+# 여러 이미지를 한 번에 분석하는 일괄 모드
+batch_mode = st.checkbox(
+    "여러 이미지 일괄 분석",
+    help="여러 이미지를 병렬로 전처리하고 분당 요청 수 제한 안에서 동시에 분석합니다."
 )
 
-if image_file is not None:
-    # 이미지 표시
-    image = Image.open(image_file)
-    st.image(image, caption="업로드된 이미지", use_column_width=True)
+if batch_mode:
+    batch_files = st.file_uploader(
+        "분석할 이미지들을 업로드하세요",
+        type=["png", "jpg", "jpeg"],
+        accept_multiple_files=True,
+        key="batch_image_analyzer"
+    )
     
-    # 이미지 분석 프롬프트
-    analysis_prompt = st.text_area(
+    batch_prompt = st.text_area(
         "이미지 분석 요청사항을 입력하세요",
         value="이 이미지에 대해 자세히 설명해주세요.",
-        height=100
+        height=100,
+        key="batch_analysis_prompt"
     )
     
-    if st.button("이미지 분석 시작"):
-        with st.spinner("이미지를 분석하고 있습니다..."):
-            # 이미지를 base64로 인코딩
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+    col1, col2 = st.columns(2)
+    with col1:
+        batch_workers = st.slider("동시 작업 수", min_value=1, max_value=8, value=4)
+    with col2:
+        batch_rpm = st.number_input("분당 최대 요청 수", min_value=1, max_value=500, value=30)
+    
+    if batch_files and st.button("일괄 분석 시작"):
+        if client is None:
+            st.error("OpenAI API 키가 설정되지 않아 이미지 분석을 할 수 없습니다.")
+        else:
+            progress = st.progress(0.0, text="이미지를 분석하고 있습니다...")
+            summary = {}
+            images = [(f.name, f.getvalue()) for f in batch_files]
+            results = analyze_images(
+                images,
+                lambda processed, on_retry: chat_pipeline.analyze_image(
+                    processed["base64"], batch_prompt, processed["mime_type"], on_retry
+                )["ai_response"],
+                max_workers=batch_workers,
+                requests_per_minute=batch_rpm,
+                summary=summary
+            )
             
-            # 이미지 분석
-            analysis_result = analyze_image(img_str, analysis_prompt)
+            # 끝나는 순서대로 결과 표시
+            for done, result in enumerate(results, 1):
+                progress.progress(done / len(images), text=f"{done}/{len(images)} 완료")
+                with st.expander(f"{'✅' if result['error'] is None else '❌'} {result['name']}"):
+                    if result["processed"] is not None:
+                        st.caption(f"이미지 전처리: {describe_image(result['processed'])}")
+                    if result["error"] is None:
+                        st.markdown(result["result"])
+                    else:
+                        st.error(f"이미지 분석 중 오류가 발생했습니다: {result['error']}")
             
-            st.markdown("### 분석 결과:")
-            st.markdown(analysis_result)
+            st.success(
+                f"{summary['images']}개 이미지를 {summary['seconds']:.1f}초 동안 분석했습니다 "
+                f"({summary['images_per_sec']:.2f}장/초, 실패 {summary['failed']}개, "
+                f"재시도 {summary['retries']}회)"
+            )
+else:
+    # 이미지 업로드
+    image_file = st.file_uploader(
+        "분석할 이미지를 업로드하세요",
+        type=["png", "jpg", "jpeg"],
+        key="image_analyzer"
+    )
+
+    if image_file is not None:
+        # 이미지 표시
+        st.image(image_file, caption="업로드된 이미지", use_column_width=True)
+        
+        # 이미지 분석 프롬프트
+        analysis_prompt = st.text_area(
+            "이미지 분석 요청사항을 입력하세요",
+            value="이 이미지에 대해 자세히 설명해주세요.",
+            height=100
+        )
+        
+        if st.button("이미지 분석 시작"):
+            with st.spinner("이미지를 분석하고 있습니다..."):
+                # 이미지를 모델이 사용하는 해상도로 줄이고 다시 인코딩
+                processed = preprocess_image(image_file.getvalue())
+                
+                # 이미지 분석
+                analysis_result = analyze_image(
+                    processed["base64"], analysis_prompt, processed["mime_type"]
+                )
+                
+                st.caption(f"이미지 전처리: {describe_image(processed)}")
+                st.markdown("### 분석 결과:")
+                st.markdown(analysis_result)
 
 # 하단 정보
 st.markdown("---")
@@ -256,19 +456,23 @@ st.markdown("""
 
 1. **시스템 프롬프트 설정**: AI의 역할과 행동을 커스터마이징
 2. **파일 업로드**: 텍스트 파일과 이미지 업로드 지원
-3. **이미지 분석**: GPT-4 Vision을 사용한 이미지 분석
-4. **대화 관리**: 대화 초기화 및 내보내기
+3. **이미지 분석**: 이미지를 이해하는 모델(기본 gpt-4o)을 사용한 이미지 분석
+4. **대화 관리**: 대화 초기화, 자동 저장 및 이전 대화 불러오기
 5. **실시간 스트리밍**: AI 응답 실시간 표시
 
 ### 📋 사용 팁:
 
 - 시스템 프롬프트로 AI의 전문 분야를 설정하세요
-- 이미지 분석은 GPT-4 Vision 모델을 사용합니다
-- 대화 내보내기로 중요한 대화를 보관하세요
+- 모델을 "자동"으로 두면 짧은 질문은 빠른 모델, 긴 질문이나 문서 참고는 표준 모델로 보냅니다
+- 대화는 자동으로 저장되므로 이전 대화를 언제든 불러올 수 있습니다
 - 파일 업로드로 문서나 이미지를 AI와 함께 분석하세요
 
 ### 설정 방법:
 1. `.env` 파일을 생성하고 `OPENAI_API_KEY=your_api_key_here`를 추가하세요
 2. `pip install -r requirements.txt`로 필요한 패키지를 설치하세요
 3. `streamlit run advanced_app.py`로 애플리케이션을 실행하세요
-""")
\ No newline at end of file
+""")
+
+# API 호출 지표와 이번 실행 시간
+render_metrics_panel()
+record_rerun(rerun_started)
@@ -0,0 +1,273 @@
+"""
+두 앱이 함께 쓰는 설정과 공유 객체
+
+Streamlit은 상호작용마다 스크립트를 처음부터 다시 실행하므로 .env 로드와
+클라이언트/대화 관리자/응답 캐시 생성은 st.cache_resource로 프로세스당 한 번만 합니다.
+"""
+
+import functools
+import os
+import time
+from collections import deque
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from chat_core import ChatPipeline
+from history_manager import HistoryManager, make_summarizer
+from generation_control import GenerationRegistry
+from image_preprocess import format_bytes
+from model_router import router_from_env
+from prompt_assembler import assembler_from_env
+from openai_client import get_client, create_chat_completion
+from request_coalescer import RequestCoalescer
+from request_hedger import hedger_from_env, SAME_MODEL
+from request_metrics import metrics, start_http_server, TIMINGS
+from response_cache import ResponseCache
+from session_store import SQLiteSessionStore, DEFAULT_STORE_PATH, new_session_id
+
+# 스크립트 실행 시간을 기억할 최근 실행 횟수
+RERUN_SAMPLES = 50
+
+# 채팅 화면에 말풍선으로 그릴 최근 메시지 수와 "이전 메시지 더 보기" 한 번에 추가할 메시지 수
+CHAT_WINDOW_MESSAGES = 20
+HISTORY_PAGE_SIZE = 20
+
+# 모델 선택 상자에서 라우터에 맡기는 항목
+AUTO_MODEL = "자동 (요청마다 선택)"
+
+# 헤지 요청 선택 상자의 항목 (나머지 항목은 두 번째 요청을 보낼 모델)
+HEDGE_OFF = "사용 안 함"
+HEDGE_SAME_MODEL = "같은 모델로 한 번 더"
+
+ROLE_LABELS = {"user": "🧑 사용자", "assistant": "🤖 AI"}
+
+# 사이드바 지표 표에 쓸 시간 항목 이름
+TIMING_LABELS = {
+    "queue_wait": "대기",
+    "time_to_first_token": "첫 토큰",
+    "stream_seconds": "스트리밍",
+    "total_seconds": "전체",
+}
+
+
+@st.cache_resource
+def load_config():
+    """환경 변수를 한 번만 읽어 설정을 반환합니다."""
+    load_dotenv()
+    return {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        # 여러 서버 프로세스가 대화를 공유하려면 같은 파일을 가리키도록 설정
+        "session_store_path": os.getenv("SESSION_STORE_PATH", DEFAULT_STORE_PATH),
+        # 설정하면 이 포트의 /metrics로 Prometheus 지표를 제공 (서버 프로세스마다 다른 포트)
+        "metrics_port": int(os.getenv("OPENAI_METRICS_PORT", "0")),
+    }
+
+
+@st.cache_resource
+def get_openai_client():
+    """연결 풀을 모든 세션이 공유하는 OpenAI 클라이언트 (API 키가 없으면 None)"""
+    return get_client(load_config()["api_key"])
+
+
+@st.cache_resource
+def get_history_manager():
+    """대화 기록 관리자 (토큰 예산을 넘는 이전 대화는 요약해서 전송)
+
+    세션별 상태는 호출할 때 넘기므로 모든 세션이 함께 사용해도 됩니다.
+    """
+    client = get_openai_client()
+    summarize_completion = functools.partial(create_chat_completion, call_kind="summary")
+    return HistoryManager(
+        summarizer=make_summarizer(summarize_completion) if client else None
+    )
+
+
+@st.cache_resource
+def get_response_cache():
+    """프로세스 전체에서 공유하는 응답 캐시를 반환합니다."""
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_prompt_assembler():
+    """요청 메시지 조립기 (구간별 토큰 수 기억을 모든 세션이 공유)"""
+    load_config()
+    return assembler_from_env()
+
+
+@st.cache_resource
+def get_request_coalescer():
+    """세션들이 보낸 같은 요청을 업스트림 스트림 하나로 합치는 객체"""
+    return RequestCoalescer()
+
+
+@st.cache_resource
+def get_generation_registry():
+    """대화 세션별로 진행 중인 응답 생성을 취소할 수 있게 관리하는 객체"""
+    return GenerationRegistry()
+
+
+@st.cache_resource
+def get_session_store():
+    """대화 세션 저장소 (최근 세션만 메모리에 두고 나머지는 디스크에서 읽음)"""
+    return SQLiteSessionStore(load_config()["session_store_path"])
+
+
+@st.cache_resource
+def get_model_router():
+    """요청마다 모델을 고르는 라우터 (모델별 오류/지연 상태를 모든 세션이 공유)"""
+    load_config()
+    return router_from_env()
+
+
+@st.cache_resource
+def get_request_hedger():
+    """첫 토큰이 늦는 요청을 한 번 더 보내는 헤지 실행기 (헤지 통계를 모든 세션이 공유)"""
+    load_config()
+    return hedger_from_env()
+
+
+def hedge_model_for(choice):
+    """헤지 요청 선택 상자의 항목을 ChatPipeline.open_stream의 hedge_model 값으로 바꿉니다."""
+    if choice == HEDGE_OFF:
+        return None
+    if choice == HEDGE_SAME_MODEL:
+        return SAME_MODEL
+    return choice
+
+
+@st.cache_resource
+def get_chat_pipeline():
+    """요청 준비부터 기록 저장까지 한 턴을 처리하는 파이프라인 (위의 공유 객체들로 구성)"""
+    return ChatPipeline(
+        history_manager=get_history_manager(),
+        model_router=get_model_router(),
+        request_coalescer=get_request_coalescer(),
+        prompt_assembler=get_prompt_assembler(),
+        generations=get_generation_registry(),
+        response_cache=get_response_cache(),
+        session_store=get_session_store(),
+        hedger=get_request_hedger(),
+    )
+
+
+def current_owner():
+    """URL의 owner 파라미터로 이 사용자를 구분하고, 없으면 새로 만들어 URL에 기록합니다.
+
+    이전 대화 목록은 같은 owner가 만든 세션만 보여 주므로, owner가 있는 주소를 아는 사람만 볼 수 있습니다.
+    """
+    owner = st.query_params.get("owner")
+    if not owner:
+        owner = new_session_id()
+        st.query_params["owner"] = owner
+    return owner
+
+
+def current_session(default_system_prompt=None):
+    """URL의 sid 파라미터로 세션을 찾고, 없으면 새로 만들어 URL에 기록합니다.
+
+    세션 ID가 URL에 있으므로 새로고침하거나 다른 서버 프로세스로 연결되어도 대화가 이어집니다.
+    """
+    session = get_session_store().get_session(st.query_params.get("sid"))
+    if session is None:
+        session = start_new_session(default_system_prompt)
+    return session
+
+
+def start_new_session(default_system_prompt=None):
+    """새 세션을 만들고 URL의 sid를 바꿉니다."""
+    session = get_session_store().create_session(default_system_prompt, owner=current_owner())
+    st.query_params["sid"] = session.session_id
+    return session
+
+
+def chat_window(session, pages):
+    """채팅 화면에 표시할 범위를 (이전 페이지 시작, 말풍선 창 시작)으로 반환합니다.
+
+    창 시작을 페이지 경계에 맞춰서, 창 밖의 이전 메시지는 항상 같은 페이지 단위로 묶이게 합니다.
+    그래야 대화가 길어져도 이전 페이지의 렌더링 캐시를 계속 재사용할 수 있습니다.
+    """
+    window_start = max(0, session.message_count - CHAT_WINDOW_MESSAGES)
+    window_start -= window_start % HISTORY_PAGE_SIZE
+    earlier_start = max(0, window_start - pages * HISTORY_PAGE_SIZE)
+    return earlier_start, window_start
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def render_message_page(session_id, start, end):
+    """이전 메시지 한 페이지를 마크다운 하나로 렌더링합니다.
+
+    저장된 메시지는 바뀌지 않으므로 결과를 캐시해도 안전합니다.
+    """
+    messages = get_session_store().load_messages(session_id, start, end)
+    return "\n\n---\n\n".join(
+        f"**{ROLE_LABELS.get(message['role'], message['role'])}**\n\n{message['content']}"
+        for message in messages
+    )
+
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """OPENAI_METRICS_PORT가 설정되어 있으면 지표 엔드포인트를 한 번만 시작합니다."""
+    port = load_config()["metrics_port"]
+    if not port:
+        return None
+    try:
+        return start_http_server(metrics, port)
+    except OSError:
+        # 다른 프로세스가 이미 사용 중인 포트
+        return None
+
+
+def render_metrics_panel():
+    """이 서버 프로세스의 최근 API 호출을 사이드바에 백분위로 요약합니다."""
+    summary = metrics.summary()
+    with st.sidebar.expander("📊 API 호출 지표"):
+        if not summary["calls"]:
+            st.caption("아직 기록된 호출이 없습니다.")
+            return
+        st.caption(
+            f"최근 {summary['calls']}회 · 오류 {summary['errors']}회 · "
+            f"취소 {summary['cancelled']}회 · 재시도 {summary['retries']}회"
+        )
+        st.caption(
+            f"토큰: 프롬프트 {summary['prompt_tokens']:,} (캐시 재사용 {summary['cached_prompt_tokens']:,}) / "
+            f"응답 {summary['completion_tokens']:,} · "
+            f"전송량: 요청 {format_bytes(summary['request_bytes'])} / "
+            f"응답 {format_bytes(summary['response_bytes'])}"
+        )
+
+        def cell(value):
+            return "-" if value is None else f"{value * 1000:,.0f}ms"
+
+        rows = ["| 항목 | p50 | p95 | p99 |", "|---|---:|---:|---:|"]
+        for name, _, _ in TIMINGS:
+            values = summary[name]
+            rows.append(
+                f"| {TIMING_LABELS[name]} | {cell(values['p50'])} | "
+                f"{cell(values['p95'])} | {cell(values['p99'])} |"
+            )
+        st.markdown("\n".join(rows))
+
+
+def start_rerun_timer():
+    """스크립트 실행 시간 측정을 시작합니다. 스크립트 맨 앞에서 호출하세요."""
+    return time.perf_counter()
+
+
+def record_rerun(started):
+    """이번 스크립트 실행 시간을 기록하고 사이드바에 표시합니다. 스크립트 맨 끝에서 호출하세요."""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if "rerun_times" not in st.session_state:
+        st.session_state.rerun_times = deque(maxlen=RERUN_SAMPLES)
+    times = st.session_state.rerun_times
+    times.append(elapsed_ms)
+
+    ordered = sorted(times)
+    median = ordered[len(ordered) // 2]
+    st.sidebar.caption(
+        f"⏱ 스크립트 실행 {elapsed_ms:.0f}ms "
+        f"(최근 {len(times)}회 중앙값 {median:.0f}ms, 최대 {ordered[-1]:.0f}ms)"
+    )
+    return elapsed_ms
@@ -2,13 +2,424 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import subprocess
 import threading
+import hashlib
+import json
 import os
+import re
+import socket
 import sys
+import time
+import urllib.request
 import webbrowser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# 시작 시간 측정 기준점
+STARTUP_STARTED = time.perf_counter()
+
+# 로그 버퍼 크기와 로그 창에 남길 최대 줄 수
+LOG_BUFFER_LINES = 5000
+LOG_WIDGET_MAX_LINES = 2000
+
+# 로그 창을 갱신하는 간격(ms)과 한 번에 옮길 최대 줄 수
+LOG_DRAIN_INTERVAL_MS = 100
+LOG_DRAIN_BATCH = 500
+
+# 가상환경과 패키지 설치 관련 경로
+VENV_DIR = "personal-ai-env"
+REQUIREMENTS_FILE = "requirements.txt"
+WHEELHOUSE_DIR = "wheelhouse"
+INSTALL_STAMP_FILE = os.path.join(VENV_DIR, ".requirements.sha256")
+
+# 환경 점검 결과 캐시와 시작 시간 기록 파일
+STATUS_CACHE_FILE = os.path.join(".cache", "launcher_status.json")
+STARTUP_PROFILE_FILE = os.path.join(".cache", "launcher_startup.jsonl")
+
+# 가상환경 Python으로 설치된 패키지 버전을 조회하는 스크립트
+PACKAGE_VERSION_SCRIPT = """
+import json, sys
+from importlib import metadata
+versions = {}
+for name in sys.argv[1:]:
+    try:
+        versions[name] = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        versions[name] = None
+print(json.dumps(versions))
+"""
+
+# Streamlit 서버 포트와 준비 상태 확인 설정
+DEFAULT_SERVER_PORT = 8501
+READY_TIMEOUT_SECONDS = 60
+READY_POLL_INITIAL = 0.1
+READY_POLL_MAX = 1.0
+HEALTH_CHECK_INTERVAL = 5.0
+HEALTH_CHECK_TIMEOUT = 2.0
+
+# 미리 띄워 둘 앱 (파일, 이름, 선호 포트)과 서버 풀 설정
+POOL_APPS = [
+    ("app.py", "기본 버전", 8501),
+    ("advanced_app.py", "고급 버전", 8502),
+]
+SERVER_IDLE_TIMEOUT = 15 * 60
+SERVER_MAX_RESTARTS = 3
+
+_LOCAL_URL_RE = re.compile(r"Local URL:\s*(http\S+)")
+
+_REQUIREMENT_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:>=\s*([0-9][0-9.]*))?")
+
+def venv_python_path():
+    """가상환경의 Python 경로를 반환합니다."""
+    if os.name == 'nt':  # Windows
+        return os.path.join(VENV_DIR, "Scripts", "python")
+    return os.path.join(VENV_DIR, "bin", "python")
+
+def requirements_hash(path=REQUIREMENTS_FILE):
+    """requirements 파일 내용의 해시를 계산합니다."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def read_install_stamp():
+    """마지막으로 설치에 성공한 requirements 해시를 읽습니다."""
+    try:
+        with open(INSTALL_STAMP_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_install_stamp(digest):
+    with open(INSTALL_STAMP_FILE, "w", encoding="utf-8") as f:
+        f.write(digest)
+
+def parse_requirements(path=REQUIREMENTS_FILE):
+    """requirements 파일에서 (패키지 이름, 최소 버전) 목록을 읽습니다."""
+    requirements = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = _REQUIREMENT_RE.match(line.split("#", 1)[0].strip())
+            if match:
+                requirements.append((match.group(1), match.group(2)))
+    return requirements
+
+def version_tuple(version):
+    return tuple(int(part) for part in re.findall(r"\d+", version)[:3])
+
+def site_packages_dir():
+    """가상환경의 site-packages 폴더를 찾습니다."""
+    candidates = [os.path.join(VENV_DIR, "Lib", "site-packages")]
+    lib_dir = os.path.join(VENV_DIR, "lib")
+    if os.path.isdir(lib_dir):
+        candidates += [os.path.join(lib_dir, name, "site-packages") for name in os.listdir(lib_dir)]
+    for candidate in candidates:
+        if os.path.isdir(candidate):
+            return candidate
+    return None
+
+def load_status_cache():
+    try:
+        with open(STATUS_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_status_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(STATUS_CACHE_FILE), exist_ok=True)
+        with open(STATUS_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+def probe_venv():
+    """가상환경 인터프리터 버전을 확인합니다. pyvenv.cfg만 읽으므로 프로세스를 띄우지 않습니다."""
+    config_path = os.path.join(VENV_DIR, "pyvenv.cfg")
+    if not os.path.exists(config_path):
+        return {"ok": False, "message": "❌ 가상환경이 없습니다. '가상환경 생성' 버튼을 클릭하세요."}
+    version = None
+    with open(config_path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition("=")
+            if key.strip() in ("version", "version_info"):
+                version = value.strip()
+    return {"ok": True, "message": f"✅ 가상환경이 존재합니다. (Python {version or '버전 알 수 없음'})"}
+
+def probe_packages(cache):
+    """설치된 패키지가 requirements.txt를 만족하는지 확인합니다.
+
+    requirements.txt와 site-packages가 바뀌지 않았으면 지난 실행의 결과를 그대로 씁니다.
+    """
+    site_packages = site_packages_dir()
+    if site_packages is None:
+        return {"ok": False, "message": "❌ 패키지 상태를 확인할 가상환경이 없습니다."}
+    requirements = parse_requirements()
+    cache_key = f"{requirements_hash()}:{os.path.getmtime(site_packages)}"
+    cached = cache.get("packages")
+    if cached and cached.get("key") == cache_key:
+        return dict(cached["result"], cached=True)
+
+    result = subprocess.run([venv_python_path(), "-c", PACKAGE_VERSION_SCRIPT]
+                            + [name for name, _ in requirements],
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        return {"ok": False, "message": f"❌ 패키지 확인 실패: {result.stderr.strip()}"}
+    versions = json.loads(result.stdout)
+
+    problems = []
+    for name, minimum in requirements:
+        installed = versions.get(name)
+        if installed is None:
+            problems.append(f"{name} 없음")
+        elif minimum and version_tuple(installed) < version_tuple(minimum):
+            problems.append(f"{name} {installed} < {minimum}")
+    if problems:
+        message = f"❌ 패키지 업데이트가 필요합니다: {', '.join(problems)}. '패키지 설치' 버튼을 클릭하세요."
+    else:
+        message = f"✅ 필요한 패키지 {len(requirements)}개가 모두 설치되어 있습니다."
+    probe = {"ok": not problems, "message": message}
+    cache["packages"] = {"key": cache_key, "result": probe}
+    return probe
+
+def probe_env():
+    """.env 파일과 API 키 항목이 있는지 확인합니다."""
+    if not os.path.exists(".env"):
+        return {"ok": False, "message": "❌ .env 파일이 없습니다. API 키를 설정해주세요."}
+    with open(".env", "r", encoding="utf-8", errors="replace") as f:
+        has_key = any(line.strip().startswith("OPENAI_API_KEY") for line in f)
+    if not has_key:
+        return {"ok": False, "message": "⚠️ .env 파일에 OPENAI_API_KEY가 없습니다."}
+    return {"ok": True, "message": "✅ .env 파일이 존재합니다."}
+
+def find_free_port(preferred=DEFAULT_SERVER_PORT):
+    """선호 포트가 비어 있으면 그 포트를, 아니면 운영체제가 고른 빈 포트를 반환합니다."""
+    for port in (preferred, 0):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError:
+                continue
+            return sock.getsockname()[1]
+    raise OSError("사용할 수 있는 포트가 없습니다.")
+
+def check_health(url, timeout=HEALTH_CHECK_TIMEOUT):
+    """Streamlit 상태 확인 엔드포인트의 응답 시간(초)을 반환합니다. 응답이 없으면 None."""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/_stcore/health", timeout=timeout) as response:
+            if response.status != 200:
+                return None
+    except OSError:
+        return None
+    return time.perf_counter() - started
+
+def has_wheelhouse():
+    """오프라인 설치에 쓸 휠 파일이 있는지 확인합니다."""
+    return os.path.isdir(WHEELHOUSE_DIR) and any(
+        name.endswith(".whl") for name in os.listdir(WHEELHOUSE_DIR)
+    )
+
+class LogSink:
+    """여러 스레드에서 남긴 로그를 Tk 스레드가 가져갈 때까지 모아 두는 링 버퍼"""
+    
+    def __init__(self, maxlen=LOG_BUFFER_LINES):
+        self._lines = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        
+    def put(self, line):
+        """로그 한 줄을 추가합니다. 버퍼가 가득 차면 가장 오래된 줄을 버립니다."""
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+            
+    def drain(self, limit):
+        """최대 limit줄과 그동안 버려진 줄 수를 꺼냅니다."""
+        with self._lock:
+            count = min(limit, len(self._lines))
+            batch = [self._lines.popleft() for _ in range(count)]
+            dropped, self.dropped = self.dropped, 0
+            return batch, dropped, len(self._lines)
+
+class AppServer:
+    """앱 파일 하나를 전담하는 Streamlit 서버 프로세스"""
+    
+    def __init__(self, app_file, name, preferred_port, log, pump_output, on_ready):
+        self.app_file = app_file
+        self.name = name
+        self.preferred_port = preferred_port
+        self.log = log
+        self.pump_output = pump_output
+        self.on_ready = on_ready
+        self.process = None
+        self.port = None
+        self.url = None
+        self.latency = None
+        self.ready = threading.Event()
+        self.wanted = False
+        self.restarts = 0
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+        
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+        
+    def crashed(self):
+        """종료를 요청하지 않았는데 프로세스가 끝났는지 확인합니다."""
+        return self.wanted and self.process is not None and self.process.poll() is not None
+        
+    def start(self):
+        """서버가 실행 중이 아니면 새로 띄웁니다."""
+        with self._lock:
+            if self.is_running():
+                return
+            self.ready.clear()
+            self.url = None
+            self.latency = None
+            self.port = find_free_port(self.preferred_port)
+            if self.port != self.preferred_port:
+                self.log(f"⚠️ {self.preferred_port}번 포트가 사용 중이어서 {self.name}은 {self.port}번 포트를 사용합니다.")
+                
+            # 브라우저는 서버가 준비된 뒤 런처가 직접 엶
+            process = subprocess.Popen([venv_python_path(), "-m", "streamlit", "run", self.app_file,
+                                        "--server.port", str(self.port),
+                                        "--server.headless", "true"],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, encoding="utf-8", errors="replace",
+                                       bufsize=1)
+            self.process = process
+            self.wanted = True
+            
+        # 서버가 출력한 실제 주소를 기억 (baseUrlPath 설정 등으로 달라질 수 있음)
+        urls = {"url": f"http://localhost:{self.port}"}
+        def on_line(line):
+            match = _LOCAL_URL_RE.search(line)
+            if match:
+                urls["url"] = match.group(1)
+        
+        # 파이프가 가득 차서 서버가 멈추지 않도록 출력을 계속 읽어 로그로 보냄
+        prefix = f"[{self.name}] "
+        threading.Thread(target=self.pump_output, args=(process.stdout, prefix, on_line), daemon=True).start()
+        threading.Thread(target=self.pump_output, args=(process.stderr, f"⚠️ {prefix}", on_line), daemon=True).start()
+        threading.Thread(target=self.wait_ready, args=(process, urls), daemon=True).start()
+        self.log(f"{self.name} 서버를 시작했습니다. (포트 {self.port})")
+        
+    def wait_ready(self, process, urls):
+        """상태 확인 엔드포인트가 응답할 때까지 점점 간격을 늘려 가며 확인합니다."""
+        started = time.perf_counter()
+        delay = READY_POLL_INITIAL
+        while True:
+            latency = check_health(urls["url"])
+            if latency is not None:
+                break
+            if process.poll() is not None or process is not self.process:
+                return
+            if time.perf_counter() - started > READY_TIMEOUT_SECONDS:
+                self.log(f"❌ {self.name} 서버가 {READY_TIMEOUT_SECONDS}초 안에 응답하지 않았습니다.")
+                return
+            time.sleep(delay)
+            delay = min(delay * 1.5, READY_POLL_MAX)
+            
+        self.url = urls["url"]
+        self.latency = latency
+        self.ready.set()
+        self.log(f"✅ {self.name}이 준비되었습니다. ({time.perf_counter() - started:.1f}초, {self.url})")
+        self.on_ready(self)
+        
+    def stop(self):
+        """서버를 종료합니다."""
+        with self._lock:
+            self.wanted = False
+            self.ready.clear()
+            process = self.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+            self.log(f"✅ {self.name} 서버가 종료되었습니다.")
+        except subprocess.TimeoutExpired:
+            process.kill()
+            self.log(f"⚠️ {self.name} 서버를 강제 종료했습니다.")
+            
+class ServerPool:
+    """앱마다 하나씩 서버를 미리 띄워 두고, 죽은 서버는 다시 띄우고, 오래 쓰지 않은 서버는 종료합니다."""
+    
+    def __init__(self, apps, log, pump_output, on_ready, on_status,
+                 idle_timeout=SERVER_IDLE_TIMEOUT, max_restarts=SERVER_MAX_RESTARTS):
+        self.servers = {
+            app_file: AppServer(app_file, name, port, log, pump_output, on_ready)
+            for app_file, name, port in apps
+        }
+        self.log = log
+        self.on_status = on_status
+        self.idle_timeout = idle_timeout
+        self.max_restarts = max_restarts
+        self.active = None
+        self._stopped = threading.Event()
+        
+    def warm(self):
+        """모든 앱 서버를 미리 띄웁니다."""
+        for server in self.servers.values():
+            server.last_used = time.monotonic()
+            server.start()
+            
+    def activate(self, app_file):
+        """앱을 현재 앱으로 지정하고, 서버가 없으면 띄웁니다."""
+        server = self.servers[app_file]
+        server.last_used = time.monotonic()
+        server.restarts = 0
+        self.active = app_file
+        server.start()
+        return server
+        
+    def active_server(self):
+        return self.servers.get(self.active)
+        
+    def stop_all(self):
+        self.active = None
+        for server in self.servers.values():
+            server.stop()
+            
+    def shutdown(self):
+        self._stopped.set()
+        self.stop_all()
+        
+    def supervise(self, interval=HEALTH_CHECK_INTERVAL):
+        """서버 상태를 주기적으로 확인합니다. (별도 스레드에서 실행)"""
+        while not self._stopped.wait(interval):
+            for server in self.servers.values():
+                try:
+                    self.check(server)
+                except Exception as e:
+                    self.log(f"❌ {server.name} 서버 관리 중 오류: {str(e)}")
+            self.on_status()
+            
+    def check(self, server):
+        if server.crashed():
+            returncode = server.process.returncode
+            if server.restarts >= self.max_restarts:
+                server.wanted = False
+                self.log(f"❌ {server.name} 서버가 계속 종료되어 다시 시작하지 않습니다. (종료 코드 {returncode})")
+                return
+            server.restarts += 1
+            self.log(f"⚠️ {server.name} 서버가 종료되어 다시 시작합니다. "
+                     f"(종료 코드 {returncode}, {server.restarts}/{self.max_restarts})")
+            server.start()
+            return
+        if not server.is_running():
+            return
+        if server.app_file != self.active and time.monotonic() - server.last_used > self.idle_timeout:
+            self.log(f"{server.name} 서버를 {self.idle_timeout // 60}분 동안 쓰지 않아 종료합니다.")
+            server.stop()
+            return
+        if server.ready.is_set():
+            server.latency = check_health(server.url)
+            if server.app_file == self.active:
+                server.last_used = time.monotonic()
+
 class PersonalAILauncher:
-    def __init__(self, root):
+    def __init__(self, root, profile_startup=False):
         self.root = root
         self.root.title("🤖 개인 AI 어시스턴트 런처")
         self.root.geometry("600x500")
@@ -18,8 +429,23 @@ class PersonalAILauncher:
         style = ttk.Style()
         style.theme_use('clam')
         
+        # 로그는 어느 스레드에서든 버퍼에 넣고, Tk 스레드가 주기적으로 화면에 옮김
+        self.log_sink = LogSink()
+        self.pool = ServerPool(POOL_APPS, self.log, self.pump_output,
+                               on_ready=lambda server: self.root.after(0, self.handle_server_ready, server),
+                               on_status=lambda: self.root.after(0, self.update_status))
+        self.open_when_ready = None
+        self.profile_startup = profile_startup
+        self.startup_marks = {}
+        
         self.setup_ui()
-        self.process = None
+        self.mark_startup("ui_built")
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self.drain_logs)
+        
+        # 창을 먼저 그린 뒤 환경 점검을 시작
+        self.root.after_idle(self.check_status)
+        threading.Thread(target=self.pool.supervise, daemon=True).start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def setup_ui(self):
         # 메인 프레임
@@ -61,7 +487,7 @@ class PersonalAILauncher:
         
         # 브라우저 열기 버튼
         self.open_browser_btn = ttk.Button(settings_frame, text="브라우저 열기", 
-                                          command=self.open_browser)
+                                          command=self.open_browser, state='disabled')
         self.open_browser_btn.grid(row=0, column=2, padx=(10, 0))
         
         # 로그 프레임
@@ -98,79 +524,184 @@ class PersonalAILauncher:
         self.log("🤖 개인 AI 어시스턴트 런처가 시작되었습니다.")
         self.log("가상환경과 패키지 설치 상태를 확인합니다...")
         
-        # 상태 확인
-        self.check_status()
-        
     def log(self, message):
-        """로그 메시지를 추가합니다."""
+        """로그 메시지를 추가합니다. 어느 스레드에서 호출해도 안전합니다."""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.log_sink.put(f"[{timestamp}] {message}\n")
+        
+    def drain_logs(self):
+        """버퍼에 쌓인 로그를 한 번에 로그 창으로 옮깁니다. (Tk 스레드 전용)"""
+        batch, dropped, remaining = self.log_sink.drain(LOG_DRAIN_BATCH)
+        if dropped:
+            self.log_text.insert(tk.END, f"... 로그 {dropped}줄이 생략되었습니다 ...\n")
+        if batch:
+            self.log_text.insert(tk.END, "".join(batch))
+        if batch or dropped:
+            # 로그 창에는 최근 줄만 남김
+            line_count = int(self.log_text.index("end-1c").split(".")[0])
+            if line_count > LOG_WIDGET_MAX_LINES:
+                self.log_text.delete("1.0", f"{line_count - LOG_WIDGET_MAX_LINES + 1}.0")
+            self.log_text.see(tk.END)
+        
+        # 아직 남은 로그가 있으면 바로 다시 처리
+        delay = 10 if remaining else LOG_DRAIN_INTERVAL_MS
+        self.root.after(delay, self.drain_logs)
+        
+    def show_error(self, title, message):
+        """작업 스레드에서도 안전하게 오류 대화상자를 띄웁니다."""
+        self.root.after(0, lambda: messagebox.showerror(title, message))
+        
+    def pump_output(self, stream, prefix="", on_line=None):
+        """서브프로세스 출력을 한 줄씩 읽어 로그로 보냅니다."""
+        try:
+            for line in stream:
+                line = line.rstrip()
+                if line:
+                    self.log(f"{prefix}{line}")
+                    if on_line:
+                        on_line(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
         
     def check_status(self):
-        """가상환경과 패키지 상태를 확인합니다."""
-        venv_exists = os.path.exists("personal-ai-env")
-        env_exists = os.path.exists(".env")
+        """가상환경, 패키지, .env 상태를 백그라운드에서 동시에 확인합니다."""
+        self.mark_startup("first_paint")
+        threading.Thread(target=self.run_probes, daemon=True).start()
         
-        if venv_exists:
-            self.log("✅ 가상환경이 존재합니다.")
-        else:
-            self.log("❌ 가상환경이 없습니다. '가상환경 생성' 버튼을 클릭하세요.")
-            
-        if env_exists:
-            self.log("✅ .env 파일이 존재합니다.")
+    def run_probes(self):
+        cache = load_status_cache()
+        probes = [
+            ("가상환경", probe_venv),
+            ("패키지", lambda: probe_packages(cache)),
+            (".env", probe_env),
+        ]
+        ready = True
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            futures = [(name, executor.submit(probe)) for name, probe in probes]
+            for name, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"ok": False, "message": f"❌ {name} 확인 실패: {str(e)}"}
+                ready = ready and result["ok"]
+                self.log(result["message"] + (" (캐시)" if result.get("cached") else ""))
+        save_status_cache(cache)
+        self.mark_startup("probes_done")
+        
+        if ready:
+            self.log("준비 완료! 버튼을 클릭하여 애플리케이션을 실행하세요.")
         else:
-            self.log("❌ .env 파일이 없습니다. API 키를 설정해주세요.")
-            
-        self.log("준비 완료! 버튼을 클릭하여 애플리케이션을 실행하세요.")
+            self.log("위의 항목을 확인한 뒤 애플리케이션을 실행하세요.")
+        status = "준비 완료" if ready else "환경 점검 필요"
+        self.root.after(0, lambda: self.pool.active is None and self.status_label.config(text=status))
+        
+        # 환경이 준비되었으면 앱 서버를 미리 띄워 버튼을 누르면 바로 열리게 함
+        if ready and os.getenv("LAUNCHER_PREWARM", "1") != "0":
+            self.log("앱 서버를 미리 시작합니다...")
+            self.root.after(0, self.warm_pool)
+        if self.profile_startup:
+            # 시작 시간은 처음 한 번만 기록
+            self.profile_startup = False
+            self.report_startup()
+        
+    def mark_startup(self, name):
+        """시작 단계별 경과 시간을 기록합니다."""
+        self.startup_marks.setdefault(name, time.perf_counter() - STARTUP_STARTED)
+        
+    def report_startup(self):
+        """시작 시간 측정 결과를 로그와 파일에 남깁니다."""
+        summary = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.startup_marks.items())
+        self.log(f"⏱ 시작 시간: {summary}")
+        record = {"time": datetime.now().isoformat(timespec="seconds")}
+        record.update({name: round(seconds, 4) for name, seconds in self.startup_marks.items()})
+        try:
+            os.makedirs(os.path.dirname(STARTUP_PROFILE_FILE), exist_ok=True)
+            with open(STARTUP_PROFILE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            self.log(f"⚠️ 시작 시간 기록 실패: {str(e)}")
         
     def create_venv(self):
         """가상환경을 생성합니다."""
         def create():
             self.log("가상환경을 생성하고 있습니다...")
             try:
-                result = subprocess.run([sys.executable, "-m", "venv", "personal-ai-env"], 
+                result = subprocess.run([sys.executable, "-m", "venv", VENV_DIR], 
                                       capture_output=True, text=True, check=True)
                 self.log("✅ 가상환경이 성공적으로 생성되었습니다.")
                 self.install_packages()
             except subprocess.CalledProcessError as e:
                 self.log(f"❌ 가상환경 생성 실패: {e.stderr}")
-                messagebox.showerror("오류", "가상환경 생성에 실패했습니다.")
+                self.show_error("오류", "가상환경 생성에 실패했습니다.")
                 
         threading.Thread(target=create, daemon=True).start()
         
     def install_packages(self):
-        """필요한 패키지를 설치합니다."""
+        """requirements.txt의 패키지를 한 번에 설치합니다."""
         def install():
             self.log("패키지를 설치하고 있습니다...")
+            started = time.perf_counter()
             try:
-                # 가상환경의 pip 경로
-                if os.name == 'nt':  # Windows
-                    pip_path = "personal-ai-env\\Scripts\\pip"
-                else:  # Unix/Linux
-                    pip_path = "personal-ai-env/bin/pip"
-                    
-                packages = ["openai>=1.0.0", "streamlit", "python-dotenv", "requests", "Pillow"]
+                phase = time.perf_counter()
+                digest = requirements_hash()
+                if digest == read_install_stamp():
+                    self.log(f"✅ {REQUIREMENTS_FILE}이 마지막 설치 이후 바뀌지 않아 설치를 건너뜁니다. "
+                             f"({time.perf_counter() - phase:.2f}초)")
+                    return
+                self.log(f"⏱ 요구 사항 확인: {time.perf_counter() - phase:.2f}초")
                 
-                for package in packages:
-                    self.log(f"설치 중: {package}")
-                    result = subprocess.run([pip_path, "install", package], 
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        self.log(f"✅ {package} 설치 완료")
+                # 가상환경의 pip를 python -m pip로 실행 (pip 자체를 업그레이드해도 안전)
+                pip = [venv_python_path(), "-m", "pip", "install", "--disable-pip-version-check"]
+                installed = False
+                if has_wheelhouse():
+                    phase = time.perf_counter()
+                    self.log(f"로컬 휠하우스({WHEELHOUSE_DIR})에서 오프라인 설치를 시도합니다...")
+                    installed = self.run_logged(pip + ["--no-index", "--find-links", WHEELHOUSE_DIR,
+                                                       "-r", REQUIREMENTS_FILE]) == 0
+                    self.log(f"⏱ 오프라인 설치: {time.perf_counter() - phase:.1f}초")
+                    if not installed:
+                        self.log("휠하우스에 없는 패키지가 있어 온라인으로 설치합니다.")
+                        
+                if not installed:
+                    phase = time.perf_counter()
+                    command = pip + ["-r", REQUIREMENTS_FILE]
+                    if os.path.isdir(WHEELHOUSE_DIR):
+                        command += ["--find-links", WHEELHOUSE_DIR]
+                    returncode = self.run_logged(command)
+                    self.log(f"⏱ 온라인 설치: {time.perf_counter() - phase:.1f}초")
+                    if returncode != 0:
+                        raise RuntimeError(f"pip 종료 코드 {returncode}")
+                    
+                    # 다음 설치는 네트워크 없이 할 수 있도록 휠하우스를 채워 둠
+                    phase = time.perf_counter()
+                    returncode = self.run_logged([venv_python_path(), "-m", "pip", "wheel", "-q",
+                                                  "--disable-pip-version-check",
+                                                  "-r", REQUIREMENTS_FILE, "-w", WHEELHOUSE_DIR,
+                                                  "--find-links", WHEELHOUSE_DIR])
+                    if returncode == 0:
+                        self.log(f"⏱ 휠하우스 갱신: {time.perf_counter() - phase:.1f}초")
                     else:
-                        self.log(f"❌ {package} 설치 실패: {result.stderr}")
+                        self.log("⚠️ 휠하우스 갱신에 실패했습니다. (설치에는 영향 없음)")
                         
-                self.log("✅ 패키지 설치가 완료되었습니다.")
+                write_install_stamp(digest)
+                self.log(f"✅ 패키지 설치가 완료되었습니다. (총 {time.perf_counter() - started:.1f}초)")
+                self.run_probes()
                 
             except Exception as e:
                 self.log(f"❌ 패키지 설치 중 오류: {str(e)}")
-                messagebox.showerror("오류", "패키지 설치에 실패했습니다.")
+                self.show_error("오류", "패키지 설치에 실패했습니다.")
                 
         threading.Thread(target=install, daemon=True).start()
         
+    def run_logged(self, command):
+        """명령을 실행하며 출력을 로그로 보내고 종료 코드를 반환합니다."""
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, encoding="utf-8", errors="replace", bufsize=1)
+        self.pump_output(process.stdout)
+        return process.wait()
+        
     def run_basic_version(self):
         """기본 버전을 실행합니다."""
         self.run_app("app.py", "기본 버전")
@@ -180,90 +711,99 @@ class PersonalAILauncher:
         self.run_app("advanced_app.py", "고급 버전")
         
     def run_app(self, app_file, version_name):
-        """애플리케이션을 실행합니다."""
-        if self.process:
-            messagebox.showwarning("경고", "이미 실행 중인 애플리케이션이 있습니다.")
+        """애플리케이션으로 전환합니다. 서버가 이미 떠 있으면 바로 엽니다."""
+        try:
+            server = self.pool.activate(app_file)
+        except Exception as e:
+            self.log(f"❌ {version_name} 실행 실패: {str(e)}")
+            self.show_error("오류", f"{version_name} 실행에 실패했습니다.")
             return
             
-        def run():
-            self.log(f"{version_name}을 실행하고 있습니다...")
+        self.update_ui_running()
+        if server.ready.is_set():
+            self.log(f"✅ {version_name}으로 전환했습니다.")
+            self.update_status()
+            self.open_browser()
+        else:
+            self.open_when_ready = app_file
+            self.log(f"{version_name} 서버가 준비되기를 기다립니다... (포트 {server.port})")
             
-            # 가상환경의 Python 경로
-            if os.name == 'nt':  # Windows
-                python_path = "personal-ai-env\\Scripts\\python"
-            else:  # Unix/Linux
-                python_path = "personal-ai-env/bin/python"
-                
-            try:
-                self.process = subprocess.Popen([python_path, "-m", "streamlit", "run", app_file],
-                                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                              text=True)
-                
-                self.log(f"✅ {version_name}이 시작되었습니다.")
-                self.log("브라우저에서 http://localhost:8501 로 접속하세요.")
-                
-                # UI 업데이트
-                self.root.after(0, self.update_ui_running)
-                
-                # 프로세스 모니터링
-                stdout, stderr = self.process.communicate()
-                
-                if self.process.returncode == 0:
-                    self.log(f"✅ {version_name}이 정상적으로 종료되었습니다.")
-                else:
-                    self.log(f"❌ {version_name} 실행 중 오류: {stderr}")
-                    
-            except Exception as e:
-                self.log(f"❌ {version_name} 실행 실패: {str(e)}")
-                messagebox.showerror("오류", f"{version_name} 실행에 실패했습니다.")
-            finally:
-                self.process = None
-                self.root.after(0, self.update_ui_stopped)
-                
-        threading.Thread(target=run, daemon=True).start()
+    def warm_pool(self):
+        try:
+            self.pool.warm()
+        except Exception as e:
+            self.log(f"⚠️ 앱 서버를 미리 시작하지 못했습니다: {str(e)}")
+            
+    def handle_server_ready(self, server):
+        """서버가 응답하기 시작하면 현재 앱일 때 브라우저를 엽니다. (Tk 스레드 전용)"""
+        if server.app_file != self.pool.active:
+            return
+        self.update_status()
+        if self.open_when_ready == server.app_file:
+            self.open_when_ready = None
+            self.open_browser()
+            
+    def update_status(self):
+        """현재 앱 서버의 상태와 응답 시간을 상태 표시줄에 보여줍니다. (Tk 스레드 전용)"""
+        server = self.pool.active_server()
+        if server is None:
+            return
+        warm = sum(1 for other in self.pool.servers.values() if other is not server and other.ready.is_set())
+        suffix = f" · 대기 서버 {warm}개" if warm else ""
+        if server.ready.is_set():
+            latency = "응답 없음" if server.latency is None else f"응답 {server.latency * 1000:.0f}ms"
+            icon = "🔴" if server.latency is None else "🟢"
+            self.status_label.config(text=f"{icon} {server.name} 실행 중 ({latency}) - {server.url}{suffix}")
+            self.open_browser_btn.config(state='normal')
+        else:
+            self.status_label.config(text=f"{server.name} 서버 시작 중...{suffix}")
+            self.open_browser_btn.config(state='disabled')
         
     def update_ui_running(self):
         """실행 중일 때 UI를 업데이트합니다."""
-        self.status_label.config(text="실행 중...")
-        self.basic_btn.config(state='disabled')
-        self.advanced_btn.config(state='disabled')
+        self.update_status()
         self.stop_btn.config(state='normal')
         
     def update_ui_stopped(self):
         """중지되었을 때 UI를 업데이트합니다."""
         self.status_label.config(text="대기 중...")
-        self.basic_btn.config(state='normal')
-        self.advanced_btn.config(state='normal')
+        self.open_browser_btn.config(state='disabled')
         self.stop_btn.config(state='disabled')
         
     def stop_app(self):
-        """실행 중인 애플리케이션을 종료합니다."""
-        if self.process:
-            self.log("애플리케이션을 종료하고 있습니다...")
-            self.process.terminate()
-            try:
-                self.process.wait(timeout=5)
-                self.log("✅ 애플리케이션이 종료되었습니다.")
-            except subprocess.TimeoutExpired:
-                self.process.kill()
-                self.log("⚠️ 애플리케이션을 강제 종료했습니다.")
-            self.process = None
-            self.update_ui_stopped()
-        else:
+        """실행 중인 애플리케이션 서버를 모두 종료합니다."""
+        if not any(server.is_running() for server in self.pool.servers.values()):
             messagebox.showinfo("정보", "실행 중인 애플리케이션이 없습니다.")
+            return
+        self.log("애플리케이션을 종료하고 있습니다...")
+        self.open_when_ready = None
+        self.update_ui_stopped()
+        threading.Thread(target=self.pool.stop_all, daemon=True).start()
+        
+    def on_close(self):
+        """창을 닫을 때 띄워 둔 서버를 함께 종료합니다."""
+        self.pool.shutdown()
+        self.root.destroy()
             
     def open_browser(self):
         """브라우저에서 애플리케이션을 엽니다."""
+        server = self.pool.active_server()
+        if server is None or not server.ready.is_set():
+            self.log("아직 서버가 준비되지 않았습니다.")
+            return
         try:
-            webbrowser.open("http://localhost:8501")
-            self.log("브라우저를 열었습니다.")
+            webbrowser.open(server.url)
+            self.log(f"브라우저를 열었습니다. ({server.url})")
         except Exception as e:
             self.log(f"브라우저 열기 실패: {str(e)}")
             messagebox.showerror("오류", "브라우저를 열 수 없습니다.")
 
 def main():
+    # --profile-startup 또는 LAUNCHER_PROFILE_STARTUP=1 이면 시작 시간을 기록
+    profile_startup = ("--profile-startup" in sys.argv[1:]
+                       or os.getenv("LAUNCHER_PROFILE_STARTUP") == "1")
     root = tk.Tk()
-    app = PersonalAILauncher(root)
+    app = PersonalAILauncher(root, profile_startup=profile_startup)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""
+여러 이미지를 제한된 작업자 풀과 분당 요청 제한으로 분석하는 모듈
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from image_preprocess import preprocess_image
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REQUESTS_PER_MINUTE = 30
+
+
+class RateLimiter:
+    """최근 60초 동안 보낸 요청 수를 분당 제한 이하로 유지합니다. (여러 스레드에서 함께 사용)
+
+    처음부터 제한만큼 보낼 수 있지만, 어느 60초 구간에서도 requests_per_minute건을 넘지 않습니다.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, requests_per_minute):
+        self.capacity = max(1, int(requests_per_minute))
+        # 최근 60초 안에 보낸 요청 시각
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """요청을 보낼 수 있을 때까지 기다립니다."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.WINDOW_SECONDS:
+                    self._sent.popleft()
+                if len(self._sent) < self.capacity:
+                    self._sent.append(now)
+                    return
+                wait = self._sent[0] + self.WINDOW_SECONDS - now
+            time.sleep(wait)
+
+
+def analyze_images(images, analyze, max_workers=DEFAULT_MAX_WORKERS,
+                   requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, summary=None):
+    """이미지를 병렬로 전처리하고 분석해서 끝나는 순서대로 결과를 돌려줍니다.
+
+    images는 (이름, 바이트) 목록이고, analyze(processed, on_retry)는 전처리된 이미지로
+    분석 결과 텍스트를 반환해야 합니다. summary 딕셔너리를 넘기면 실행이 끝날 때
+    처리량 요약이 채워집니다.
+    """
+    limiter = RateLimiter(requests_per_minute)
+    started = time.perf_counter()
+    succeeded = failed = retries = 0
+
+    def run(name, data):
+        attempts = []
+        task_started = time.perf_counter()
+        result = {"name": name, "result": None, "error": None, "processed": None}
+        try:
+            result["processed"] = preprocess_image(data)
+            limiter.acquire()
+            result["result"] = analyze(
+                result["processed"],
+                lambda attempt, delay, error: attempts.append(attempt)
+            )
+        except Exception as e:
+            result["error"] = str(e)
+        result["retries"] = len(attempts)
+        result["seconds"] = time.perf_counter() - task_started
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run, name, data) for name, data in images]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                retries += result["retries"]
+                if result["error"] is None:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield result
+        finally:
+            # 중간에 중단되면 아직 시작하지 않은 작업은 취소
+            for future in futures:
+                future.cancel()
+            if summary is not None:
+                elapsed = time.perf_counter() - started
+                summary.update({
+                    "images": succeeded + failed,
+                    "succeeded": succeeded,
+                    "failed": failed,
+                    "retries": retries,
+                    "seconds": elapsed,
+                    "images_per_sec": (succeeded + failed) / elapsed if elapsed > 0 else 0.0,
+                })
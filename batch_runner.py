@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+채팅 파이프라인 일괄 실행기 (Streamlit 없이 실행)
+
+JSONL 파일이나 폴더에서 질문/이미지를 읽어 앱과 같은 경로(모델 선택, 요청 조립, 응답 캐시,
+같은 요청 합치기, 재시도와 모델 전환)로 처리하고, 끝나는 대로 결과를 JSONL 파일에 덧붙입니다.
+결과 파일이 곧 체크포인트라서, 중간에 멈춰도 같은 명령을 다시 실행하면 성공한 항목은 건너뛰고
+실패했거나 처리하지 못한 항목만 다시 실행합니다. 끝나면 처리량 요약을 출력합니다.
+
+입력 형식:
+    JSONL  한 줄에 {"id": "q1", "prompt": "...", "system_prompt": "...", "model": "gpt-4o-mini",
+           "temperature": 0, "image": "photos/a.jpg"} (prompt나 image 중 하나는 필수,
+           id가 없으면 줄 번호, image 경로는 JSONL 파일 기준)
+    폴더   .txt/.md 파일은 내용이 질문이고, 이미지 파일은 --image-prompt로 분석 (id는 상대 경로)
+
+사용 예:
+    python batch_runner.py prompts.jsonl -o results.jsonl --concurrency 8 --rpm 120
+    python batch_runner.py ./photos -o captions.jsonl --image-prompt "한 문장으로 설명해 주세요."
+    python batch_runner.py prompts.jsonl -o results.jsonl --base-url http://127.0.0.1:8765/v1
+    python batch_runner.py prompts.jsonl -o results.jsonl --hedge gpt-4o-mini
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from batch_analyzer import RateLimiter, DEFAULT_REQUESTS_PER_MINUTE
+from history_manager import estimate_tokens
+from image_preprocess import preprocess_image
+from request_hedger import SAME_MODEL
+from request_metrics import percentile
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_IMAGE_PROMPT = "이 이미지에 대해 자세히 설명해주세요."
+
+PROMPT_EXTENSIONS = (".txt", ".md")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+
+def read_jsonl_items(path):
+    """JSONL 입력에서 항목을 차례로 읽습니다. (빈 줄은 건너뜀)"""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: JSON 형식이 아닙니다 ({e})")
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not item.get("prompt") and not item.get("image"):
+                raise ValueError(f"{path}:{line_number}: prompt나 image가 필요합니다")
+            item["id"] = str(item.get("id", f"line-{line_number}"))
+            if item.get("image"):
+                item["image"] = os.path.join(base_dir, item["image"])
+            yield item
+
+
+def read_directory_items(directory):
+    """폴더의 텍스트 파일(질문)과 이미지 파일을 이름 순서로 읽습니다."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            item_id = os.path.relpath(path, directory).replace(os.sep, "/")
+            extension = os.path.splitext(name)[1].lower()
+            if extension in PROMPT_EXTENSIONS:
+                with open(path, encoding="utf-8") as f:
+                    prompt = f.read().strip()
+                if prompt:
+                    yield {"id": item_id, "prompt": prompt}
+            elif extension in IMAGE_EXTENSIONS:
+                yield {"id": item_id, "image": path}
+
+
+def read_items(source):
+    if os.path.isdir(source):
+        return read_directory_items(source)
+    return read_jsonl_items(source)
+
+
+def load_checkpoint(path):
+    """결과 파일에서 성공한 항목 ID를 읽습니다.
+
+    쓰는 도중 중단되어 마지막 줄이 잘렸으면 그 줄을 잘라 내서 이어 쓸 수 있게 합니다.
+    같은 ID가 여러 번 있으면 마지막 결과를 따릅니다.
+    """
+    succeeded = set()
+    if not os.path.exists(path):
+        return succeeded
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_bytes += len(line)
+            if record.get("error") is None:
+                succeeded.add(record["id"])
+            else:
+                succeeded.discard(record["id"])
+    if valid_bytes < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return succeeded
+
+
+class ResultWriter:
+    """결과를 한 줄씩 덧붙이고 바로 디스크에 기록합니다. (여러 스레드에서 사용)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def run_item(pipeline, item, limiter, args):
+    """항목 하나를 처리하고 결과 파일에 쓸 기록을 반환합니다. (오류도 기록으로 남김)"""
+    retries = []
+    on_retry = lambda attempt, delay, error: retries.append(attempt)
+    started = time.perf_counter()
+    result = {"id": item["id"], "prompt": item.get("prompt"), "response": None, "error": None}
+    try:
+        if item.get("image"):
+            result["image"] = item["image"]
+            result["prompt"] = item.get("prompt") or args.image_prompt
+            with open(item["image"], "rb") as f:
+                processed = preprocess_image(f.read())
+            limiter.acquire()
+            record = pipeline.analyze_image(
+                processed["base64"], result["prompt"], processed["mime_type"], on_retry
+            )
+        else:
+            limiter.acquire()
+            record = pipeline.ask(
+                item["prompt"],
+                system_prompt=item.get("system_prompt", args.system_prompt),
+                model=item.get("model", args.model),
+                temperature=float(item.get("temperature", args.temperature)),
+                on_retry=on_retry,
+                request_id=item["id"],
+                hedge_model=args.hedge
+            )
+        result.update({
+            "response": record["ai_response"],
+            "model": record["model"],
+            "routing": record["routing"],
+            "shared_stream": record.get("shared_stream", False),
+            "time_to_first_token": record.get("time_to_first_token"),
+            "completion_tokens": estimate_tokens(record["ai_response"] or ""),
+            "hedge": record.get("hedge"),
+        })
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["retries"] = len(retries)
+    result["seconds"] = time.perf_counter() - started
+    result["timestamp"] = time.time()
+    return result
+
+
+def run_batch(pipeline, items, writer, args, on_result=None):
+    """항목들을 제한된 작업자 풀과 분당 요청 제한으로 처리하고 요약을 반환합니다.
+
+    Ctrl+C로 중단하면 아직 시작하지 않은 항목은 취소하고, 그때까지의 요약을 반환합니다.
+    """
+    limiter = RateLimiter(args.rpm)
+    summary = {
+        "items": 0, "succeeded": 0, "failed": 0, "retries": 0, "tokens": 0,
+        "ttft": [], "latency": [], "errors": [], "interrupted": False,
+    }
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    futures = [executor.submit(run_item, pipeline, item, limiter, args) for item in items]
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            writer.write(result)
+            summary["items"] += 1
+            summary["retries"] += result["retries"]
+            if result["error"] is None:
+                summary["succeeded"] += 1
+                summary["tokens"] += result["completion_tokens"]
+                summary["latency"].append(result["seconds"])
+                if result["time_to_first_token"] is not None:
+                    summary["ttft"].append(result["time_to_first_token"])
+            else:
+                summary["failed"] += 1
+                if len(summary["errors"]) < 5:
+                    summary["errors"].append(f"{result['id']}: {result['error']}")
+            if on_result is not None:
+                on_result(result, summary)
+    except KeyboardInterrupt:
+        summary["interrupted"] = True
+    finally:
+        # 진행 중인 항목은 끝까지 기다리지 않음 (결과 파일에 없으므로 다음 실행에서 다시 처리)
+        executor.shutdown(wait=not summary["interrupted"], cancel_futures=True)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def print_summary(summary, skipped, pipeline):
+    def seconds(values):
+        return "  ".join(
+            f"p{p} {value:.3f}s" if value is not None else f"p{p} -"
+            for p, value in ((p, percentile(values, p)) for p in (50, 95, 99))
+        )
+
+    elapsed = summary["seconds"]
+    print("=" * 60)
+    if summary["interrupted"]:
+        print("⚠️ 중단됨: 같은 명령을 다시 실행하면 남은 항목부터 이어서 처리합니다.")
+    print(f"처리 {summary['items']}개 (성공 {summary['succeeded']} / 실패 {summary['failed']} / "
+          f"재시도 {summary['retries']}) · 이전 실행에서 끝나 건너뜀 {skipped}개")
+    print(f"첫 토큰 시간   {seconds(summary['ttft'])}")
+    print(f"전체 지연 시간 {seconds(summary['latency'])}")
+    if elapsed > 0:
+        print(f"처리량: {summary['items'] / elapsed:.2f} 항목/초, {summary['tokens'] / elapsed:.1f} 토큰/초 "
+              f"({elapsed:.1f}초)")
+    coalescer = pipeline.request_coalescer
+    cache = pipeline.response_cache
+    print(f"API 호출 {coalescer.started}회 / 같은 요청 합침 {coalescer.joined}회"
+          + (f" / 응답 캐시 적중 {cache.hits}회" if cache is not None else ""))
+    hedge = pipeline.hedger.stats()
+    if hedge["requests"]:
+        print(f"헤지 요청 {hedge['hedged']}/{hedge['requests']}건 ({hedge['hedge_rate']:.0%}) · "
+              f"두 번째가 이김 {hedge['hedge_wins']}회 · 첫 토큰 최소 {hedge['saved_seconds']:.1f}초 단축")
+    for error in summary["errors"]:
+        print(f"  ❌ {error}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 파이프라인 일괄 실행기")
+    parser.add_argument("source", help="입력 JSONL 파일 또는 폴더")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="결과 JSONL 파일 (이미 있으면 체크포인트로 보고 이어서 처리)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 작업 수")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE, help="분당 최대 요청 수")
+    parser.add_argument("--model", help="사용할 모델 (없으면 항목마다 라우터가 선택)")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--system-prompt", help="항목에 system_prompt가 없을 때 쓸 시스템 프롬프트")
+    parser.add_argument("--image-prompt", default=DEFAULT_IMAGE_PROMPT, help="이미지 항목의 기본 분석 요청")
+    parser.add_argument("--hedge", nargs="?", const=SAME_MODEL, metavar="MODEL",
+                        help="첫 토큰이 최근 p95(HEDGE_PERCENTILE)보다 늦으면 같은 요청을 MODEL(없으면 같은 모델)로 "
+                             "한 번 더 보내고 먼저 응답한 쪽을 씀")
+    parser.add_argument("--no-cache", action="store_true", help="temperature 0 요청도 응답 캐시를 쓰지 않음")
+    parser.add_argument("--restart", action="store_true", help="결과 파일을 지우고 처음부터 실행")
+    parser.add_argument("--base-url", help="OpenAI 호환 서버 주소 (예: 모의 서버)")
+    parser.add_argument("--json", dest="json_path", help="요약을 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    # 앱 모듈을 가져오기 전에 접속 대상과 동시 요청 제한을 설정해야 함
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    os.environ.setdefault("OPENAI_MAX_CONCURRENCY", str(max(8, args.concurrency)))
+
+    from chat_core import pipeline_from_env
+
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_checkpoint(args.output)
+    all_items = list(read_items(args.source))
+    items = [item for item in all_items if item["id"] not in done]
+    skipped = len(all_items) - len(items)
+    print(f"📄 {args.source}: 처리할 항목 {len(items)}개 (건너뜀 {skipped}개) → {args.output}")
+
+    pipeline = pipeline_from_env(use_cache=not args.no_cache)
+    writer = ResultWriter(args.output)
+    total = len(items)
+
+    def show_progress(result, summary):
+        mark = "✅" if result["error"] is None else "❌"
+        print(f"{mark} [{summary['items']}/{total}] {result['id']} ({result['seconds']:.1f}초)", flush=True)
+
+    try:
+        summary = run_batch(pipeline, items, writer, args, on_result=show_progress)
+    finally:
+        writer.close()
+    print_summary(summary, skipped, pipeline)
+    if args.json_path:
+        report = {key: value for key, value in summary.items() if key not in ("ttft", "latency")}
+        report.update({
+            "skipped": skipped,
+            "items_per_sec": summary["items"] / summary["seconds"] if summary["seconds"] else 0.0,
+            "tokens_per_sec": summary["tokens"] / summary["seconds"] if summary["seconds"] else 0.0,
+            "ttft": {f"p{p}": percentile(summary["ttft"], p) for p in (50, 95, 99)},
+            "latency": {f"p{p}": percentile(summary["latency"], p) for p in (50, 95, 99)},
+            "hedge": pipeline.hedger.stats(),
+        })
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+채팅 파이프라인 부하 측정 스크립트
+
+로컬 모의 OpenAI 서버(mock_openai_server.py)를 띄우고 N개의 동시 세션으로
+요청/스트리밍 경로를 실행해 첫 토큰 시간(TTFT), 전체 지연 시간의 p50/p95/p99,
+처리량과 메모리 사용량을 보고합니다.
+
+사용 예:
+    python benchmark.py --sessions 16 --turns 5
+    python benchmark.py --mode apptest --app advanced_app.py --sessions 4 --turns 3
+    python benchmark.py --base-url http://127.0.0.1:8765/v1 --sessions 32
+
+모의 서버를 같은 프로세스에서 띄우면 서버와 클라이언트가 GIL을 나눠 쓰므로,
+정확한 수치가 필요하면 mock_openai_server.py를 따로 실행하고 --base-url로 지정하세요.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows에는 resource 모듈이 없음
+    resource = None
+
+from request_metrics import metrics, percentile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROMPTS = [
+    "안녕하세요! 오늘 할 일을 정리해 주세요.",
+    "파이썬에서 리스트와 튜플의 차이를 설명해 주세요.",
+    "방금 설명한 내용을 세 줄로 요약해 주세요.",
+    "예제 코드도 보여주세요.",
+]
+
+
+def session_prompt(session_number, turn_number):
+    """세션마다 다른 질문을 만듭니다.
+
+    파이프라인의 RequestCoalescer가 같은 질문을 하나로 합치므로, 질문이 겹치면 여러 세션이
+    서버 요청 하나를 나눠 받아 실제보다 많은 요청을 처리한 것처럼 보임
+    """
+    return f"[세션 {session_number + 1}] {PROMPTS[(session_number + turn_number) % len(PROMPTS)]}"
+
+
+class NullPlaceholder:
+    """화면 없이 렌더링 비용만 흉내 내는 placeholder"""
+
+    def __init__(self):
+        self.renders = 0
+
+    def markdown(self, text):
+        self.renders += 1
+
+
+class BenchmarkResults:
+    """요청별 측정값을 여러 스레드에서 모읍니다."""
+
+    def __init__(self):
+        self.ttft = []
+        self.latency = []
+        self.tokens = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add(self, ttft, latency, tokens):
+        with self._lock:
+            if ttft is not None:
+                self.ttft.append(ttft)
+            self.latency.append(latency)
+            self.tokens += tokens
+            self.succeeded += 1
+
+    def add_error(self, error):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < 5:
+                self.errors.append(str(error))
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+
+def run_core_session(pipeline, session_number, turns, model, results):
+    """Streamlit 없이 앱과 같은 채팅 파이프라인(chat_core)으로 대화를 실행합니다."""
+    from stream_renderer import StreamRenderer
+
+    history_state = {}
+    messages = []
+    for turn_number in range(turns):
+        prompt = session_prompt(session_number, turn_number)
+        messages.append({"role": "user", "content": prompt})
+        renderer = StreamRenderer(NullPlaceholder())
+        try:
+            turn = pipeline.prepare(prompt, messages, history_state, model=model)
+            stream = pipeline.open_stream(turn, on_retry=lambda attempt, delay, error: results.add_retry())
+            try:
+                full_response = renderer.render(stream)
+            except Exception as e:
+                pipeline.fail(turn, e)
+                raise
+            pipeline.complete(turn, full_response, renderer.stats())
+        except Exception as e:
+            results.add_error(e)
+            messages.pop()
+            continue
+        stats = renderer.stats()
+        results.add(stats["time_to_first_token"], stats["total_seconds"], stats["chunks"])
+        messages.append({"role": "assistant", "content": full_response})
+
+
+def run_apptest_session(session_number, turns, app_path, results):
+    """Streamlit AppTest로 실제 앱 스크립트를 실행합니다."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=120).run()
+    for turn in range(turns):
+        started = time.perf_counter()
+        at.chat_input[0].set_value(session_prompt(session_number, turn)).run()
+        latency = time.perf_counter() - started
+        if at.exception or at.error:
+            results.add_error((at.exception or at.error)[0].value)
+            continue
+        stats = at.session_state["last_stream_stats"]
+        results.add(stats["time_to_first_token"], latency, stats["chunks"])
+
+
+def run_benchmark(args):
+    """동시 세션을 실행하고 측정 결과를 반환합니다."""
+    results = BenchmarkResults()
+    if args.mode == "apptest":
+        target = lambda number: run_apptest_session(number, args.turns, args.app, results)
+    else:
+        from chat_core import pipeline_from_env
+
+        # 앱처럼 프로세스 전체에서 파이프라인 하나를 여러 세션이 함께 사용
+        pipeline = pipeline_from_env(use_cache=False)
+        target = lambda number: run_core_session(pipeline, number, args.turns, args.model, results)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    upstream_before = metrics.upstream_requests()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=target, args=(number,)) for number in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    peak_heap = None
+    if args.trace_memory:
+        _, peak_heap = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    peak_rss = None
+    if resource is not None:
+        # 리눅스는 KB, macOS는 바이트 단위
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+    return {
+        "mode": args.mode,
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "succeeded": results.succeeded,
+        "failed": results.failed,
+        "retries": results.retries,
+        # 실제로 서버에 보낸 요청 수 (요약 요청과 재시도 포함, 합쳐진 요청은 한 번만 셈)
+        "upstream_requests": metrics.upstream_requests() - upstream_before,
+        "errors": results.errors,
+        "seconds": elapsed,
+        "requests_per_sec": results.succeeded / elapsed if elapsed else 0.0,
+        "tokens_per_sec": results.tokens / elapsed if elapsed else 0.0,
+        "ttft": {f"p{p}": percentile(results.ttft, p) for p in (50, 95, 99)},
+        "latency": {f"p{p}": percentile(results.latency, p) for p in (50, 95, 99)},
+        # 두 모드 모두 같은 프로세스에서 요청을 보내므로 채워짐 (--base-url로 다른 서버를 써도 마찬가지)
+        "queue_wait": metrics.summary("chat")["queue_wait"],
+        "peak_heap_bytes": peak_heap,
+        "peak_rss_bytes": peak_rss,
+    }
+
+
+def print_report(report):
+    def seconds(values):
+        return "  ".join(
+            f"{name} {value:.3f}s" if value is not None else f"{name} -"
+            for name, value in values.items()
+        )
+
+    total = report["sessions"] * report["turns"]
+    print("=" * 60)
+    print(f"모드: {report['mode']} / 세션 {report['sessions']}개 × {report['turns']}턴 = {total}개 요청")
+    print(f"성공 {report['succeeded']} / 실패 {report['failed']} / 재시도 {report['retries']} "
+          f"(서버로 보낸 요청 {report['upstream_requests']}건)")
+    print(f"첫 토큰 시간   {seconds(report['ttft'])}")
+    print(f"전체 지연 시간 {seconds(report['latency'])}")
+    if report["queue_wait"]["p50"] is not None:
+        print(f"요청 슬롯 대기 {seconds(report['queue_wait'])}")
+    print(f"처리량: {report['requests_per_sec']:.2f} 요청/초, {report['tokens_per_sec']:.1f} 토큰/초 "
+          f"({report['seconds']:.1f}초)")
+    memory = []
+    if report["peak_heap_bytes"] is not None:
+        memory.append(f"파이썬 힙 최대 {report['peak_heap_bytes'] / 1024 / 1024:.1f}MB")
+    if report["peak_rss_bytes"]:
+        memory.append(f"RSS 최대 {report['peak_rss_bytes'] / 1024 / 1024:.1f}MB")
+    print(f"메모리: {', '.join(memory) or '측정 안 함'}")
+    for error in report["errors"]:
+        print(f"  ❌ {error}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅 파이프라인 부하 측정")
+    parser.add_argument("--mode", choices=["core", "apptest"], default="core",
+                        help="core: 채팅 파이프라인만 실행, apptest: Streamlit 앱 스크립트 실행")
+    parser.add_argument("--app", default="app.py", help="apptest 모드에서 실행할 앱 파일")
+    parser.add_argument("--sessions", type=int, default=8, help="동시 세션 수")
+    parser.add_argument("--turns", type=int, default=3, help="세션당 대화 턴 수")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--base-url", help="이미 실행 중인 서버 주소 (없으면 모의 서버를 직접 띄움)")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="모의 서버의 초당 토큰 수")
+    parser.add_argument("--latency", type=float, default=0.2, help="모의 서버의 첫 토큰 지연(초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.1, help="모의 서버 지연의 무작위 편차(초)")
+    parser.add_argument("--response-tokens", type=int, default=120, help="모의 서버의 응답 토큰 수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="모의 서버의 오류 주입 비율")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="openai_client의 동시 요청 제한 (기본값: OPENAI_MAX_CONCURRENCY 또는 8)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="tracemalloc으로 파이썬 힙 최대치를 측정 (측정 자체가 느려짐)")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    # 앱 모듈을 가져오기 전에 접속 대상을 설정해야 함
+    base_url = args.base_url
+    if base_url is None:
+        from mock_openai_server import MockSettings, start_server
+
+        _, base_url = start_server(MockSettings(
+            tokens_per_sec=args.tokens_per_sec,
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            response_tokens=args.response_tokens,
+            error_rate=args.error_rate,
+        ))
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    if args.max_concurrency:
+        os.environ["OPENAI_MAX_CONCURRENCY"] = str(args.max_concurrency)
+
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)
+    if args.mode == "apptest":
+        args.app = os.path.join(BASE_DIR, args.app)
+    # 앱과 파이프라인이 만드는 캐시/로그/대화 파일이 작업 폴더를 어지럽히지 않도록 임시 폴더에서 실행
+    os.chdir(tempfile.mkdtemp(prefix="benchmark_"))
+
+    print(f"🤖 대상 서버: {base_url}")
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
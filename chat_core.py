@@ -0,0 +1,353 @@
+"""
+Streamlit 없이도 쓸 수 있는 채팅 파이프라인
+
+모델 선택 → 대화 기록 정리 → 요청 메시지 조립 → 응답 캐시 재생/같은 요청 합치기/API 호출 →
+기록 저장까지 한 턴을 처리하는 단계를 두 앱과 일괄 실행기(batch_runner.py)가 함께 사용합니다.
+스트림은 호출하는 쪽이 읽으면서 화면에 그리고, 이 모듈은 st 함수를 쓰지 않습니다.
+"""
+
+import functools
+import time
+from datetime import datetime
+
+from document_index import format_passages
+from generation_control import GenerationRegistry
+from history_manager import HistoryManager, make_summarizer
+from model_router import router_from_env, should_fall_back
+from openai_client import get_client, create_chat_completion, TextStream
+from prompt_assembler import assembler_from_env, split_documents, format_pinned_documents
+from request_coalescer import RequestCoalescer
+from request_hedger import hedger_from_env, SAME_MODEL
+from response_cache import ResponseCache, replay_response
+from stream_renderer import StreamRenderer
+
+# 세션 저장소의 메시지 메타데이터에서 뺄 기록 항목 (메시지 내용과 세션에 이미 있음)
+RECORD_ONLY_FIELDS = ("user_message", "ai_response", "system_prompt")
+
+
+class ChatTurn:
+    """대화 한 턴의 요청 준비 결과와 진행 상태"""
+
+    def __init__(self, prompt, route, assembled, temperature, system_prompt, request_key, use_cache,
+                 cached_response):
+        self.prompt = prompt
+        self.route = route
+        self.assembled = assembled
+        self.messages = assembled.messages
+        self.temperature = temperature
+        self.system_prompt = system_prompt
+        # 같은 요청인지는 (모델, 온도, 시스템 프롬프트, 메시지 기록)으로 판단
+        self.request_key = request_key
+        self.use_cache = use_cache
+        self.cached_response = cached_response
+        # 이 턴이 직접 API를 호출했는지 (다른 요청에 붙었거나 캐시를 재생하면 False)
+        self.called_api = False
+        self.stream = None
+        # 세션 대화일 때만 있는 취소 토큰
+        self.generation = None
+        # 취소되었을 때 {"reason", "generated_tokens", "saved_tokens", "saved_seconds"}
+        self.cancel_stats = None
+        # 헤지 요청을 켰을 때 RequestHedger가 채우는 결과 (기다린 시간, 이긴 쪽과 모델 등)
+        self.hedge = None
+
+
+class ChatPipeline:
+    """대화 한 턴을 준비하고 스트리밍하고 기록합니다. (프로세스 전체에서 하나를 여러 스레드가 사용)
+
+    response_cache가 None이면 응답 캐시를 쓰지 않고, session_store는 세션 대화를 처리할 때만,
+    hedger는 헤지 요청을 쓸 때만 필요합니다.
+    """
+
+    def __init__(self, history_manager, model_router, request_coalescer, prompt_assembler,
+                 generations, response_cache=None, session_store=None, hedger=None):
+        self.history_manager = history_manager
+        self.model_router = model_router
+        self.request_coalescer = request_coalescer
+        self.prompt_assembler = prompt_assembler
+        self.generations = generations
+        self.response_cache = response_cache
+        self.session_store = session_store
+        self.hedger = hedger
+
+    def prepare(self, prompt, history, state, offset=0, system_prompt=None, documents=(),
+                model=None, temperature=0.7, session_id=None):
+        """모델을 고르고 요청 메시지를 조립합니다. (API를 호출하지 않음)
+
+        history는 이번 질문까지 포함한 대화 메시지(offset번째부터)이고, state는 요약 상태를 담는
+        딕셔너리로 조립 결과의 메시지 해시도 여기에 남겨 다음 턴과 비교합니다.
+        documents는 DocumentIndex 목록, model을 주면 라우터가 분류하지 않고 그 모델을 씁니다.
+        """
+        documents = list(documents)
+        route = self.model_router.route(
+            prompt,
+            documents=len(documents),
+            system_prompt=system_prompt,
+            requested_model=model
+        )
+        # 작은 문서는 통째로 고정하고, 큰 문서는 질문과 관련된 구절만 질문 바로 앞에 넣음
+        pinned_documents, searched_documents = split_documents(documents)
+        pinned = format_pinned_documents(pinned_documents)
+        context = format_passages(searched_documents, prompt)
+        # 시스템 프롬프트와 문서가 차지할 토큰을 뺀 나머지 예산 안에서 대화 기록을 줄임
+        reserved_tokens = self.prompt_assembler.extra_tokens(system_prompt, pinned, context)
+        history_messages = self.history_manager.build_messages(
+            history, route.model, state, offset, reserved_tokens=reserved_tokens
+        )
+        assembled = self.prompt_assembler.assemble(
+            history_messages,
+            system_prompt=system_prompt,
+            pinned=pinned,
+            context=context,
+            previous_digests=state.get("prompt_digests")
+        )
+        state["prompt_digests"] = assembled.digests
+        self.prompt_assembler.log(assembled, session=session_id, model=route.model)
+
+        request_key = ResponseCache.make_key(route.model, temperature, system_prompt, assembled.messages)
+        # 결정적인 요청(temperature 0)은 캐시된 응답을 재생
+        use_cache = self.response_cache is not None and self.response_cache.is_cacheable(temperature)
+        cached_response = self.response_cache.get(request_key) if use_cache else None
+        return ChatTurn(prompt, route, assembled, temperature, system_prompt, request_key, use_cache,
+                        cached_response)
+
+    def start_turn(self, session, prompt, documents=(), model=None, temperature=0.7):
+        """세션 대화에 질문을 저장하고 이번 턴을 준비합니다.
+
+        같은 대화에서 아직 진행 중인 이전 생성은 취소하고 이번 턴의 취소 토큰을 등록합니다.
+        """
+        self.session_store.append_message(session, "user", prompt)
+        generation = self.generations.start(session.session_id)
+        try:
+            # 요약된 지점 바로 앞부터만 읽음 (대부분 메모리의 최근 메시지로 충분)
+            context_start = max(0, session.state.get("summarized_count", 0) - 1)
+            turn = self.prepare(
+                prompt,
+                self.session_store.messages_from(session, context_start),
+                session.state,
+                context_start,
+                system_prompt=session.system_prompt,
+                documents=documents,
+                model=model,
+                temperature=temperature,
+                session_id=session.session_id
+            )
+        except BaseException:
+            self.generations.finish(generation)
+            raise
+        turn.generation = generation
+        return turn
+
+    def open_stream(self, turn, on_retry=None, hedge_model=None):
+        """이번 턴의 텍스트 조각 이터러블을 반환합니다.
+
+        캐시된 응답이 있으면 재생하고, 같은 요청이 진행 중이면 그 스트림에 붙고, 아니면 API를 호출합니다.
+        hedge_model을 주면(SAME_MODEL이면 같은 모델) 첫 토큰이 늦을 때 그 모델로 같은 요청을 한 번 더
+        보내고 먼저 응답한 쪽을 씁니다.
+        """
+        if turn.cached_response is not None:
+            turn.stream = replay_response(turn.cached_response)
+            return turn.stream
+
+        def request(candidate, retry_callback):
+            return create_chat_completion(
+                model=candidate,
+                messages=turn.messages,
+                temperature=turn.temperature,
+                stream=True,
+                # 마지막 조각으로 사용량(공급자 캐시가 재사용한 토큰 수 포함)을 받음
+                stream_options={"include_usage": True},
+                on_retry=retry_callback
+            )
+
+        def open_primary(retry_callback):
+            # OpenAI API 호출 (일시적인 오류는 자동 재시도, 계속 실패하면 다음 후보 모델로 전환)
+            return TextStream(self.model_router.call(
+                turn.route, lambda candidate: request(candidate, retry_callback)
+            ))
+
+        def start_request():
+            if hedge_model is None or self.hedger is None:
+                return open_primary(on_retry)
+            second_model = turn.route.model if hedge_model == SAME_MODEL else hedge_model
+            hedged = self.hedger.start(
+                turn.route.model, open_primary,
+                second_model, lambda retry_callback: TextStream(request(second_model, retry_callback)),
+                on_retry=on_retry
+            )
+            turn.hedge = hedged.outcome
+            if hedged.outcome["winner"] == "hedge":
+                turn.route.model = second_model
+            else:
+                # 첫 요청이 다음 후보 모델로 전환되었을 수 있음
+                hedged.outcome["model"] = turn.route.model
+            return hedged
+
+        try:
+            turn.stream = self.request_coalescer.subscribe(turn.request_key, start_request)
+        except BaseException:
+            self._release(turn)
+            raise
+        turn.called_api = not turn.stream.joined
+        if turn.generation is not None:
+            # 취소되면 이 구독을 바로 닫음 (마지막 구독자면 업스트림 연결도 닫힘)
+            turn.generation.on_cancel(turn.stream.close)
+        return turn.stream
+
+    def complete(self, turn, text, stats):
+        """스트림을 끝까지 읽은 턴을 마무리하고 기록을 반환합니다.
+
+        stats는 StreamRenderer.stats()이고, 그 사이 다른 곳에서 취소되었으면 cancel()과 같습니다.
+        """
+        if turn.generation is not None and turn.generation.cancelled:
+            return self.cancel(turn, turn.generation.reason, text, stats)
+        self._release(turn)
+        if turn.called_api:
+            # 첫 토큰이 느렸던 모델은 한동안 다음 후보에게 양보
+            # (화면 기준 시간에는 슬롯 대기와 재시도 대기가 들어가므로 업스트림 응답 시간으로 판단)
+            trace = getattr(turn.stream.flight.upstream, "trace", None)
+            first_token_seconds = trace.upstream_time_to_first_token if trace is not None else None
+            self.model_router.record_success(turn.route, first_token_seconds)
+        if turn.use_cache and turn.cached_response is None:
+            self.response_cache.put(turn.request_key, text)
+        return self.make_record(turn, text, stats)
+
+    def fail(self, turn, error):
+        """스트리밍 중 오류가 난 턴을 정리합니다. 직접 호출한 모델이 일시적인 오류를 냈으면 잠시 뒤로 미룹니다."""
+        self._release(turn)
+        if turn.called_api and should_fall_back(error):
+            self.model_router.record_failure(turn.route.model, error)
+
+    def cancel(self, turn, reason, text, stats):
+        """생성을 취소하고 받은 데까지의 기록을 반환합니다.
+
+        스크립트가 중단되는 중에도 부를 수 있습니다. 아낀 토큰 수와 시간은 turn.cancel_stats에 남깁니다.
+        """
+        if turn.generation is not None:
+            turn.generation.cancel(reason)
+            # 이미 취소되었으면 처음 취소한 이유를 씀
+            reason = turn.generation.reason
+        elif turn.stream is not None and hasattr(turn.stream, "close"):
+            turn.stream.close()
+        self._release(turn)
+        saved_tokens, saved_seconds = self.generations.record_cancel(
+            stats, upstream_closed=getattr(turn.stream, "cancelled_upstream", False)
+        )
+        turn.cancel_stats = {
+            "reason": reason,
+            "generated_tokens": stats["chunks"],
+            "saved_tokens": saved_tokens,
+            "saved_seconds": saved_seconds,
+        }
+        return self.make_record(turn, text, stats, reason)
+
+    def make_record(self, turn, text, stats, cancel_reason=None):
+        """대화 저널에 남길 턴 기록을 만듭니다."""
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "user_message": turn.prompt,
+            "ai_response": text,
+            "model": turn.route.model,
+            "routing": turn.route.to_dict(),
+            "shared_stream": turn.cached_response is None and not turn.called_api,
+            "temperature": turn.temperature,
+            "time_to_first_token": stats["time_to_first_token"],
+            "tokens_per_sec": stats["tokens_per_sec"],
+            "cancelled": cancel_reason
+        }
+        if turn.hedge is not None:
+            record["hedge"] = dict(turn.hedge)
+        if turn.system_prompt is not None:
+            record["system_prompt"] = turn.system_prompt
+        return record
+
+    def save_turn(self, session, record, journal=None):
+        """AI 응답과 요약 상태를 세션 저장소에 저장하고 저널에 덧붙입니다.
+
+        취소되어 받은 내용이 없는 턴은 저장하지 않습니다.
+        """
+        if record["cancelled"] and not record["ai_response"]:
+            return
+        self.session_store.append_message(session, "assistant", record["ai_response"], meta={
+            key: value for key, value in record.items() if key not in RECORD_ONLY_FIELDS
+        })
+        self.session_store.update_session(session, state=session.state)
+        if journal is not None:
+            # 턴이 끝날 때마다 저널에 덧붙여 저장 (비정상 종료에도 기록 보존)
+            journal.append(record)
+
+    def ask(self, prompt, system_prompt=None, model=None, temperature=0.7, on_retry=None, request_id=None,
+            hedge_model=None):
+        """이전 대화 없이 질문 하나를 처리하고 기록을 반환합니다. (오류는 그대로 전달)"""
+        turn = self.prepare(
+            prompt,
+            [{"role": "user", "content": prompt}],
+            {},
+            system_prompt=system_prompt,
+            model=model,
+            temperature=temperature,
+            session_id=request_id
+        )
+        renderer = StreamRenderer(None)
+        stream = self.open_stream(turn, on_retry, hedge_model)
+        try:
+            text = renderer.render(stream)
+        except Exception as e:
+            self.fail(turn, e)
+            raise
+        return self.complete(turn, text, renderer.stats())
+
+    def analyze_image(self, image_data, prompt, mime_type="image/jpeg", on_retry=None):
+        """이미지 분석을 요청하고 기록을 반환합니다. (이미지 단계 모델 중 상태가 좋은 모델 사용)"""
+        route = self.model_router.route(prompt, images=1)
+        started = time.perf_counter()
+        response = self.model_router.call(route, lambda candidate: create_chat_completion(
+            model=candidate,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime_type};base64,{image_data}"
+                            }
+                        }
+                    ]
+                }
+            ],
+            max_tokens=1000,
+            on_retry=on_retry,
+            call_kind="vision"
+        ))
+        # 스트리밍하지 않으므로 응답 전체 시간으로 느린 모델을 판단
+        seconds = time.perf_counter() - started
+        self.model_router.record_success(route, seconds)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "user_message": prompt,
+            "ai_response": response.choices[0].message.content,
+            "model": route.model,
+            "routing": route.to_dict(),
+            "seconds": seconds
+        }
+
+    def _release(self, turn):
+        if turn.generation is not None:
+            self.generations.finish(turn.generation)
+
+
+def pipeline_from_env(use_cache=True):
+    """환경 변수 설정(OPENAI_API_KEY, MODEL_ROUTER_*, PROMPT_LOG, HEDGE_*)으로 앱 밖에서 쓸 파이프라인을 만듭니다."""
+    summarize_completion = functools.partial(create_chat_completion, call_kind="summary")
+    return ChatPipeline(
+        history_manager=HistoryManager(
+            summarizer=make_summarizer(summarize_completion) if get_client() else None
+        ),
+        model_router=router_from_env(),
+        request_coalescer=RequestCoalescer(),
+        prompt_assembler=assembler_from_env(),
+        generations=GenerationRegistry(),
+        response_cache=ResponseCache() if use_cache else None,
+        hedger=hedger_from_env(),
+    )
@@ -0,0 +1,68 @@
+"""
+대화 기록을 턴마다 JSONL 파일에 덧붙여 저장하는 저널 모듈
+
+파일이 일정 크기를 넘으면 번호를 붙여 회전합니다. (선택적으로 gzip 압축)
+세션 ID는 세션 저장소와 같은 것을 씁니다.
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+
+from session_store import new_session_id
+
+DEFAULT_JOURNAL_DIR = "conversations"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+_SEGMENT_RE = re.compile(r"^(?P<session>.+?)(?:\.(?P<number>\d+))?\.jsonl(?P<gz>\.gz)?$")
+
+
+class ConversationJournal:
+    """한 세션의 대화를 턴 단위로 덧붙여 저장하는 저널"""
+
+    def __init__(self, session_id=None, directory=DEFAULT_JOURNAL_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES, compress=True):
+        self.session_id = session_id or new_session_id()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.path = os.path.join(directory, f"{self.session_id}.jsonl")
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        """기록 한 건을 파일 끝에 덧붙입니다."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """현재 파일에 번호를 붙여 보관하고 새 파일을 시작합니다."""
+        number = len(_segments(self.directory, self.session_id))
+        rotated = os.path.join(self.directory, f"{self.session_id}.{number}.jsonl")
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+
+
+def _segments(directory, session_id):
+    """세션의 보관된 파일들을 순서대로 반환합니다. (현재 파일 제외)"""
+    segments = []
+    if not os.path.isdir(directory):
+        return segments
+    for name in os.listdir(directory):
+        match = _SEGMENT_RE.match(name)
+        if match and match.group("session") == session_id and match.group("number"):
+            segments.append((int(match.group("number")), os.path.join(directory, name)))
+    return [path for _, path in sorted(segments)]
+
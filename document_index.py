@@ -0,0 +1,201 @@
+"""
+큰 텍스트 파일을 조각 단위로 읽어 구절로 나누고 BM25로 검색하는 모듈
+
+문서 전체를 대화에 넣는 대신 질문과 관련된 구절만 요청에 포함시키기 위해 사용합니다.
+"""
+
+import codecs
+import json
+import math
+import os
+import re
+from collections import Counter
+
+DEFAULT_INDEX_DIR = os.path.join(".cache", "documents")
+
+# 파일을 읽는 단위와 구절 크기(글자 수)
+READ_CHUNK_BYTES = 64 * 1024
+PASSAGE_CHARS = 1000
+PASSAGE_OVERLAP = 150
+
+# 요청마다 넣을 구절 수
+DEFAULT_TOP_K = 4
+
+# BM25 파라미터
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """검색용 토큰 목록을 만듭니다. 한글 등 비ASCII 단어는 글자 2개씩 나눕니다."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word.isascii() or len(word) < 2:
+            tokens.append(word)
+        else:
+            # 조사가 붙는 언어에서도 부분 일치가 되도록 바이그램 사용
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def iter_text(fileobj, encoding="utf-8", chunk_bytes=READ_CHUNK_BYTES):
+    """바이너리 파일 객체를 조각 단위로 읽어 디코딩된 텍스트를 차례로 돌려줍니다."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while True:
+        block = fileobj.read(chunk_bytes)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def split_passages(texts, passage_chars=PASSAGE_CHARS, overlap=PASSAGE_OVERLAP):
+    """텍스트 조각 스트림을 문단/줄/공백 경계에서 잘라 구절로 만듭니다."""
+    buffer = ""
+    for text in texts:
+        buffer += text
+        start = 0
+        while len(buffer) - start >= passage_chars:
+            cut = _find_cut(buffer, start, start + passage_chars)
+            passage = buffer[start:cut].strip()
+            if passage:
+                yield passage
+            start = cut - overlap if cut - overlap > start else cut
+        buffer = buffer[start:]
+    passage = buffer.strip()
+    if passage:
+        yield passage
+
+
+def _find_cut(buffer, start, end):
+    for separator in ("\n\n", "\n", ". ", " "):
+        position = buffer.rfind(separator, start + (end - start) // 2, end)
+        if position != -1:
+            return position + len(separator)
+    return end
+
+
+class DocumentIndex:
+    """문서 구절에 대한 BM25 검색 색인"""
+
+    def __init__(self, name=""):
+        self.name = name
+        self.passages = []
+        self._term_freqs = []
+        self._lengths = []
+        self._doc_freqs = Counter()
+
+    def add(self, passage):
+        """구절을 색인에 추가합니다."""
+        term_freqs = Counter(tokenize(passage))
+        self.passages.append(passage)
+        self._term_freqs.append(term_freqs)
+        self._lengths.append(sum(term_freqs.values()))
+        self._doc_freqs.update(term_freqs.keys())
+
+    def search(self, query, k=DEFAULT_TOP_K):
+        """질문과 관련 높은 구절을 (점수, 구절 번호) 목록으로 반환합니다."""
+        count = len(self.passages)
+        if count == 0:
+            return []
+        average_length = sum(self._lengths) / count or 1
+        query_terms = set(tokenize(query))
+
+        scores = []
+        for number, term_freqs in enumerate(self._term_freqs):
+            score = 0.0
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[number] / average_length)
+            for term in query_terms:
+                freq = term_freqs.get(term)
+                if not freq:
+                    continue
+                df = self._doc_freqs[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                score += idf * freq * (BM25_K1 + 1) / (freq + length_norm)
+            if score > 0:
+                scores.append((score, number))
+
+        scores.sort(reverse=True)
+        return scores[:k]
+
+    def relevant_passages(self, query, k=DEFAULT_TOP_K):
+        """질문과 관련된 구절을 문서 순서대로 반환합니다.
+
+        작은 문서이거나 일치하는 구절이 없으면 앞부분 구절을 반환합니다.
+        """
+        if len(self.passages) <= k:
+            return list(self.passages)
+        numbers = sorted(number for _, number in self.search(query, k))
+        if not numbers:
+            numbers = range(k)
+        return [self.passages[number] for number in numbers]
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "passages": self.passages,
+            "term_freqs": [dict(term_freqs) for term_freqs in self._term_freqs],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data.get("name", ""))
+        for passage, term_freqs in zip(data["passages"], data["term_freqs"]):
+            term_freqs = Counter(term_freqs)
+            index.passages.append(passage)
+            index._term_freqs.append(term_freqs)
+            index._lengths.append(sum(term_freqs.values()))
+            index._doc_freqs.update(term_freqs.keys())
+        return index
+
+    def __len__(self):
+        return len(self.passages)
+
+
+def build_index(fileobj, key, name="", index_dir=DEFAULT_INDEX_DIR, encoding="utf-8"):
+    """파일을 조각 단위로 읽어 색인을 만들고 디스크에 캐시합니다.
+
+    같은 key(내용 해시)의 색인이 이미 있으면 디스크에서 불러옵니다.
+    """
+    path = os.path.join(index_dir, f"{key}.json")
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = DocumentIndex.from_dict(json.load(f))
+            index.name = name or index.name
+            return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = DocumentIndex(name)
+    for passage in split_passages(iter_text(fileobj, encoding)):
+        index.add(passage)
+
+    os.makedirs(index_dir, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return index
+
+
+def format_passages(documents, query, k=DEFAULT_TOP_K):
+    """여러 문서에서 질문과 관련된 구절을 모아 요청에 넣을 텍스트로 만듭니다."""
+    sections = []
+    for index in documents:
+        passages = index.relevant_passages(query, k)
+        if passages:
+            body = "\n\n".join(f"[{i}] {passage}" for i, passage in enumerate(passages, 1))
+            sections.append(f"### {index.name}\n{body}")
+    if not sections:
+        return None
+    return (
+        "다음은 사용자가 업로드한 문서에서 질문과 관련된 부분입니다. "
+        "답변할 때 참고하세요.\n\n" + "\n\n".join(sections)
+    )
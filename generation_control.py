@@ -0,0 +1,112 @@
+"""
+진행 중인 응답 생성을 취소하는 모듈
+
+대화 세션마다 취소 토큰을 하나씩 두고, 중지 버튼이나 새 질문, 대화 초기화, 화면 재실행으로
+생성을 멈출 때 토큰에 등록된 정리 함수(스트림 닫기)를 바로 실행합니다.
+취소한 생성은 최근 응답들의 길이와 속도로 아낀 토큰 수와 시간을 추정해 누적합니다.
+"""
+
+import threading
+
+from request_metrics import metrics, percentile
+
+
+class CancelToken:
+    """생성 하나의 취소 상태 (다른 스레드에서 취소할 수 있음)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.reason = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    def on_cancel(self, callback):
+        """취소될 때 실행할 함수를 등록합니다. 이미 취소되었으면 바로 실행합니다."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self, reason):
+        """처음 한 번만 취소하고 등록된 함수를 실행합니다. 취소했으면 True를 반환합니다."""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # 이미 닫힌 스트림 등은 무시
+                pass
+        return True
+
+
+class GenerationRegistry:
+    """세션별로 진행 중인 생성을 관리하고 취소로 아낀 양을 누적합니다. (여러 스레드에서 사용)"""
+
+    def __init__(self):
+        self.cancelled = 0
+        self.saved_tokens = 0
+        self.saved_seconds = 0.0
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def start(self, key):
+        """새 생성을 등록하고 취소 토큰을 반환합니다. 같은 세션의 이전 생성은 취소합니다."""
+        token = CancelToken(key)
+        with self._lock:
+            previous = self._tokens.get(key)
+            self._tokens[key] = token
+        if previous is not None:
+            previous.cancel("새 요청이 시작됨")
+        return token
+
+    def cancel(self, key, reason):
+        """세션에서 진행 중인 생성을 취소합니다. 취소할 생성이 있었으면 True를 반환합니다."""
+        with self._lock:
+            token = self._tokens.pop(key, None)
+        return token is not None and token.cancel(reason)
+
+    def finish(self, token):
+        """끝난 생성을 목록에서 뺍니다."""
+        with self._lock:
+            if self._tokens.get(token.key) is token:
+                del self._tokens[token.key]
+
+    def active(self):
+        with self._lock:
+            return len(self._tokens)
+
+    def record_cancel(self, stats, upstream_closed=True, kind="chat"):
+        """취소된 생성의 통계(StreamRenderer.stats())로 아낀 토큰 수와 시간을 추정합니다.
+
+        최근 정상 완료된 호출의 응답 길이/시간 중앙값만큼 생성되었을 것으로 보고,
+        남은 양을 이번 스트림의 속도로 나눕니다. 토큰 수는 request_metrics와 같이
+        스트리밍 조각 하나를 토큰 하나로 셉니다. 다른 세션과 함께 받던 스트림이라
+        업스트림이 계속 진행되면 아낀 양은 0입니다. (아낀 토큰 수, 아낀 시간)을 반환합니다.
+        """
+        saved_tokens = 0
+        saved_seconds = 0.0
+        if upstream_closed:
+            typical_tokens = percentile(metrics.values("completion_tokens", kind), 50)
+            typical_seconds = percentile(metrics.values("total_seconds", kind), 50)
+            if typical_tokens:
+                saved_tokens = max(0, int(typical_tokens) - stats["chunks"])
+            streaming = stats["total_seconds"] - (stats["time_to_first_token"] or 0)
+            if stats["time_to_first_token"] is not None and stats["chunks"] and streaming > 0:
+                saved_seconds = saved_tokens / (stats["chunks"] / streaming)
+            elif typical_seconds:
+                # 첫 토큰 전에 취소됨
+                saved_seconds = max(0.0, typical_seconds - stats["total_seconds"])
+        with self._lock:
+            self.cancelled += 1
+            self.saved_tokens += saved_tokens
+            self.saved_seconds += saved_seconds
+        return saved_tokens, saved_seconds
@@ -0,0 +1,195 @@
+"""
+대화 기록을 모델별 토큰 예산에 맞게 줄이는 모듈
+"""
+
+import hashlib
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 글자 수 기반으로 추정
+    tiktoken = None
+
+# 모델별 요청 토큰 예산 (응답을 위한 여유분을 남겨둔 값)
+MODEL_TOKEN_BUDGETS = {
+    "gpt-3.5-turbo": 12000,
+    "gpt-4": 6000,
+    "gpt-4-turbo-preview": 100000,
+    "gpt-4-turbo": 100000,
+    "gpt-4o": 100000,
+    "gpt-4o-mini": 100000,
+}
+DEFAULT_TOKEN_BUDGET = 6000
+
+# 메시지마다 붙는 역할/구분자 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "지금까지의 이전 대화 요약:\n"
+
+
+def estimate_tokens(text):
+    """텍스트의 토큰 수를 계산합니다."""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        try:
+            return len(_get_encoding().encode(text))
+        except Exception:
+            pass
+    # ASCII는 약 4글자당 1토큰, 한글 등은 1글자당 약 1토큰으로 추정
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def make_summarizer(create_completion, model="gpt-3.5-turbo", max_tokens=300):
+    """chat completion 요청 함수로 오래된 대화를 요약하는 함수를 만듭니다."""
+    def summarize(previous_summary, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        if previous_summary:
+            transcript = f"기존 요약:\n{previous_summary}\n\n추가 대화:\n{transcript}"
+        response = create_completion(
+            model=model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "다음 대화의 핵심 사실, 결정 사항, 사용자 선호를 간결하게 요약하세요."
+                },
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+    return summarize
+
+
+class HistoryManager:
+    """모델별 토큰 예산 안에서 API로 보낼 메시지를 구성합니다."""
+
+    def __init__(self, budgets=None, default_budget=DEFAULT_TOKEN_BUDGET,
+                 summarizer=None, summary_reserve=400, min_recent=2, trim_ratio=0.6):
+        self.budgets = dict(MODEL_TOKEN_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.default_budget = default_budget
+        self.summarizer = summarizer
+        self.summary_reserve = summary_reserve
+        self.min_recent = min_recent
+        # 예산을 넘으면 예산의 이 비율까지 줄여서 요약 호출이 매 턴 일어나지 않도록 함
+        self.trim_ratio = trim_ratio
+
+    def budget_for(self, model):
+        """모델의 토큰 예산을 반환합니다."""
+        return self.budgets.get(model, self.default_budget)
+
+    def count_tokens(self, message):
+        """메시지의 토큰 수를 한 번만 계산하고 메시지에 저장해 둡니다."""
+        if "token_count" not in message:
+            message["token_count"] = estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        return message["token_count"]
+
+    def build_messages(self, messages, model, state, offset=0, reserved_tokens=0):
+        """예산을 넘는 이전 대화를 요약하거나 버리고 API 요청용 메시지를 반환합니다.
+
+        state는 세션별 요약 캐시를 담는 딕셔너리입니다. messages가 전체 대화의
+        offset번째 메시지부터의 일부라면 offset을 함께 넘깁니다. 이미 요약된 지점의
+        바로 앞 메시지부터 들어 있으면 충분합니다. reserved_tokens는 대화 밖에서 요청에 함께
+        들어갈 내용(시스템 프롬프트, 문서)의 토큰 수로, 대화 기록은 모델 예산에서 이를 뺀 만큼만 씁니다.
+
+        요약하지 못했거나 예산 때문에 이번 요청에서 뺀 메시지 수는 state["omitted_count"]에 남기고,
+        요약이 실패했으면 그 오류를 state["summary_error"]에 남깁니다. (다음 턴에 다시 요약을 시도)
+        """
+        model_budget = self.budget_for(model)
+        budget = max(0, model_budget - reserved_tokens)
+        end = offset + len(messages)
+        self._validate_state(messages, state, offset)
+
+        # 요약되지 않은 메시지 중 넘겨받은 범위의 첫 번째 위치
+        first = max(state.get("summarized_count", 0), offset)
+        total = sum(self.count_tokens(m) for m in messages[first - offset:])
+        summary_tokens = state.get("summary_tokens", 0)
+
+        if total + summary_tokens <= budget:
+            split = first
+        else:
+            # 최근 메시지부터 거꾸로 쌓아서 예산 안에 들어가는 지점을 찾음
+            available = int(budget * self.trim_ratio) - self.summary_reserve
+            split = end
+            used = 0
+            while split > first:
+                cost = self.count_tokens(messages[split - 1 - offset])
+                if used + cost > available and end - split >= self.min_recent:
+                    break
+                used += cost
+                split -= 1
+            self._roll_up(messages, split, state, offset)
+
+        result = []
+        if state.get("summary"):
+            result.append({"role": "system", "content": SUMMARY_PREFIX + state["summary"]})
+        summarized = max(state.get("summarized_count", 0), offset)
+        start = max(split, summarized)
+        request_tokens = (
+            state.get("summary_tokens", 0)
+            + sum(self.count_tokens(m) for m in messages[start - offset:])
+        )
+        # min_recent개를 남기느라 예산을 넘으면 가장 오래된 메시지부터 뺌 (이번 질문은 항상 남김)
+        while request_tokens > budget and start < end - 1:
+            request_tokens -= self.count_tokens(messages[start - offset])
+            start += 1
+        result.extend({"role": m["role"], "content": m["content"]} for m in messages[start - offset:])
+
+        state["omitted_count"] = start - summarized
+        state["last_request_tokens"] = request_tokens + reserved_tokens
+        state["last_budget"] = model_budget
+        return result
+
+    def _roll_up(self, messages, split, state, offset=0):
+        """split 이전의 대화를 요약에 합칩니다.
+
+        요약기가 없거나 요약이 실패하면 이전 요약을 그대로 두고 요약한 위치도 옮기지 않습니다.
+        (그 메시지들은 이번 요청에서만 빠지고, 요약기가 있으면 다음 턴에 다시 요약을 시도)
+        """
+        summarized = max(state.get("summarized_count", 0), offset)
+        if split <= summarized or self.summarizer is None:
+            return
+
+        try:
+            summary = self.summarizer(state.get("summary"), messages[summarized - offset:split - offset])
+        except Exception as e:
+            state["summary_error"] = f"{type(e).__name__}: {e}"[:200]
+            return
+        if not summary:
+            state["summary_error"] = "빈 요약"
+            return
+
+        state.pop("summary_error", None)
+        state["summary"] = summary
+        state["summary_tokens"] = estimate_tokens(SUMMARY_PREFIX + summary) + MESSAGE_OVERHEAD_TOKENS
+        state["summarized_count"] = split
+        state["summarized_marker"] = _marker(messages[split - 1 - offset])
+
+    def _validate_state(self, messages, state, offset=0):
+        """대화가 초기화되었거나 바뀌었으면 요약 캐시를 비웁니다."""
+        summarized = state.get("summarized_count", 0)
+        if not summarized or summarized - 1 < offset:
+            # 표식 메시지가 넘겨받은 범위 밖이면 확인할 수 없으므로 그대로 둠
+            return
+        if (offset + len(messages) < summarized
+                or state.get("summarized_marker") != _marker(messages[summarized - 1 - offset])):
+            state.clear()
+
+
+def _marker(message):
+    digest = hashlib.sha1(message["content"].encode("utf-8")).hexdigest()
+    return f"{message['role']}:{digest}"
@@ -0,0 +1,115 @@
+"""
+비전 모델로 보내기 전에 이미지를 줄이고 다시 인코딩하는 모듈
+
+OpenCV/numpy는 가져오는 데 시간이 걸리므로 이미지를 실제로 처리할 때 불러옵니다.
+"""
+
+import base64
+import time
+
+# 비전 모델이 실제로 사용하는 해상도 (2048x2048 안에 맞춘 뒤 짧은 변 768)
+MAX_LONG_SIDE = 2048
+MAX_SHORT_SIDE = 768
+
+# 기본 인코딩 형식과 품질
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 85
+
+_ENCODERS = {
+    "jpeg": (".jpg", "IMWRITE_JPEG_QUALITY", "image/jpeg"),
+    "webp": (".webp", "IMWRITE_WEBP_QUALITY", "image/webp"),
+}
+
+
+def preprocess_image(data, image_format=DEFAULT_FORMAT, quality=DEFAULT_QUALITY,
+                     max_long_side=MAX_LONG_SIDE, max_short_side=MAX_SHORT_SIDE):
+    """이미지 바이트를 모델 해상도로 줄이고 메타데이터 없이 다시 인코딩합니다.
+
+    base64 문자열, MIME 타입, 크기 변화와 인코딩 시간을 담은 딕셔너리를 반환합니다.
+    """
+    if image_format not in _ENCODERS:
+        raise ValueError(f"지원하지 않는 이미지 형식입니다: {image_format}")
+    import cv2
+
+    started = time.perf_counter()
+
+    image = _decode(data)
+    original_height, original_width = image.shape[:2]
+    image = _resize(image, max_long_side, max_short_side)
+    height, width = image.shape[:2]
+
+    # OpenCV로 다시 인코딩하면 EXIF 등 메타데이터는 포함되지 않음
+    extension, quality_flag, mime_type = _ENCODERS[image_format]
+    ok, encoded = cv2.imencode(extension, image, [getattr(cv2, quality_flag), int(quality)])
+    if not ok:
+        raise ValueError("이미지 인코딩에 실패했습니다.")
+    encoded = encoded.tobytes()
+    encoded_b64 = base64.b64encode(encoded).decode()
+
+    return {
+        "base64": encoded_b64,
+        "mime_type": mime_type,
+        "data_url": f"data:{mime_type};base64,{encoded_b64}",
+        "original_size": (original_width, original_height),
+        "size": (width, height),
+        "original_bytes": len(data),
+        "encoded_bytes": len(encoded),
+        "bytes_saved": len(data) - len(encoded),
+        "encode_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+def _decode(data):
+    import cv2
+    import numpy as np
+
+    array = np.frombuffer(data, dtype=np.uint8)
+    if data[:2] == b"\xff\xd8":
+        # JPEG은 EXIF 회전 정보를 적용해서 읽음
+        image = cv2.imdecode(array, cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imdecode(array, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("이미지를 읽을 수 없습니다.")
+
+    if image.dtype != np.uint8:
+        image = (image / 257).astype(np.uint8)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif image.shape[2] == 4:
+        # 투명 영역은 흰 배경에 합성
+        bgr = image[:, :, :3].astype(np.float32)
+        alpha = image[:, :, 3:4].astype(np.float32) / 255.0
+        image = (bgr * alpha + 255.0 * (1.0 - alpha)).astype(np.uint8)
+    return image
+
+
+def _resize(image, max_long_side, max_short_side):
+    import cv2
+
+    height, width = image.shape[:2]
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(1.0, max_long_side / long_side, max_short_side / short_side)
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def format_bytes(size):
+    """바이트 수를 읽기 쉬운 문자열로 바꿉니다."""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def describe(result):
+    """전처리 결과를 한 줄 요약으로 반환합니다."""
+    saved_ratio = result["bytes_saved"] / result["original_bytes"] * 100 if result["original_bytes"] else 0
+    width, height = result["size"]
+    return (
+        f"{format_bytes(result['original_bytes'])} → {format_bytes(result['encoded_bytes'])} "
+        f"({saved_ratio:.0f}% 절감, {width}x{height}, 인코딩 {result['encode_ms']:.0f}ms)"
+    )
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+성능 측정과 오프라인 테스트를 위한 로컬 OpenAI 호환 서버
+
+chat completions API의 스트리밍(SSE)/비스트리밍 응답을 흉내 내며,
+토큰 생성 속도, 첫 토큰 지연, 오류 발생 비율을 설정할 수 있습니다.
+
+사용 예:
+    python mock_openai_server.py --port 8765 --tokens-per-sec 50 --latency 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_WORDS = (
+    "이것은 성능 측정을 위한 모의 응답입니다. The quick brown fox jumps over "
+    "the lazy dog while the benchmark measures streaming latency and throughput."
+).split()
+
+
+class MockSettings:
+    """모의 서버 동작 설정"""
+
+    def __init__(self, tokens_per_sec=50.0, latency=0.2, latency_jitter=0.0,
+                 response_tokens=120, error_rate=0.0, error_status=429):
+        self.tokens_per_sec = tokens_per_sec
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def count_request(self, failed):
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """/v1/chat/completions 요청을 처리하는 핸들러"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"지원하지 않는 경로: {self.path}"}})
+            return
+
+        settings = self.settings
+        failed = random.random() < settings.error_rate
+        settings.count_request(failed)
+        if failed:
+            self._send_error(settings.error_status)
+            return
+
+        delay = settings.latency + random.uniform(0, settings.latency_jitter)
+        time.sleep(delay)
+
+        max_tokens = body.get("max_tokens") or settings.response_tokens
+        tokens = [
+            random.choice(DEFAULT_WORDS) + " "
+            for _ in range(min(settings.response_tokens, max_tokens))
+        ]
+        model = body.get("model", "mock-model")
+        if body.get("stream"):
+            self._stream(tokens, model)
+        else:
+            time.sleep(len(tokens) / settings.tokens_per_sec if settings.tokens_per_sec else 0)
+            self._send_json(200, _completion(model, "".join(tokens), len(tokens)))
+
+    def _stream(self, tokens, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        interval = 1.0 / self.settings.tokens_per_sec if self.settings.tokens_per_sec else 0
+        try:
+            for token in tokens:
+                self._write_event(_chunk(completion_id, model, {"content": token}))
+                if interval:
+                    time.sleep(interval)
+            self._write_event(_chunk(completion_id, model, {}, finish_reason="stop"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 중간에 닫은 경우
+            pass
+
+    def _write_event(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, status):
+        payload = {"error": {"message": "모의 서버가 주입한 오류입니다.", "type": "mock_error"}}
+        headers = {"retry-after-ms": "100"} if status == 429 else {}
+        self._send_json(status, payload, headers)
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """동시 연결이 많아도 대기열이 막히지 않도록 설정한 서버"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, settings):
+        super().__init__(address, MockOpenAIHandler)
+        self.settings = settings
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 유휴 연결을 끊는 것은 정상 동작이므로 무시
+        error = sys.exc_info()[1]
+        if isinstance(error, (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _completion(model, content, completion_tokens):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": completion_tokens,
+            "total_tokens": completion_tokens,
+        },
+    }
+
+
+def start_server(settings=None, host="127.0.0.1", port=0):
+    """백그라운드 스레드에서 모의 서버를 시작하고 (서버, base_url)을 반환합니다."""
+    server = MockOpenAIServer((host, port), settings or MockSettings())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="초당 생성 토큰 수")
+    parser.add_argument("--latency", type=float, default=0.2, help="첫 토큰까지의 지연(초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="지연에 더할 무작위 값의 최대치(초)")
+    parser.add_argument("--response-tokens", type=int, default=120, help="응답 토큰 수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류를 반환할 비율 (0~1)")
+    parser.add_argument("--error-status", type=int, default=429, help="주입할 오류의 HTTP 상태 코드")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        tokens_per_sec=args.tokens_per_sec,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    server = MockOpenAIServer((args.host, args.port), settings)
+    print(f"🤖 모의 OpenAI 서버: http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n요청 {settings.requests}건, 주입한 오류 {settings.errors}건")
+
+
+if __name__ == "__main__":
+    main()
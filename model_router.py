@@ -0,0 +1,279 @@
+"""
+요청마다 알맞은 모델을 고르는 라우터
+
+질문 길이, 첨부 파일(문서/이미지), 시스템 프롬프트만 보고 요청을 단계(tier)로 나누므로
+API 없이도 결정을 시험해 볼 수 있습니다. 단계마다 모델 후보를 순서대로 두고,
+오류가 나거나 첫 토큰이 느린 모델은 잠시 뒤로 미뤄 다음 후보로 자동 전환합니다.
+모든 결정과 그 이유는 JSONL 로그에 남깁니다.
+
+단계별 모델은 MODEL_ROUTER_TIERS 환경 변수로 바꿀 수 있습니다.
+    MODEL_ROUTER_TIERS="fast=gpt-4o-mini,gpt-3.5-turbo;standard=gpt-4o;vision=gpt-4o"
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import openai
+
+from history_manager import estimate_tokens
+
+# 단계별 모델 후보 (앞에 있을수록 먼저 사용)
+DEFAULT_TIERS = {
+    "fast": ["gpt-4o-mini", "gpt-3.5-turbo"],
+    "standard": ["gpt-4o", "gpt-4-turbo"],
+    "vision": ["gpt-4o", "gpt-4o-mini"],
+}
+
+TIER_LABELS = {
+    "fast": "빠른 모델",
+    "standard": "표준 모델",
+    "vision": "이미지 모델",
+    "manual": "직접 선택",
+}
+
+# 이 시간(초)보다 첫 토큰이 늦으면 느린 모델로 보고 잠시 뒤로 미룸
+DEFAULT_SLOW_SECONDS = {"fast": 4.0, "standard": 10.0, "vision": 30.0}
+
+# 오류가 난 모델을 뒤로 미루는 시간(초). 연속으로 실패하면 두 배씩 늘림
+ERROR_COOLDOWN_SECONDS = 30.0
+MAX_COOLDOWN_SECONDS = 300.0
+SLOW_COOLDOWN_SECONDS = 60.0
+
+# 분류 기준 (토큰 수는 estimate_tokens 추정값)
+LONG_PROMPT_TOKENS = 400
+LONG_SYSTEM_PROMPT_TOKENS = 300
+
+# 있으면 표준 모델로 보내는 표현 (단계별 추론이나 긴 답이 필요한 요청)
+REASONING_HINTS = (
+    "분석", "비교", "설계", "증명", "디버그", "리팩터", "최적화", "단계별",
+    "analyze", "compare", "design", "prove", "debug", "refactor", "step by step",
+)
+
+DEFAULT_LOG_PATH = os.path.join(".cache", "routing.jsonl")
+
+# 메모리에 남겨 둘 최근 결정 수 (화면 표시용)
+RECENT_DECISIONS = 50
+
+
+def parse_tiers(text):
+    """"fast=a,b;standard=c" 형식의 문자열을 단계별 모델 목록으로 바꿉니다."""
+    tiers = {}
+    for part in (text or "").split(";"):
+        if "=" not in part:
+            continue
+        tier, models = part.split("=", 1)
+        models = [model.strip() for model in models.split(",") if model.strip()]
+        if tier.strip() and models:
+            tiers[tier.strip()] = models
+    return tiers
+
+
+def classify_request(prompt, documents=0, images=0, system_prompt=None):
+    """요청을 단계로 분류하고 (단계, 이유 목록)을 반환합니다. (API를 호출하지 않음)"""
+    if images:
+        return "vision", [f"이미지 첨부 {images}개"]
+
+    reasons = []
+    prompt_tokens = estimate_tokens(prompt or "")
+    if prompt_tokens >= LONG_PROMPT_TOKENS:
+        reasons.append(f"긴 질문 (약 {prompt_tokens:,} 토큰)")
+    if "```" in (prompt or ""):
+        reasons.append("코드 블록 포함")
+    lowered = (prompt or "").lower()
+    hints = [hint for hint in REASONING_HINTS if hint in lowered]
+    if hints:
+        reasons.append(f"추론이 필요한 요청 ('{hints[0]}')")
+    if documents:
+        reasons.append(f"첨부 문서 {documents}개 참고")
+    system_tokens = estimate_tokens(system_prompt or "")
+    if system_tokens >= LONG_SYSTEM_PROMPT_TOKENS:
+        reasons.append(f"긴 시스템 프롬프트 (약 {system_tokens:,} 토큰)")
+
+    if reasons:
+        return "standard", reasons
+    return "fast", [f"짧은 질문 (약 {prompt_tokens:,} 토큰)"]
+
+
+# 다른 모델로 넘어갈 오류: 일시적인 오류(요청 한도, 연결, 시간 초과, 서버 오류)와 모델이 없는 경우
+# 잘못된 요청(400/422)이나 인증 오류는 어느 모델이든 같으므로 그대로 사용자에게 보여 줌
+FALLBACK_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+    openai.NotFoundError,
+)
+
+
+def should_fall_back(error):
+    """다른 모델로 다시 시도해 볼 만한 오류인지 확인합니다."""
+    if isinstance(error, FALLBACK_ERRORS):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class RouteDecision:
+    """요청 한 건의 라우팅 결정"""
+
+    def __init__(self, tier, models, reasons):
+        self.tier = tier
+        # 시도할 순서대로 정렬한 후보
+        self.models = models
+        self.reasons = reasons
+        # 실제로 응답한 모델 (다음 후보로 넘어가면 바뀜)
+        self.model = models[0]
+        # (모델, 넘어간 이유) 목록
+        self.fallbacks = []
+
+    def describe(self):
+        text = f"{self.model} ({TIER_LABELS.get(self.tier, self.tier)}) · {', '.join(self.reasons)}"
+        if self.fallbacks:
+            text += " · 전환: " + ", ".join(f"{model} {reason}" for model, reason in self.fallbacks)
+        return text
+
+    def to_dict(self):
+        return {
+            "tier": self.tier,
+            "model": self.model,
+            "reasons": self.reasons,
+            "fallbacks": [list(item) for item in self.fallbacks],
+        }
+
+
+class ModelRouter:
+    """단계별 모델 후보 중에서 상태가 좋은 모델을 골라 요청을 보냅니다. (여러 스레드에서 사용)"""
+
+    def __init__(self, tiers=None, slow_seconds=None, log_path=None,
+                 error_cooldown=ERROR_COOLDOWN_SECONDS, slow_cooldown=SLOW_COOLDOWN_SECONDS):
+        self.tiers = {tier: list(models) for tier, models in DEFAULT_TIERS.items()}
+        if tiers:
+            self.tiers.update(tiers)
+        self.slow_seconds = dict(DEFAULT_SLOW_SECONDS)
+        if slow_seconds:
+            self.slow_seconds.update(slow_seconds)
+        self.log_path = log_path
+        self.error_cooldown = error_cooldown
+        self.slow_cooldown = slow_cooldown
+        self.recent = deque(maxlen=RECENT_DECISIONS)
+        self.fallback_count = 0
+        # 모델별 상태: {"failures": 연속 실패 수, "until": 뒤로 미루는 시각, "reason": 이유}
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def route(self, prompt, documents=0, images=0, system_prompt=None, requested_model=None):
+        """요청을 분류하고 시도할 모델 순서를 정합니다.
+
+        requested_model을 주면 분류하지 않고 그 모델만 사용합니다.
+        """
+        if requested_model:
+            decision = RouteDecision("manual", [requested_model], ["사용자가 직접 선택"])
+        else:
+            tier, reasons = classify_request(prompt, documents, images, system_prompt)
+            models, skipped = self.candidates(tier)
+            reasons = reasons + [f"{model} 건너뜀 ({reason})" for model, reason in skipped]
+            decision = RouteDecision(tier, models, reasons)
+        self._log("route", decision)
+        return decision
+
+    def candidates(self, tier):
+        """단계의 모델을 시도할 순서로 반환합니다. 뒤로 미룬 모델은 풀리는 시각 순서로 맨 뒤에 둡니다.
+
+        (모델 목록, [(건너뛴 모델, 이유)])를 반환합니다.
+        """
+        models = self.tiers.get(tier) or self.tiers["standard"]
+        now = time.monotonic()
+        with self._lock:
+            penalized = sorted(
+                (model for model in models if self._health.get(model, {}).get("until", 0) > now),
+                key=lambda model: self._health[model]["until"]
+            )
+            skipped = [(model, self._health[model]["reason"]) for model in penalized]
+        return [model for model in models if model not in penalized] + penalized, skipped
+
+    def call(self, decision, request):
+        """request(model)을 후보 순서대로 호출해서 처음 성공한 응답을 반환합니다.
+
+        다른 모델로 넘어갈 만한 오류면 그 모델을 뒤로 미루고 다음 후보를 시도합니다.
+        """
+        last_error = None
+        for model in decision.models:
+            try:
+                response = request(model)
+            except Exception as e:
+                if not should_fall_back(e):
+                    raise
+                self.record_failure(model, e)
+                last_error = e
+                decision.fallbacks.append((model, type(e).__name__))
+                continue
+            if decision.model != model:
+                decision.model = model
+                with self._lock:
+                    self.fallback_count += 1
+                self._log("fallback", decision)
+            return response
+        raise last_error
+
+    def record_success(self, decision, first_token_seconds):
+        """응답이 끝난 뒤 첫 토큰 시간을 알려 주면, 느린 모델은 잠시 뒤로 미룹니다."""
+        limit = self.slow_seconds.get(decision.tier)
+        if limit is not None and first_token_seconds is not None and first_token_seconds > limit:
+            self._penalize(decision.model, self.slow_cooldown, f"첫 토큰 {first_token_seconds:.1f}초")
+            self._log("slow", decision, seconds=first_token_seconds)
+            return
+        with self._lock:
+            self._health.pop(decision.model, None)
+
+    def record_failure(self, model, error):
+        """오류가 난 모델을 뒤로 미룹니다. 연속으로 실패할수록 오래 미룹니다."""
+        with self._lock:
+            failures = self._health.get(model, {}).get("failures", 0) + 1
+        cooldown = min(MAX_COOLDOWN_SECONDS, self.error_cooldown * (2 ** (failures - 1)))
+        self._penalize(model, cooldown, type(error).__name__, failures)
+        self._write({"event": "error", "model": model, "error": str(error)[:200], "failures": failures})
+
+    def health(self):
+        """뒤로 미룬 모델과 남은 시간(초), 이유를 반환합니다."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: (state["until"] - now, state["reason"])
+                for model, state in self._health.items() if state["until"] > now
+            }
+
+    def _penalize(self, model, seconds, reason, failures=0):
+        with self._lock:
+            self._health[model] = {
+                "failures": failures,
+                "until": time.monotonic() + seconds,
+                "reason": reason,
+            }
+
+    def _log(self, event, decision, **extra):
+        entry = {"event": event, **decision.to_dict(), **extra}
+        with self._lock:
+            self.recent.append(entry)
+        self._write(entry)
+
+    def _write(self, entry):
+        if not self.log_path:
+            return
+        line = json.dumps({"time": time.time(), **entry}, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def router_from_env():
+    """환경 변수(MODEL_ROUTER_TIERS, MODEL_ROUTER_LOG)로 설정한 라우터를 만듭니다."""
+    log_path = os.getenv("MODEL_ROUTER_LOG") or DEFAULT_LOG_PATH
+    return ModelRouter(
+        tiers=parse_tiers(os.getenv("MODEL_ROUTER_TIERS")),
+        log_path=log_path if log_path.lower() != "off" else None,
+    )
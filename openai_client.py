@@ -0,0 +1,333 @@
+"""
+여러 세션이 함께 쓰는 OpenAI 클라이언트 모듈
+
+HTTP 연결을 프로세스 전체에서 재사용하고, 동시 요청 수를 제한하며,
+일시적인 오류(429/5xx/연결 오류)는 지터가 있는 지수 백오프로 재시도합니다.
+모든 호출은 request_metrics에 대기/응답 시간과 토큰 수 등을 기록합니다.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from request_metrics import metrics
+
+# 동시에 진행할 수 있는 API 요청 수
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# 재시도 설정
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+BASE_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+# 연결 풀 크기와 요청 제한 시간
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+REQUEST_TIMEOUT = 120.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_lock = threading.Lock()
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def _connection_limits():
+    # openai 패키지가 사용하는 HTTP 라이브러리의 Limits 타입을 그대로 사용
+    limits_type = type(openai.DEFAULT_CONNECTION_LIMITS)
+    return limits_type(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+def _resolve_api_key(api_key):
+    return api_key or os.getenv("OPENAI_API_KEY")
+
+
+def get_client(api_key=None):
+    """연결 풀을 공유하는 동기 클라이언트를 반환합니다. API 키가 없으면 None을 반환합니다."""
+    api_key = _resolve_api_key(api_key)
+    if not api_key:
+        return None
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                max_retries=0,  # 재시도는 이 모듈에서 직접 처리
+                timeout=REQUEST_TIMEOUT,
+                http_client=openai.DefaultHttpxClient(limits=_connection_limits()),
+            )
+            _clients[api_key] = client
+        return client
+
+
+def get_async_client(api_key=None):
+    """현재 이벤트 루프용 비동기 클라이언트를 반환합니다. API 키가 없으면 None을 반환합니다."""
+    api_key = _resolve_api_key(api_key)
+    if not api_key:
+        return None
+    loop_state = _get_loop_state()
+    client = loop_state["clients"].get(api_key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=0,
+            timeout=REQUEST_TIMEOUT,
+            http_client=openai.DefaultAsyncHttpxClient(limits=_connection_limits()),
+        )
+        loop_state["clients"][api_key] = client
+    return client
+
+
+def _get_loop_state():
+    # 비동기 클라이언트와 세마포어는 이벤트 루프마다 따로 만들어야 함
+    loop = asyncio.get_running_loop()
+    with _lock:
+        state = _async_clients.get(loop)
+        if state is None:
+            state = {
+                "clients": {},
+                "slots": asyncio.Semaphore(MAX_CONCURRENT_REQUESTS),
+            }
+            _async_clients[loop] = state
+        return state
+
+
+def retry_delay(attempt, error=None):
+    """재시도 전에 기다릴 시간(초)을 계산합니다. 서버가 알려준 대기 시간을 우선합니다."""
+    retry_after = _retry_after_seconds(error)
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_DELAY)
+    backoff = min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * (2 ** attempt))
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def _missing_key_error():
+    return openai.OpenAIError("OPENAI_API_KEY가 설정되지 않았습니다.")
+
+
+def _start_trace(call_kind, kwargs):
+    return metrics.start(call_kind, kwargs.get("model"), kwargs.get("stream"), kwargs.get("messages"))
+
+
+def create_chat_completion(on_retry=None, api_key=None, call_kind="chat", **kwargs):
+    """재시도와 동시성 제한을 적용해 chat completion을 요청합니다.
+
+    on_retry(attempt, delay, error)는 재시도하기 전에 호출됩니다.
+    요청 슬롯은 시도할 때마다 얻고 재시도 대기 중에는 반납합니다. stream=True이면 응답을
+    다 읽거나 close()할 때까지 슬롯을 유지합니다.
+    call_kind는 지표에서 호출 종류(chat, vision, summary 등)를 구분하는 이름입니다.
+    """
+    client = get_client(api_key)
+    if client is None:
+        raise _missing_key_error()
+
+    trace = _start_trace(call_kind, kwargs)
+    try:
+        attempt = 0
+        while True:
+            waiting_since = time.perf_counter()
+            _request_slots.acquire()
+            trace.acquired(time.perf_counter() - waiting_since)
+            try:
+                response = client.chat.completions.create(**kwargs)
+                break
+            except RETRYABLE_ERRORS as e:
+                # 기다리는 동안 다른 요청이 슬롯을 쓸 수 있도록 반납
+                _request_slots.release()
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt, e)
+                attempt += 1
+                trace.retried()
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                time.sleep(delay)
+            except BaseException:
+                _request_slots.release()
+                raise
+    except BaseException as e:
+        trace.finish(e)
+        raise
+
+    if kwargs.get("stream"):
+        return GuardedStream(response, _request_slots.release, trace)
+    _request_slots.release()
+    trace.observe_response(response)
+    trace.finish()
+    return response
+
+
+async def acreate_chat_completion(on_retry=None, api_key=None, call_kind="chat", **kwargs):
+    """create_chat_completion의 asyncio 버전입니다."""
+    client = get_async_client(api_key)
+    if client is None:
+        raise _missing_key_error()
+
+    trace = _start_trace(call_kind, kwargs)
+    slots = _get_loop_state()["slots"]
+    try:
+        attempt = 0
+        while True:
+            waiting_since = time.perf_counter()
+            await slots.acquire()
+            trace.acquired(time.perf_counter() - waiting_since)
+            try:
+                response = await client.chat.completions.create(**kwargs)
+                break
+            except RETRYABLE_ERRORS as e:
+                slots.release()
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt, e)
+                attempt += 1
+                trace.retried()
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                await asyncio.sleep(delay)
+            except BaseException:
+                slots.release()
+                raise
+    except BaseException as e:
+        trace.finish(e)
+        raise
+
+    if kwargs.get("stream"):
+        return AsyncGuardedStream(response, slots.release, trace)
+    slots.release()
+    trace.observe_response(response)
+    trace.finish()
+    return response
+
+
+class GuardedStream:
+    """스트리밍 응답이 끝나거나 닫힐 때 요청 슬롯을 반납하고 측정을 마치는 래퍼
+
+    close()는 여러 스레드에서 동시에 불러도 슬롯을 한 번만 반납합니다.
+    """
+
+    def __init__(self, stream, release, trace=None):
+        self.stream = stream
+        self.trace = trace
+        self._release = release
+        self._error = None
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                if self.trace is not None:
+                    self.trace.observe_chunk(chunk)
+                yield chunk
+            if self.trace is not None:
+                self.trace.completed = True
+        except Exception as e:
+            self._error = e
+            raise
+        finally:
+            self.close()
+
+    def close(self):
+        """업스트림 연결을 닫고 요청 슬롯을 반납합니다."""
+        with self._lock:
+            release, self._release = self._release, None
+        if release is not None:
+            try:
+                self.stream.close()
+            finally:
+                release()
+                if self.trace is not None:
+                    self.trace.finish(self._error)
+
+    def __del__(self):
+        self.close()
+
+
+class TextStream:
+    """스트리밍 응답에서 텍스트 조각만 차례로 돌려주는 래퍼
+
+    cancel()은 다른 스레드에서 불러도 되며, 읽는 중인 업스트림 연결을 바로 닫습니다.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    @property
+    def trace(self):
+        """감싼 스트림의 측정값 (GuardedStream이 아니면 None)"""
+        return getattr(self.stream, "trace", None)
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def cancel(self):
+        self.stream.close()
+
+    def close(self):
+        self.stream.close()
+
+
+class AsyncGuardedStream:
+    """비동기 스트리밍 응답이 끝나거나 닫힐 때 요청 슬롯을 반납하고 측정을 마치는 래퍼"""
+
+    def __init__(self, stream, release, trace=None):
+        self.stream = stream
+        self.trace = trace
+        self._release = release
+        self._error = None
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                if self.trace is not None:
+                    self.trace.observe_chunk(chunk)
+                yield chunk
+            if self.trace is not None:
+                self.trace.completed = True
+        except Exception as e:
+            self._error = e
+            raise
+        finally:
+            await self.close()
+
+    async def close(self):
+        """업스트림 연결을 닫고 요청 슬롯을 반납합니다."""
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                await self.stream.close()
+            finally:
+                release()
+                if self.trace is not None:
+                    self.trace.finish(self._error)
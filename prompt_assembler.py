@@ -0,0 +1,191 @@
+"""
+요청 메시지를 바뀌지 않는 앞부분부터 차례로 조립하는 모듈
+
+시스템 프롬프트 → 고정 문서 → 대화 요약과 이전 턴 → 질문 관련 구절 → 이번 질문 순서로 놓아서,
+다음 턴의 요청이 이번 요청을 앞부분 그대로 포함하게 합니다. 그러면 공급자의 프롬프트 캐시가
+앞부분을 재사용할 수 있습니다. 질문마다 바뀌는 내용(검색한 구절)은 항상 질문 바로 앞에 둡니다.
+
+구간별 토큰 수는 내용 해시로 기억해 두어 같은 내용을 다시 세지 않고,
+요청마다 구간별 토큰 수와 이전 요청과 같은(캐시될 수 있는) 앞부분 길이를 JSONL 로그에 남깁니다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from document_index import DEFAULT_TOP_K
+from history_manager import estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+
+DEFAULT_LOG_PATH = os.path.join(".cache", "prompt_log.jsonl")
+
+# 토큰 수를 기억해 둘 메시지 수
+TOKEN_CACHE_ENTRIES = 4096
+
+# 구간 이름 (조립 순서대로, 앞쪽일수록 잘 바뀌지 않음)
+SEGMENT_LABELS = {
+    "system": "시스템",
+    "pinned": "고정 문서",
+    "turns": "대화",
+    "context": "참고 구절",
+    "question": "질문",
+}
+
+PINNED_HEADER = "다음은 사용자가 업로드한 문서입니다. 답변할 때 참고하세요.\n\n"
+
+
+def message_digest(message):
+    """메시지의 역할과 내용으로 짧은 해시를 만듭니다."""
+    payload = f"{message['role']}\n{message['content']}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def split_documents(documents, max_passages=DEFAULT_TOP_K):
+    """문서를 (통째로 고정할 작은 문서, 질문마다 구절을 검색할 큰 문서)로 나눕니다.
+
+    검색해도 모든 구절이 들어갈 만큼 작은 문서는 고정 구간에 두어야 요청마다 내용이 같습니다.
+    """
+    pinned = [document for document in documents if len(document) <= max_passages]
+    searched = [document for document in documents if len(document) > max_passages]
+    return pinned, searched
+
+
+def format_pinned_documents(documents):
+    """문서 전체를 고정 구간에 넣을 텍스트로 만듭니다. 문서가 없으면 None."""
+    sections = [
+        f"### {document.name}\n" + "\n\n".join(document.passages)
+        for document in documents
+    ]
+    if not sections:
+        return None
+    return PINNED_HEADER + "\n\n".join(sections)
+
+
+def _extra_segments(system_prompt, pinned, context):
+    return {
+        "system": [{"role": "system", "content": system_prompt}] if system_prompt else [],
+        "pinned": [{"role": "system", "content": pinned}] if pinned else [],
+        "context": [{"role": "system", "content": context}] if context else [],
+    }
+
+
+class AssembledPrompt:
+    """조립한 요청 메시지와 구간별 토큰 수"""
+
+    def __init__(self, messages, segments, digests, message_tokens, reused_messages):
+        self.messages = messages
+        # 구간 이름 → 토큰 수
+        self.segments = segments
+        # 메시지별 해시 (다음 요청과 앞부분을 비교할 때 사용)
+        self.digests = digests
+        self.total_tokens = sum(message_tokens)
+        # 이전 요청과 똑같은 앞부분 (공급자 캐시가 재사용할 수 있는 부분)
+        self.reused_messages = reused_messages
+        self.reused_tokens = sum(message_tokens[:reused_messages])
+        self.uncached_tokens = self.total_tokens - self.reused_tokens
+
+    def describe(self):
+        parts = " · ".join(
+            f"{SEGMENT_LABELS[name]} {tokens:,}" for name, tokens in self.segments.items() if tokens
+        )
+        return f"{parts} 토큰 (앞부분 {self.reused_tokens:,} 토큰은 이전 요청과 같음)"
+
+    def to_dict(self):
+        return {
+            "segments": self.segments,
+            "total_tokens": self.total_tokens,
+            "reused_tokens": self.reused_tokens,
+            "uncached_tokens": self.uncached_tokens,
+        }
+
+
+class PromptAssembler:
+    """요청 메시지를 구간 순서대로 조립합니다. (여러 스레드에서 사용)"""
+
+    def __init__(self, log_path=None, cache_entries=TOKEN_CACHE_ENTRIES):
+        self.log_path = log_path
+        self.cache_entries = cache_entries
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def assemble(self, history, system_prompt=None, pinned=None, context=None, previous_digests=None):
+        """요청 메시지를 조립합니다.
+
+        history는 HistoryManager.build_messages의 결과(요약, 이전 턴, 마지막이 이번 질문)이고,
+        pinned는 고정 문서 텍스트, context는 이번 질문과 관련된 구절입니다.
+        previous_digests로 이전 요청의 digests를 넘기면 같은 앞부분의 길이를 계산합니다.
+        """
+        extra = _extra_segments(system_prompt, pinned, context)
+        parts = [
+            ("system", extra["system"]),
+            ("pinned", extra["pinned"]),
+            ("turns", list(history[:-1])),
+            ("context", extra["context"]),
+            ("question", list(history[-1:])),
+        ]
+        messages = []
+        digests = []
+        message_tokens = []
+        segments = {}
+        for name, segment_messages in parts:
+            segments[name] = 0
+            for message in segment_messages:
+                digest = message_digest(message)
+                tokens = self._count(digest, message)
+                messages.append({"role": message["role"], "content": message["content"]})
+                digests.append(digest)
+                message_tokens.append(tokens)
+                segments[name] += tokens
+
+        reused = 0
+        for digest, previous in zip(digests, previous_digests or []):
+            if digest != previous:
+                break
+            reused += 1
+        return AssembledPrompt(messages, segments, digests, message_tokens, reused)
+
+    def extra_tokens(self, system_prompt=None, pinned=None, context=None):
+        """대화 밖 구간(시스템 프롬프트, 고정 문서, 참고 구절)의 토큰 수를 반환합니다.
+
+        대화 기록을 줄이기 전에 이만큼을 모델 예산에서 먼저 빼 둡니다. (센 값은 assemble에서 재사용)
+        """
+        return sum(
+            self._count(message_digest(message), message)
+            for segment_messages in _extra_segments(system_prompt, pinned, context).values()
+            for message in segment_messages
+        )
+
+    def log(self, assembled, **fields):
+        """요청 한 건의 구간별 토큰 수와 재사용 가능한 앞부분 길이를 로그에 덧붙입니다."""
+        if not self.log_path:
+            return
+        entry = {"time": time.time(), **fields, **assembled.to_dict()}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _count(self, digest, message):
+        # 같은 메시지는 다시 세지 않음 (이전 턴과 시스템 프롬프트는 매 요청 반복됨)
+        with self._lock:
+            tokens = self._tokens.get(digest)
+            if tokens is not None:
+                self._tokens.move_to_end(digest)
+                return tokens
+        tokens = estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._tokens[digest] = tokens
+            while len(self._tokens) > self.cache_entries:
+                self._tokens.popitem(last=False)
+        return tokens
+
+
+def assembler_from_env():
+    """환경 변수 PROMPT_LOG로 로그 파일을 정한 조립기를 만듭니다. ('off'면 기록하지 않음)"""
+    log_path = os.getenv("PROMPT_LOG") or DEFAULT_LOG_PATH
+    return PromptAssembler(log_path if log_path.lower() != "off" else None)
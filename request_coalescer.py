@@ -0,0 +1,177 @@
+"""
+같은 요청이 동시에 여러 번 들어오면 업스트림 스트림 하나를 함께 쓰게 하는 모듈
+
+모델/온도/시스템 프롬프트/메시지 기록이 같은 요청이 아직 스트리밍 중이면
+새 API 호출을 하지 않고 진행 중인 스트림에 붙어서, 그때까지 받은 조각부터 차례로 받습니다.
+업스트림은 별도 스레드가 읽으므로 처음 요청한 세션이 중간에 떠나도 나머지는 계속 받고,
+구독자가 모두 떠나면 업스트림 연결을 닫습니다.
+"""
+
+import threading
+
+
+class _Flight:
+    """진행 중인 요청 하나 (받은 조각을 모두 보관해서 늦게 붙은 구독자도 처음부터 받음)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        # start()가 돌려준 업스트림 (cancel()이 있으면 마지막 구독자가 떠날 때 바로 끊음)
+        self.upstream = None
+        self.condition = threading.Condition()
+
+
+class Subscription:
+    """진행 중인 요청의 텍스트 조각을 차례로 돌려주는 이터러블
+
+    다 읽거나 close()하면(또는 가비지 컬렉션되면) 구독을 한 번만 해제합니다.
+    """
+
+    def __init__(self, coalescer, flight, joined):
+        self.flight = flight
+        # 이미 진행 중인 요청에 붙었는지 (False면 이 구독자가 API를 호출함)
+        self.joined = joined
+        # 이 구독자가 떠나면서 업스트림을 끊었는지
+        self.cancelled_upstream = False
+        self.closed = False
+        self._coalescer = coalescer
+
+    def __iter__(self):
+        flight = self.flight
+        index = 0
+        try:
+            while True:
+                with flight.condition:
+                    while index >= len(flight.chunks) and not flight.done and not self.closed:
+                        flight.condition.wait()
+                    if self.closed:
+                        return
+                    new_chunks = flight.chunks[index:]
+                    index += len(new_chunks)
+                    finished = flight.done and index >= len(flight.chunks)
+                yield from new_chunks
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self.close()
+
+    def close(self):
+        """구독을 해제합니다. 다른 스레드에서 불러도 되며, 마지막 구독자면 업스트림도 닫힙니다."""
+        coalescer, self._coalescer = self._coalescer, None
+        if coalescer is not None:
+            self.cancelled_upstream = coalescer._unsubscribe(self.flight)
+            with self.flight.condition:
+                self.closed = True
+                self.flight.condition.notify_all()
+
+    def __del__(self):
+        self.close()
+
+
+class RequestCoalescer:
+    """요청 키별로 진행 중인 스트림을 공유합니다. (프로세스 전체에서 하나를 여러 스레드가 사용)"""
+
+    def __init__(self):
+        self.started = 0
+        self.joined = 0
+        self.cancelled = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, start):
+        """key가 같은 요청이 진행 중이면 그 스트림에 붙고, 없으면 start()로 새로 시작합니다.
+
+        start()는 텍스트 조각 이터러블을 반환해야 하며, 호출한 스레드에서 실행되므로
+        재시도 안내처럼 화면을 갱신하는 콜백을 써도 됩니다. start()의 오류는 그대로 전달되고,
+        그 사이에 붙은 구독자들도 같은 오류를 받습니다.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if joined:
+                self.joined += 1
+            else:
+                flight = _Flight(key)
+                self._flights[key] = flight
+                self.started += 1
+            with flight.condition:
+                flight.subscribers += 1
+        subscription = Subscription(self, flight, joined)
+        if joined:
+            return subscription
+
+        try:
+            chunks = start()
+        except Exception as e:
+            self._finish(flight, e)
+            raise
+        except BaseException:
+            # 요청을 시작한 쪽의 스크립트가 중단됨 (중단 신호를 다른 구독자에게 넘기지 않음)
+            self._finish(flight, RuntimeError("같은 요청을 시작한 세션이 요청을 중단했습니다."))
+            raise
+        flight.upstream = chunks
+        threading.Thread(
+            target=self._pump, args=(flight, chunks), name="request-coalescer", daemon=True
+        ).start()
+        return subscription
+
+    def in_flight(self):
+        """진행 중인 요청별 구독자 수를 반환합니다."""
+        with self._lock:
+            return {key: flight.subscribers for key, flight in self._flights.items()}
+
+    def _pump(self, flight, chunks):
+        # 업스트림을 읽어 구독자들에게 나눠 줌 (구독자가 모두 떠나면 중단)
+        error = None
+        try:
+            for chunk in chunks:
+                with flight.condition:
+                    abandoned = flight.subscribers == 0
+                    if not abandoned:
+                        flight.chunks.append(chunk)
+                        flight.condition.notify_all()
+                if abandoned:
+                    break
+        except Exception as e:
+            error = e
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self._finish(flight, error)
+
+    def _finish(self, flight, error):
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        with flight.condition:
+            flight.error = error
+            flight.done = True
+            flight.condition.notify_all()
+
+    def _unsubscribe(self, flight):
+        # 마지막 구독자가 끝나기 전에 떠나서 업스트림을 끊었으면 True
+        with self._lock:
+            with flight.condition:
+                flight.subscribers -= 1
+                abandoned = flight.subscribers == 0 and not flight.done
+            if abandoned:
+                self.cancelled += 1
+                if self._flights.get(flight.key) is flight:
+                    # 더 붙을 수 없게 바로 뺌
+                    del self._flights[flight.key]
+        if not abandoned:
+            return False
+        cancel = getattr(flight.upstream, "cancel", None)
+        if cancel is not None:
+            # 다음 조각을 기다리지 않고 연결을 바로 닫음 (_pump는 읽기 오류로 끝남)
+            try:
+                cancel()
+            except Exception:
+                pass
+        return True
@@ -0,0 +1,236 @@
+"""
+첫 토큰이 늦는 요청에 같은 요청을 한 번 더 보내는(헤지) 모듈
+
+요청을 보낸 뒤 최근 첫 토큰 시간의 백분위(기본 p95)만큼 기다려도 첫 토큰이 오지 않으면
+같은 메시지로 두 번째 요청을 보내고(다른 모델로 보낼 수도 있음), 먼저 텍스트를 보낸 스트림을
+쓰고 다른 쪽은 바로 닫습니다.
+
+헤지 요청 비율, 두 번째 요청이 이긴 횟수와 줄어든 지연 시간(하한)은 RequestHedger에 누적합니다.
+지연 기준은 HEDGE_PERCENTILE(백분위)이나 HEDGE_DELAY(고정 초) 환경 변수로 바꿀 수 있습니다.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from request_metrics import metrics, percentile
+
+# 헤지 모델로 이번 요청의 모델을 그대로 쓸 때 넘기는 값
+SAME_MODEL = "same"
+
+DEFAULT_PERCENTILE = 95
+
+# 최근 첫 토큰 시간이 이보다 적으면 기본 지연을 씀
+MIN_SAMPLES = 20
+DEFAULT_DELAY_SECONDS = 3.0
+MIN_DELAY_SECONDS = 0.25
+MAX_DELAY_SECONDS = 30.0
+
+
+class _Attempt:
+    """헤지 경쟁 중인 요청 하나 (별도 스레드가 스트림을 읽어 이벤트 큐에 넣음)"""
+
+    def __init__(self, label, model):
+        # "primary" 또는 "hedge"
+        self.label = label
+        self.model = model
+        self.started_at = time.perf_counter()
+        self.first_chunk_at = None
+        self._stream = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self, open_stream, events):
+        # open_stream(on_retry)는 텍스트 조각 이터러블(TextStream)을 반환해야 함
+        try:
+            stream = open_stream(lambda *args: events.put((self, "retry", args)))
+            with self._lock:
+                self._stream = stream
+                cancelled = self._cancelled
+            if cancelled:
+                stream.cancel()
+                return
+            for chunk in stream:
+                if self.first_chunk_at is None:
+                    self.first_chunk_at = time.perf_counter()
+                events.put((self, "chunk", chunk))
+            events.put((self, "done", None))
+        except Exception as e:
+            events.put((self, "error", e))
+
+    def cancel(self):
+        """다른 스레드에서 불러도 되며, 읽는 중인 연결을 바로 닫습니다."""
+        with self._lock:
+            self._cancelled = True
+            stream = self._stream
+        if stream is not None:
+            try:
+                stream.cancel()
+            except Exception:
+                pass
+
+
+class HedgedStream:
+    """경쟁에서 이긴 요청의 텍스트 조각을 차례로 돌려주는 이터러블
+
+    outcome에는 기다린 시간, 헤지 여부, 이긴 쪽과 모델, 두 번째 요청이 이겼을 때 줄어든 시간(하한)이 들어갑니다.
+    """
+
+    def __init__(self, winner, first_chunk, events, attempts, outcome):
+        self.winner = winner
+        self.outcome = outcome
+        self._first_chunk = first_chunk
+        self._events = events
+        self._attempts = attempts
+
+    @property
+    def trace(self):
+        """이긴 요청의 측정값"""
+        return getattr(self.winner._stream, "trace", None) if self.winner is not None else None
+
+    def __iter__(self):
+        if self.winner is None:
+            return
+        yield self._first_chunk
+        while True:
+            attempt, kind, payload = self._events.get()
+            if attempt is not self.winner:
+                continue
+            if kind == "chunk":
+                yield payload
+            elif kind == "error":
+                raise payload
+            elif kind == "done":
+                return
+
+    def cancel(self):
+        for attempt in self._attempts:
+            attempt.cancel()
+
+    def close(self):
+        self.cancel()
+
+
+class RequestHedger:
+    """요청별 헤지 경쟁을 실행하고 통계를 누적합니다. (프로세스 전체에서 하나를 여러 스레드가 사용)"""
+
+    def __init__(self, hedge_percentile=DEFAULT_PERCENTILE, fixed_delay=None,
+                 min_samples=MIN_SAMPLES, default_delay=DEFAULT_DELAY_SECONDS):
+        self.hedge_percentile = hedge_percentile
+        self.fixed_delay = fixed_delay
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        # 두 번째 요청이 이겨서 줄어든 첫 토큰 시간 합계 (하한)
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self, kind="chat"):
+        """두 번째 요청을 보내기 전에 기다릴 시간(초)을 최근 첫 토큰 시간의 백분위로 정합니다."""
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        values = metrics.values("time_to_first_token", kind)
+        if len(values) < self.min_samples:
+            return self.default_delay
+        return min(MAX_DELAY_SECONDS, max(MIN_DELAY_SECONDS, percentile(values, self.hedge_percentile)))
+
+    def start(self, primary_model, open_primary, hedge_model, open_hedge, on_retry=None, kind="chat"):
+        """첫 요청을 보내고, 첫 토큰이 늦으면 두 번째 요청을 보내서 먼저 온 쪽의 스트림을 반환합니다.
+
+        open_primary(on_retry)/open_hedge(on_retry)는 텍스트 조각 이터러블을 반환해야 하며
+        별도 스레드에서 실행됩니다. 첫 조각이 올 때까지는 호출한 스레드에서 기다리므로, 첫 요청의
+        재시도 안내(on_retry)는 호출한 스레드에서 실행됩니다. (두 번째 요청의 재시도는 알리지 않음)
+        두 요청이 모두 실패하면 마지막 오류를 전달합니다.
+        """
+        delay = self.delay(kind)
+        events = queue.Queue()
+        primary = _Attempt("primary", primary_model)
+        attempts = [primary]
+        self._launch(primary, open_primary, events)
+        with self._lock:
+            self.requests += 1
+        outcome = {"delay": delay, "hedged": False, "winner": "primary", "model": primary_model,
+                   "saved_seconds": None}
+
+        hedge = None
+        finished = 0
+        try:
+            while True:
+                timeout = None
+                if hedge is None:
+                    timeout = max(0.0, primary.started_at + delay - time.perf_counter())
+                try:
+                    attempt, event, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    # 첫 토큰이 기준보다 늦음 → 같은 요청을 한 번 더 보냄
+                    hedge = _Attempt("hedge", hedge_model)
+                    attempts.append(hedge)
+                    self._launch(hedge, open_hedge, events)
+                    outcome["hedged"] = True
+                    with self._lock:
+                        self.hedged += 1
+                    continue
+                if event == "retry":
+                    if attempt is primary and on_retry is not None:
+                        on_retry(*payload)
+                    continue
+                if event == "chunk":
+                    winner = attempt
+                    first_chunk = payload
+                    break
+                # 텍스트 없이 끝났거나 실패함 (다른 요청이 진행 중이면 그쪽을 기다림)
+                finished += 1
+                if finished == len(attempts):
+                    if event == "error":
+                        raise payload
+                    return HedgedStream(None, None, events, attempts, outcome)
+        except BaseException:
+            for attempt in attempts:
+                attempt.cancel()
+            raise
+
+        outcome["winner"] = winner.label
+        outcome["model"] = winner.model
+        if winner is hedge:
+            # 첫 요청은 닫는 시점까지 첫 토큰이 없었으므로, 그때까지 걸린 시간에서 두 번째 요청의
+            # 첫 토큰 시간을 뺀 값을 줄어든 시간의 하한으로 봄
+            primary_elapsed = time.perf_counter() - primary.started_at
+            hedge_first_token = hedge.first_chunk_at - hedge.started_at
+            outcome["saved_seconds"] = max(0.0, primary_elapsed - hedge_first_token)
+        # 진 요청은 바로 닫아서 토큰과 동시 요청 슬롯을 쓰지 않도록 함
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+        if winner is hedge:
+            with self._lock:
+                self.hedge_wins += 1
+                self.saved_seconds += outcome["saved_seconds"]
+        return HedgedStream(winner, first_chunk, events, attempts, outcome)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    @staticmethod
+    def _launch(attempt, open_stream, events):
+        threading.Thread(
+            target=attempt.run, args=(open_stream, events), name=f"hedge-{attempt.label}", daemon=True
+        ).start()
+
+
+def hedger_from_env():
+    """환경 변수 HEDGE_PERCENTILE(기본 95), HEDGE_DELAY(고정 초)로 설정한 헤지 실행기를 만듭니다."""
+    fixed_delay = os.getenv("HEDGE_DELAY")
+    return RequestHedger(
+        hedge_percentile=float(os.getenv("HEDGE_PERCENTILE") or DEFAULT_PERCENTILE),
+        fixed_delay=float(fixed_delay) if fixed_delay else None,
+    )
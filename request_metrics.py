@@ -0,0 +1,334 @@
+"""
+OpenAI API 호출마다 대기/응답 시간, 토큰 수, 전송량, 재시도와 오류를 기록하는 모듈
+
+누적 값은 Prometheus 텍스트 형식으로 파일(node_exporter textfile 수집기용)에 쓰거나
+HTTP 엔드포인트로 내보낼 수 있고, 최근 호출들은 백분위 요약으로 볼 수 있습니다.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from history_manager import estimate_tokens
+
+# 최근 호출 기록 수 (백분위 요약용)
+RECENT_CALLS = 1000
+
+# 지표 파일을 다시 쓰는 최소 간격(초)
+WRITE_INTERVAL_SECONDS = 5.0
+
+DEFAULT_METRICS_DIR = os.path.join(".cache", "metrics")
+
+# 시간 히스토그램 버킷(초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 기록하는 시간 항목: (필드 이름, Prometheus 지표 이름, 설명)
+TIMINGS = (
+    ("queue_wait", "openai_queue_wait_seconds", "동시 요청 슬롯을 기다린 시간"),
+    ("time_to_first_token", "openai_time_to_first_token_seconds", "요청부터 첫 토큰까지의 시간"),
+    ("stream_seconds", "openai_stream_seconds", "첫 토큰부터 스트림이 끝날 때까지의 시간"),
+    ("total_seconds", "openai_request_seconds", "요청 전체에 걸린 시간"),
+)
+
+# 누적하는 양: (필드 이름, Prometheus 지표 이름, 설명)
+TOTALS = (
+    ("retries", "openai_retries_total", "재시도 횟수"),
+    ("prompt_tokens", "openai_prompt_tokens_total", "프롬프트 토큰 수"),
+    ("cached_prompt_tokens", "openai_cached_prompt_tokens_total", "공급자 프롬프트 캐시가 재사용한 토큰 수"),
+    ("completion_tokens", "openai_completion_tokens_total", "응답 토큰 수"),
+    ("request_bytes", "openai_request_bytes_total", "요청 본문 크기"),
+    ("response_bytes", "openai_response_bytes_total", "응답 텍스트 크기"),
+)
+
+
+def percentile(values, p):
+    """선형 보간으로 백분위 값을 계산합니다."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class CallTrace:
+    """API 호출 한 건의 측정값을 모읍니다."""
+
+    def __init__(self, registry, kind, model, stream, messages):
+        self.registry = registry
+        self.kind = kind
+        self.model = model or "unknown"
+        self.stream = bool(stream)
+        self.started = time.perf_counter()
+        # 마지막 시도를 보낸 시각 (슬롯을 얻자마자 보냄)
+        self.sent_at = None
+        # 요청 슬롯을 기다린 시간 합계 (재시도할 때마다 슬롯을 다시 얻음)
+        self.queue_wait = 0.0
+        self.first_token_at = None
+        self.retries = 0
+        self.chunks = 0
+        self.response_bytes = 0
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.cached_prompt_tokens = None
+        self.completed = False
+        self._finished = False
+        messages = messages or []
+        self.request_bytes = len(json.dumps(messages, ensure_ascii=False, default=str).encode("utf-8"))
+        self._estimated_prompt_tokens = sum(
+            estimate_tokens(m["content"]) for m in messages if isinstance(m.get("content"), str)
+        )
+
+    def acquired(self, waited):
+        """요청 슬롯을 얻을 때까지 기다린 시간을 더합니다."""
+        self.queue_wait += waited
+        self.sent_at = time.perf_counter()
+
+    @property
+    def upstream_time_to_first_token(self):
+        """마지막 시도를 보낸 뒤 첫 토큰이 올 때까지 걸린 시간 (슬롯 대기와 재시도 대기는 빠짐)"""
+        if self.first_token_at is None or self.sent_at is None:
+            return None
+        return self.first_token_at - self.sent_at
+
+    def retried(self):
+        self.retries += 1
+
+    def observe_chunk(self, chunk):
+        """스트리밍 조각 하나를 기록합니다."""
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self.observe_usage(usage)
+        if not chunk.choices:
+            return
+        text = chunk.choices[0].delta.content
+        if text:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.chunks += 1
+            self.response_bytes += len(text.encode("utf-8"))
+
+    def observe_response(self, response):
+        """스트리밍이 아닌 응답을 기록합니다."""
+        self.first_token_at = time.perf_counter()
+        if response.usage is not None:
+            self.observe_usage(response.usage)
+        for choice in response.choices:
+            self.response_bytes += len((choice.message.content or "").encode("utf-8"))
+        self.completed = True
+
+    def observe_usage(self, usage):
+        self.prompt_tokens = usage.prompt_tokens
+        self.completion_tokens = usage.completion_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_prompt_tokens = getattr(details, "cached_tokens", None)
+
+    def finish(self, error=None):
+        """호출이 끝났을 때 한 번만 기록을 남깁니다."""
+        if self._finished:
+            return
+        self._finished = True
+        now = time.perf_counter()
+        if error is not None:
+            status = "error"
+        elif self.completed:
+            status = "ok"
+        else:
+            # 스트림을 끝까지 읽지 않고 닫음
+            status = "cancelled"
+        self.registry.record({
+            "kind": self.kind,
+            "model": self.model,
+            "stream": self.stream,
+            "status": status,
+            "error": type(error).__name__ if error is not None else None,
+            "queue_wait": self.queue_wait,
+            "time_to_first_token": (
+                self.first_token_at - self.started if self.first_token_at is not None else None
+            ),
+            "stream_seconds": (
+                now - self.first_token_at if self.stream and self.first_token_at is not None else None
+            ),
+            "total_seconds": now - self.started,
+            "retries": self.retries,
+            # 서버가 사용량을 알려주지 않으면 추정값 사용 (스트리밍 조각 하나 ≈ 토큰 하나)
+            "prompt_tokens": (
+                self.prompt_tokens if self.prompt_tokens is not None else self._estimated_prompt_tokens
+            ),
+            "completion_tokens": (
+                self.completion_tokens if self.completion_tokens is not None else self.chunks
+            ),
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "timestamp": time.time(),
+        })
+
+
+class MetricsRegistry:
+    """호출 기록을 모아 누적 지표와 최근 호출 요약을 제공합니다. (여러 스레드에서 사용)"""
+
+    def __init__(self, path=None, recent_calls=RECENT_CALLS, write_interval=WRITE_INTERVAL_SECONDS, pid=None):
+        self.path = path
+        # 서버 프로세스마다 파일을 따로 쓰므로 모든 시계열에 프로세스 번호를 붙여 겹치지 않게 함
+        self.pid = pid if pid is not None else os.getpid()
+        self.write_interval = write_interval
+        self.recent = deque(maxlen=recent_calls)
+        self._counts = {}
+        self._totals = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def start(self, kind, model=None, stream=False, messages=None):
+        """새 호출의 측정을 시작합니다."""
+        return CallTrace(self, kind, model, stream, messages)
+
+    def record(self, call):
+        labels = (call["kind"], call["model"], call["status"])
+        with self._lock:
+            self.recent.append(call)
+            self._counts[labels] = self._counts.get(labels, 0) + 1
+            totals = self._totals.setdefault(call["kind"], dict.fromkeys(name for name, _, _ in TOTALS))
+            for name, _, _ in TOTALS:
+                totals[name] = (totals[name] or 0) + (call[name] or 0)
+            for name, _, _ in TIMINGS:
+                value = call[name]
+                if value is None:
+                    continue
+                histogram = self._histograms.setdefault(
+                    (name, call["kind"]), {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+                )
+                for index, bound in enumerate(LATENCY_BUCKETS):
+                    if value <= bound:
+                        histogram["buckets"][index] += 1
+                histogram["sum"] += value
+                histogram["count"] += 1
+            due = self.path and time.monotonic() - self._last_write >= self.write_interval
+            if due:
+                self._last_write = time.monotonic()
+        if due:
+            self.write_file()
+
+    def upstream_requests(self, kind=None):
+        """지금까지 서버로 보낸 요청 수를 반환합니다. (재시도 포함, 최근 호출 기록 수와 무관)"""
+        with self._lock:
+            calls = sum(count for (call_kind, _, _), count in self._counts.items()
+                        if kind is None or call_kind == kind)
+            retries = sum(totals["retries"] or 0 for call_kind, totals in self._totals.items()
+                          if kind is None or call_kind == kind)
+        return calls + retries
+
+    def values(self, name, kind=None, status="ok"):
+        """최근 호출 중 조건에 맞는 호출의 값 목록을 반환합니다."""
+        with self._lock:
+            return [
+                call[name] for call in self.recent
+                if (kind is None or call["kind"] == kind)
+                and call["status"] == status and call[name] is not None
+            ]
+
+    def summary(self, kind=None):
+        """최근 호출의 백분위 요약을 반환합니다."""
+        with self._lock:
+            calls = [call for call in self.recent if kind is None or call["kind"] == kind]
+        result = {
+            "calls": len(calls),
+            "errors": sum(1 for call in calls if call["status"] == "error"),
+            "cancelled": sum(1 for call in calls if call["status"] == "cancelled"),
+        }
+        for name, _, _ in TOTALS:
+            result[name] = sum(call[name] or 0 for call in calls)
+        for name, _, _ in TIMINGS:
+            values = [call[name] for call in calls if call[name] is not None]
+            result[name] = {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+        return result
+
+    def render_prometheus(self):
+        """누적 지표를 Prometheus 텍스트 형식으로 반환합니다."""
+        lines = []
+        process = f'pid="{self.pid}"'
+        with self._lock:
+            lines.append("# HELP openai_requests_total API 호출 수")
+            lines.append("# TYPE openai_requests_total counter")
+            for (kind, model, status), count in sorted(self._counts.items()):
+                lines.append(
+                    f'openai_requests_total{{{process},kind="{kind}",model="{model}",status="{status}"}} {count}'
+                )
+            for name, metric, help_text in TOTALS:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for kind, totals in sorted(self._totals.items()):
+                    lines.append(f'{metric}{{{process},kind="{kind}"}} {totals[name] or 0}')
+            for name, metric, help_text in TIMINGS:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (field, kind), histogram in sorted(self._histograms.items()):
+                    if field != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                        lines.append(f'{metric}_bucket{{{process},kind="{kind}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{{process},kind="{kind}",le="+Inf"}} {histogram["count"]}')
+                    lines.append(f'{metric}_sum{{{process},kind="{kind}"}} {histogram["sum"]:.6f}')
+                    lines.append(f'{metric}_count{{{process},kind="{kind}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self):
+        """지표 파일을 원자적으로 다시 씁니다."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, self.path)
+
+    def remove_file(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        data = self.server.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(registry, port, host="127.0.0.1"):
+    """/metrics 엔드포인트를 백그라운드 스레드에서 제공합니다."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _default_registry():
+    # 서버 프로세스마다 따로 파일을 쓰고, 종료할 때 지움
+    path = os.getenv("OPENAI_METRICS_FILE") or os.path.join(
+        DEFAULT_METRICS_DIR, f"openai_{os.getpid()}.prom"
+    )
+    registry = MetricsRegistry(path if path.lower() != "off" else None)
+    atexit.register(registry.remove_file)
+    return registry
+
+
+# 프로세스 전체에서 공유하는 기본 레지스트리
+metrics = _default_registry()
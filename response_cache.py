@@ -0,0 +1,126 @@
+"""
+결정적인(temperature 0) 요청의 응답을 디스크에 저장해 두는 SQLite 캐시 모듈
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "responses.sqlite3")
+
+
+def replay_response(text, chunk_size=24):
+    """캐시된 응답을 스트리밍 응답처럼 조각 단위로 돌려줍니다."""
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+class ResponseCache:
+    """(모델, 온도, 시스템 프롬프트, 메시지 기록)을 키로 하는 LRU/TTL 응답 캐시"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=1000, ttl_seconds=7 * 24 * 3600,
+                 max_temperature=0.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def is_cacheable(self, temperature):
+        """같은 입력에 같은 응답을 기대할 수 있는 요청인지 확인합니다."""
+        return temperature <= self.max_temperature
+
+    @staticmethod
+    def make_key(model, temperature, system_prompt, messages):
+        """요청 내용으로 캐시 키를 만듭니다."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": round(float(temperature), 3),
+                "system_prompt": system_prompt,
+                "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """캐시된 응답을 반환하고, 없거나 만료되었으면 None을 반환합니다."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """응답을 저장하고 오래된 항목을 정리합니다."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """만료된 항목과 최대 개수를 넘는 가장 오래 사용되지 않은 항목을 지웁니다."""
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        """캐시를 모두 비웁니다."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,355 @@
+"""
+대화 세션을 Streamlit 세션 메모리 대신 디스크에 저장하는 모듈
+
+메시지는 한 줄씩 저장하고, 자주 쓰는 세션의 최근 메시지만 메모리(LRU)에 올려 둡니다.
+오래된 메시지는 화면이나 요청에 필요할 때 페이지 단위로 읽어 옵니다.
+여러 서버 프로세스가 같은 SQLite 파일을 함께 쓸 수 있도록, 메모리의 세션은
+사용할 때마다 저장소의 버전과 비교해서 바뀌었으면 다시 읽습니다.
+
+세션마다 만든 사람(owner)을 함께 저장해서, 세션 목록은 같은 owner의 세션만 보여 줍니다.
+"""
+
+import abc
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "sessions.sqlite3")
+
+# 메모리에 올려 둘 세션 수, 세션당 최근 메시지 수, 유휴 세션을 내릴 시간(초)
+DEFAULT_MAX_SESSIONS = 128
+DEFAULT_RECENT_MESSAGES = 40
+DEFAULT_IDLE_SECONDS = 30 * 60
+
+# 유휴 세션 정리를 시도하는 최소 간격(초)
+EVICT_INTERVAL_SECONDS = 60
+
+
+def new_session_id():
+    """URL에 넣을 수 있는 새 세션 ID를 만듭니다."""
+    return uuid.uuid4().hex
+
+
+class Session:
+    """메모리에 올려 둔 세션 (설정과 최근 메시지만 보관)"""
+
+    def __init__(self, session_id, system_prompt=None, state=None, message_count=0,
+                 version=0, recent=None):
+        self.session_id = session_id
+        self.system_prompt = system_prompt
+        self.state = state if state is not None else {}
+        self.message_count = message_count
+        self.version = version
+        # 전체 대화의 마지막 len(recent)개 메시지
+        self.recent = recent if recent is not None else []
+        self.last_access = time.monotonic()
+
+    @property
+    def recent_offset(self):
+        """recent의 첫 메시지가 전체 대화에서 몇 번째인지"""
+        return self.message_count - len(self.recent)
+
+
+class SessionStore(abc.ABC):
+    """세션 저장소의 공통 동작 (메모리 LRU, 유휴 세션 정리, 페이지 단위 읽기)
+
+    저장 방식은 하위 클래스가 _create, _load_meta, _load_range, _insert,
+    _save_meta, _list, _delete를 구현해서 정합니다.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, recent_messages=DEFAULT_RECENT_MESSAGES,
+                 idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.recent_messages = recent_messages
+        self.idle_seconds = idle_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_evict = time.monotonic()
+
+    def create_session(self, system_prompt=None, owner=None):
+        """새 세션을 만들어 반환합니다. owner를 주면 그 owner의 세션 목록에 나타납니다."""
+        session_id = new_session_id()
+        self._create(session_id, system_prompt, owner)
+        session = Session(session_id, system_prompt)
+        with self._lock:
+            self._remember(session)
+        return session
+
+    def get_session(self, session_id):
+        """세션을 반환합니다. 없으면 None.
+
+        메모리에 있으면 저장소의 버전만 확인하고, 다른 프로세스가 바꿨으면 다시 읽습니다.
+        """
+        self.evict_idle()
+        meta = self._load_meta(session_id) if session_id else None
+        if meta is None:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.version == meta["version"]:
+                self.hits += 1
+                self._remember(session)
+                return session
+            self.misses += 1
+
+        start = max(0, meta["message_count"] - self.recent_messages)
+        session = Session(
+            session_id,
+            system_prompt=meta["system_prompt"],
+            state=meta["state"],
+            message_count=meta["message_count"],
+            version=meta["version"],
+            recent=self._load_range(session_id, start, meta["message_count"]),
+        )
+        with self._lock:
+            self._remember(session)
+        return session
+
+    def append_message(self, session, role, content, meta=None):
+        """메시지 한 개를 세션 끝에 저장합니다."""
+        message = {"role": role, "content": content}
+        if meta:
+            message["meta"] = meta
+        with self._lock:
+            seq, version = self._insert(session.session_id, role, content, meta)
+            if seq != session.message_count:
+                # 다른 프로세스가 그 사이에 메시지를 추가함 → 다음에 다시 읽음
+                self._sessions.pop(session.session_id, None)
+            session.message_count = seq + 1
+            session.version = version
+            session.recent.append(message)
+            del session.recent[:-self.recent_messages]
+        return message
+
+    def update_session(self, session, system_prompt=None, state=None):
+        """세션의 시스템 프롬프트나 대화 요약 상태를 저장합니다."""
+        with self._lock:
+            if system_prompt is not None:
+                session.system_prompt = system_prompt
+            if state is not None:
+                session.state = state
+            session.version = self._save_meta(session.session_id, session.system_prompt, session.state)
+
+    def load_messages(self, session_id, start, end=None):
+        """start번째부터 end번째 전까지의 메시지를 저장소에서 읽습니다."""
+        return self._load_range(session_id, start, end)
+
+    def messages_from(self, session, start):
+        """start번째 메시지부터 끝까지 반환합니다. 최근 메시지로 충분하면 저장소를 읽지 않습니다."""
+        offset = session.recent_offset
+        if start >= offset:
+            return session.recent[start - offset:]
+        return self._load_range(session.session_id, start, offset) + session.recent
+
+    def list_sessions(self, owner, limit=50):
+        """owner가 만든 세션을 최근에 사용한 순서로 (세션 ID, 메시지 수, 마지막 사용 시각) 목록으로 반환합니다.
+
+        다른 사람의 대화가 보이지 않도록 owner가 없으면 빈 목록을 반환합니다.
+        """
+        if not owner:
+            return []
+        return self._list(owner, limit)
+
+    def delete_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self._delete(session_id)
+
+    def evict_idle(self, force=False):
+        """오래 쓰지 않은 세션을 메모리에서 내립니다. (저장소의 기록은 그대로)"""
+        now = time.monotonic()
+        if not force and now - self._last_evict < EVICT_INTERVAL_SECONDS:
+            return 0
+        self._last_evict = now
+        with self._lock:
+            idle = [
+                session_id for session_id, session in self._sessions.items()
+                if now - session.last_access > self.idle_seconds
+            ]
+            for session_id in idle:
+                del self._sessions[session_id]
+            self.evictions += len(idle)
+        return len(idle)
+
+    def cached_sessions(self):
+        return len(self._sessions)
+
+    def _remember(self, session):
+        session.last_access = time.monotonic()
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    @abc.abstractmethod
+    def _create(self, session_id, system_prompt, owner):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _load_meta(self, session_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _load_range(self, session_id, start, end):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _insert(self, session_id, role, content, meta):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _save_meta(self, session_id, system_prompt, state):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _list(self, owner, limit):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _delete(self, session_id):
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite 파일에 세션을 저장하는 저장소 (여러 프로세스가 함께 사용 가능)"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    owner TEXT,
+                    system_prompt TEXT,
+                    state TEXT,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    meta TEXT,
+                    PRIMARY KEY (session_id, seq)
+                ) WITHOUT ROWID
+                """
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if "owner" not in columns:
+                # owner 열이 없던 저장소 (이전 세션은 owner가 없어 어느 목록에도 나오지 않음)
+                conn.execute("ALTER TABLE sessions ADD COLUMN owner TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_owner ON sessions(owner, updated_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create(self, session_id, system_prompt, owner):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, owner, system_prompt, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, '{}', ?, ?)",
+                (session_id, owner, system_prompt, now, now)
+            )
+
+    def _load_meta(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT system_prompt, state, message_count, version FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "system_prompt": row[0],
+            "state": json.loads(row[1] or "{}"),
+            "message_count": row[2],
+            "version": row[3],
+        }
+
+    def _load_range(self, session_id, start, end):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT role, content, meta FROM messages "
+                "WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, end if end is not None else 2 ** 62)
+            ).fetchall()
+        messages = []
+        for role, content, meta in rows:
+            message = {"role": role, "content": content}
+            if meta:
+                message["meta"] = json.loads(meta)
+            messages.append(message)
+        return messages
+
+    def _insert(self, session_id, role, content, meta):
+        meta_json = json.dumps(meta, ensure_ascii=False, separators=(",", ":")) if meta else None
+        with self._connect() as conn:
+            # 여러 프로세스가 동시에 추가해도 번호가 겹치지 않도록 쓰기 잠금을 먼저 잡음
+            conn.execute("BEGIN IMMEDIATE")
+            seq, version = conn.execute(
+                "SELECT message_count, version FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO messages (session_id, seq, role, content, meta) VALUES (?, ?, ?, ?, ?)",
+                (session_id, seq, role, content, meta_json)
+            )
+            conn.execute(
+                "UPDATE sessions SET message_count = ?, version = ?, updated_at = ? WHERE session_id = ?",
+                (seq + 1, version + 1, time.time(), session_id)
+            )
+        return seq, version + 1
+
+    def _save_meta(self, session_id, system_prompt, state):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET system_prompt = ?, state = ?, version = version + 1, updated_at = ? "
+                "WHERE session_id = ?",
+                (system_prompt, json.dumps(state, ensure_ascii=False, separators=(",", ":")),
+                 time.time(), session_id)
+            )
+            return conn.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def _list(self, owner, limit):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT session_id, message_count, updated_at FROM sessions "
+                "WHERE owner = ? AND message_count > 0 ORDER BY updated_at DESC LIMIT ?",
+                (owner, limit)
+            ).fetchall()
+
+    def _delete(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
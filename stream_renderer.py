@@ -0,0 +1,101 @@
+"""
+스트리밍 응답을 모아서 일정 간격으로만 화면을 다시 그리는 렌더러 모듈
+"""
+
+import time
+
+from history_manager import estimate_tokens
+
+# 기본 재표시 간격(초)과 재표시를 강제하는 누적 글자 수
+DEFAULT_REPAINT_INTERVAL = 0.1
+DEFAULT_REPAINT_CHARS = 400
+
+CURSOR = "▌"
+
+
+class StreamRenderer:
+    """스트리밍 조각을 버퍼에 모으고 간격/글자 수 기준으로만 placeholder를 갱신합니다.
+
+    placeholder가 None이면 화면 없이 응답과 통계만 모읍니다.
+    """
+
+    def __init__(self, placeholder, repaint_interval=DEFAULT_REPAINT_INTERVAL,
+                 repaint_chars=DEFAULT_REPAINT_CHARS):
+        self.placeholder = placeholder
+        self.repaint_interval = repaint_interval
+        self.repaint_chars = repaint_chars
+
+        self._pending = []
+        self._pending_chars = 0
+        self._text = ""
+        self.chunks = 0
+        self._last_paint = 0.0
+        self.repaints = 0
+
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+
+    def write(self, delta):
+        """응답 조각을 추가하고, 필요할 때만 화면을 갱신합니다."""
+        if not delta:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+
+        self._pending.append(delta)
+        self.chunks += 1
+        self._pending_chars += len(delta)
+
+        if (now - self._last_paint >= self.repaint_interval
+                or self._pending_chars >= self.repaint_chars):
+            self._paint(self.text + CURSOR, now)
+
+    def render(self, stream):
+        """텍스트 조각 이터러블을 끝까지 표시하고 전체 응답을 반환합니다."""
+        for delta in stream:
+            self.write(delta)
+        return self.finish()
+
+    def finish(self):
+        """커서 없이 최종 응답을 표시하고 전체 응답을 반환합니다."""
+        self.finished_at = time.perf_counter()
+        text = self.text
+        self._paint(text, self.finished_at)
+        return text
+
+    @property
+    def text(self):
+        """지금까지 받은 전체 응답"""
+        if self._pending:
+            self._text += "".join(self._pending)
+            self._pending.clear()
+        return self._text
+
+    def _paint(self, content, now):
+        if self.placeholder is not None:
+            self.placeholder.markdown(content)
+        self._pending_chars = 0
+        self._last_paint = now
+        self.repaints += 1
+
+    def stats(self):
+        """첫 토큰까지 걸린 시간과 초당 토큰 수 등 응답 통계를 반환합니다."""
+        end = self.finished_at or time.perf_counter()
+        tokens = estimate_tokens(self.text)
+        ttft = None
+        tokens_per_sec = None
+        if self.first_token_at is not None:
+            ttft = self.first_token_at - self.started_at
+            streaming = end - self.first_token_at
+            if streaming > 0:
+                tokens_per_sec = tokens / streaming
+        return {
+            "time_to_first_token": ttft,
+            "total_seconds": end - self.started_at,
+            "completion_tokens": tokens,
+            "tokens_per_sec": tokens_per_sec,
+            "chunks": self.chunks,
+            "repaints": self.repaints,
+        }
@@ -0,0 +1,45 @@
+"""
+테스트 공통 설정
+
+앱 모듈은 저장소 최상위에 있으므로 경로에 추가하고, 테스트 중에는 지표 파일을 쓰지 않습니다.
+스트리밍이 필요한 테스트는 mock_openai 픽스처로 로컬 모의 서버(mock_openai_server.py)에 요청합니다.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_METRICS_FILE", "off")
+
+from mock_openai_server import MockSettings, start_server
+
+# 테스트마다 새로 적용하는 모의 서버 설정 (빠르게 끝나도록 지연을 짧게 둠)
+MOCK_DEFAULTS = {
+    "tokens_per_sec": 400.0,
+    "latency": 0.05,
+    "latency_jitter": 0.0,
+    "response_tokens": 20,
+    "error_rate": 0.0,
+    "error_status": 429,
+}
+
+
+@pytest.fixture(scope="session")
+def _mock_server():
+    settings = MockSettings()
+    server, base_url = start_server(settings)
+    # openai_client는 API 키별로 클라이언트를 만들 때 접속 주소를 읽으므로 처음 요청 전에 설정
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "sk-test"
+    yield settings
+    server.shutdown()
+
+
+@pytest.fixture
+def mock_openai(_mock_server):
+    """로컬 모의 OpenAI 서버의 설정(MockSettings)을 반환합니다. 바꾼 값은 다음 요청부터 적용됩니다."""
+    for name, value in MOCK_DEFAULTS.items():
+        setattr(_mock_server, name, value)
+    return _mock_server
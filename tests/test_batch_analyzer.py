@@ -0,0 +1,59 @@
+import threading
+import time
+
+from batch_analyzer import RateLimiter
+
+
+def acquire_times(limiter, count, threads=4):
+    times = []
+    lock = threading.Lock()
+    remaining = [count]
+
+    def worker():
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+            limiter.acquire()
+            with lock:
+                times.append(time.monotonic())
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sorted(times)
+
+
+def test_first_requests_go_out_immediately():
+    limiter = RateLimiter(5)
+    started = time.monotonic()
+
+    times = acquire_times(limiter, 5)
+
+    assert times[-1] - started < 0.1
+
+
+def test_never_exceeds_limit_in_any_window():
+    limiter = RateLimiter(3)
+    limiter.WINDOW_SECONDS = 0.3
+    started = time.monotonic()
+
+    times = acquire_times(limiter, 8)
+
+    for index in range(len(times) - 3):
+        # 4번째 요청은 첫 요청보다 한 구간 뒤에 나감
+        assert times[index + 3] - times[index] >= 0.3 - 0.01
+    assert times[-1] - started >= 0.6 - 0.01
+
+
+def test_capacity_is_at_least_one():
+    limiter = RateLimiter(0.5)
+    limiter.WINDOW_SECONDS = 0.1
+
+    times = acquire_times(limiter, 2, threads=1)
+
+    assert limiter.capacity == 1
+    assert times[1] - times[0] >= 0.1 - 0.01
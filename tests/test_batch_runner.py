@@ -0,0 +1,106 @@
+import json
+import sys
+
+import pytest
+
+import batch_runner
+from batch_runner import load_checkpoint, read_jsonl_items
+
+
+def record(item_id, error=None):
+    return json.dumps({"id": item_id, "response": None if error else "ok", "error": error}) + "\n"
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_checkpoint_keeps_the_last_result_and_cuts_a_torn_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    complete = record("a") + record("b", "RateLimitError") + record("b") + record("c") + record("c", "Timeout")
+    path.write_text(complete + '{"id": "d", "resp', encoding="utf-8")
+
+    assert load_checkpoint(str(path)) == {"a", "b"}
+    # 잘린 줄을 지워서 다음 결과를 새 줄에 이어 씀
+    assert path.read_text(encoding="utf-8") == complete
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_reads_jsonl_items(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(
+        '{"id": 7, "prompt": "안녕"}\n\n"문자열 질문"\n{"image": "photos/a.jpg"}\n',
+        encoding="utf-8"
+    )
+
+    items = list(read_jsonl_items(str(path)))
+
+    assert items == [
+        {"id": "7", "prompt": "안녕"},
+        {"id": "line-3", "prompt": "문자열 질문"},
+        {"id": "line-4", "image": str(tmp_path / "photos" / "a.jpg")},
+    ]
+
+    path.write_text('{"model": "m"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="prompt나 image"):
+        list(read_jsonl_items(str(path)))
+
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["batch_runner.py", *argv])
+    batch_runner.main()
+
+
+def test_resume_runs_only_failed_and_missing_items(mock_openai, tmp_path, monkeypatch, capsys):
+    # 파이프라인 로그가 작업 폴더에 생기므로 임시 폴더에서 실행
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "8")
+    source = tmp_path / "prompts.jsonl"
+    source.write_text("".join(
+        json.dumps({"id": f"q{i}", "prompt": f"{i}번 질문입니다."}, ensure_ascii=False) + "\n"
+        for i in range(1, 5)
+    ), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    # 이전 실행: q1 성공, q2 실패, q3을 쓰다가 중단됨
+    output.write_text(record("q1") + record("q2", "APIError: boom") + '{"id": "q3"', encoding="utf-8")
+    args = (str(source), "-o", str(output), "--model", "gpt-4o-mini", "--no-cache", "--concurrency", "2")
+
+    before = mock_openai.requests
+    run_main(monkeypatch, *args)
+
+    assert mock_openai.requests - before == 3
+    results = read_results(output)
+    assert [r["id"] for r in results[:2]] == ["q1", "q2"]
+    assert sorted(r["id"] for r in results[2:]) == ["q2", "q3", "q4"]
+    assert all(r["error"] is None and r["response"] for r in results[2:])
+    assert "처리 3개 (성공 3 / 실패 0 / 재시도 0) · 이전 실행에서 끝나 건너뜀 1개" in capsys.readouterr().out
+
+    # 모두 끝났으면 다시 실행해도 요청하지 않음
+    before = mock_openai.requests
+    run_main(monkeypatch, *args, "--json", str(tmp_path / "summary.json"))
+
+    assert mock_openai.requests == before
+    assert len(read_results(output)) == 5
+    summary = json.loads((tmp_path / "summary.json").read_text(encoding="utf-8"))
+    assert (summary["items"], summary["skipped"]) == (0, 4)
+
+
+def test_failed_items_are_recorded_for_the_next_run(mock_openai, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "8")
+    source = tmp_path / "prompts.jsonl"
+    source.write_text('{"id": "q1", "prompt": "실패할 질문"}\n', encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    args = (str(source), "-o", str(output), "--model", "gpt-4o-mini", "--no-cache")
+
+    mock_openai.error_rate = 1.0
+    mock_openai.error_status = 400  # 재시도하지 않는 오류
+    run_main(monkeypatch, *args)
+    assert read_results(output)[0]["error"]
+    assert load_checkpoint(str(output)) == set()
+
+    mock_openai.error_rate = 0.0
+    run_main(monkeypatch, *args)
+    assert [r["error"] is None for r in read_results(output)] == [False, True]
+    assert load_checkpoint(str(output)) == {"q1"}
@@ -0,0 +1,52 @@
+import pytest
+
+import app_config
+from app_config import CHAT_WINDOW_MESSAGES, HISTORY_PAGE_SIZE, chat_window, render_message_page
+from session_store import SQLiteSessionStore
+
+
+class FakeSession:
+    def __init__(self, message_count):
+        self.message_count = message_count
+
+
+@pytest.mark.parametrize("count", [0, 5, CHAT_WINDOW_MESSAGES, CHAT_WINDOW_MESSAGES + 7, 137])
+def test_window_starts_on_a_page_boundary(count):
+    earlier_start, window_start = chat_window(FakeSession(count), pages=0)
+
+    assert earlier_start == window_start
+    assert window_start % HISTORY_PAGE_SIZE == 0
+    # 최근 메시지는 최소 CHAT_WINDOW_MESSAGES개 (페이지 경계까지 조금 더) 말풍선으로 보임
+    assert count - window_start >= min(count, CHAT_WINDOW_MESSAGES)
+    assert count - window_start < CHAT_WINDOW_MESSAGES + HISTORY_PAGE_SIZE
+
+
+def test_earlier_pages_stay_aligned_as_the_conversation_grows():
+    pages = set()
+    for count in range(60, 140):
+        earlier_start, window_start = chat_window(FakeSession(count), pages=2)
+        assert earlier_start == max(0, window_start - 2 * HISTORY_PAGE_SIZE)
+        pages.update(range(earlier_start, window_start, HISTORY_PAGE_SIZE))
+
+    # 대화가 길어져도 이전 페이지의 시작 위치는 같은 값만 나옴 (렌더링 캐시 재사용)
+    assert all(start % HISTORY_PAGE_SIZE == 0 for start in pages)
+
+
+def test_earlier_pages_stop_at_the_first_message():
+    assert chat_window(FakeSession(CHAT_WINDOW_MESSAGES + HISTORY_PAGE_SIZE), pages=5) == (0, HISTORY_PAGE_SIZE)
+
+
+def test_render_message_page(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(app_config, "get_session_store", lambda: store)
+    session = store.create_session(None, owner="me")
+    for i in range(HISTORY_PAGE_SIZE + 3):
+        store.append_message(session, "user" if i % 2 == 0 else "assistant", f"메시지 {i}")
+    render_message_page.clear()
+
+    page = render_message_page(session.session_id, HISTORY_PAGE_SIZE, 2 * HISTORY_PAGE_SIZE)
+
+    assert page.split("\n\n---\n\n") == [
+        f"**{app_config.ROLE_LABELS['user' if i % 2 == 0 else 'assistant']}**\n\n메시지 {i}"
+        for i in range(HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE + 3)
+    ]
@@ -0,0 +1,66 @@
+import gzip
+import json
+import os
+
+from conversation_journal import ConversationJournal
+
+
+def read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_appends_one_line_per_record(tmp_path):
+    journal = ConversationJournal("s1", directory=str(tmp_path))
+
+    journal.append({"turn": 1, "text": "안녕"})
+    journal.append({"turn": 2, "text": "반가워요"})
+
+    assert read_lines(journal.path) == [{"turn": 1, "text": "안녕"}, {"turn": 2, "text": "반가워요"}]
+
+
+def test_rotates_into_numbered_compressed_segments(tmp_path):
+    journal = ConversationJournal("s1", directory=str(tmp_path), max_bytes=120)
+
+    for turn in range(10):
+        journal.append({"turn": turn, "text": "가" * 20})
+
+    names = sorted(os.listdir(tmp_path))
+    segments = [name for name in names if name.endswith(".jsonl.gz")]
+    assert segments == [f"s1.{number}.jsonl.gz" for number in range(len(segments))]
+    assert len(segments) >= 2
+
+    # 보관된 파일을 번호 순서로 읽고 현재 파일을 이어 붙이면 모든 기록이 순서대로 나옴
+    records = []
+    for name in segments:
+        records += read_lines(str(tmp_path / name))
+    if os.path.exists(journal.path):
+        records += read_lines(journal.path)
+    assert [record["turn"] for record in records] == list(range(10))
+
+
+def test_rotation_without_compression(tmp_path):
+    journal = ConversationJournal("s1", directory=str(tmp_path), max_bytes=50, compress=False)
+
+    journal.append({"text": "가" * 30})
+
+    assert os.listdir(tmp_path) == ["s1.0.jsonl"]
+
+
+def test_sessions_do_not_share_segments(tmp_path):
+    first = ConversationJournal("a", directory=str(tmp_path), max_bytes=50)
+    second = ConversationJournal("ab", directory=str(tmp_path), max_bytes=50)
+
+    first.append({"text": "가" * 30})
+    second.append({"text": "가" * 30})
+    first.append({"text": "가" * 30})
+
+    assert sorted(os.listdir(tmp_path)) == ["a.0.jsonl.gz", "a.1.jsonl.gz", "ab.0.jsonl.gz"]
+
+
+def test_generates_session_id(tmp_path):
+    journal = ConversationJournal(directory=str(tmp_path))
+
+    assert journal.session_id
+    assert journal.path == os.path.join(str(tmp_path), f"{journal.session_id}.jsonl")
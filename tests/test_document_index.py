@@ -0,0 +1,99 @@
+import io
+import json
+import os
+
+from document_index import DocumentIndex, build_index, format_passages, iter_text, split_passages, tokenize
+
+
+def paragraphs(count, size=300):
+    return "\n\n".join(f"문단{i} " + "x" * size for i in range(count))
+
+
+def test_split_passages_cuts_at_paragraphs_with_overlap():
+    text = paragraphs(10)
+
+    passages = list(split_passages([text], passage_chars=1000, overlap=150))
+
+    assert len(passages) > 1
+    assert all(len(passage) <= 1000 for passage in passages)
+    # 문단 경계에서 자름
+    assert all(passage.startswith("문단") or passage.startswith("x") for passage in passages)
+    assert passages[-1].endswith("x")
+    # 모든 문단이 어느 구절에든 들어 있음
+    for i in range(10):
+        assert any(f"문단{i} " in passage for passage in passages)
+
+
+def test_split_passages_ignores_chunk_boundaries():
+    text = paragraphs(10)
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    assert list(split_passages(chunks)) == list(split_passages([text]))
+
+
+def test_iter_text_decodes_multibyte_across_reads():
+    data = ("가나다" * 100).encode("utf-8")
+
+    assert "".join(iter_text(io.BytesIO(data), chunk_bytes=7)) == "가나다" * 100
+
+
+def test_tokenize_uses_bigrams_for_korean():
+    assert tokenize("Python 리스트와") == ["python", "리스", "스트", "트와"]
+
+
+def test_bm25_ranks_rare_matching_terms_first():
+    index = DocumentIndex("doc")
+    index.add("사과 바나나 포도")
+    index.add("배 복숭아 자두")
+    index.add("사과 사과 키위")
+    index.add("common words only")
+
+    results = index.search("사과")
+
+    assert [number for _, number in results] == [2, 0]
+    assert results[0][0] > results[1][0] > 0
+    assert index.search("없는단어") == []
+
+
+def test_relevant_passages_keep_document_order_and_fall_back():
+    index = DocumentIndex("doc")
+    for i in range(6):
+        index.add(f"passage {i} " + ("banana" if i in (1, 4) else "apple"))
+
+    assert index.relevant_passages("banana", k=2) == [index.passages[1], index.passages[4]]
+    # 일치하는 구절이 없으면 앞부분
+    assert index.relevant_passages("cherry", k=2) == index.passages[:2]
+
+    text = format_passages([index], "banana", k=2)
+    assert "### doc\n[1] passage 1 banana\n\n[2] passage 4 banana" in text
+    assert format_passages([], "banana") is None
+
+
+def test_build_index_round_trips_through_the_disk_cache(tmp_path):
+    index_dir = str(tmp_path / "documents")
+    data = paragraphs(10).encode("utf-8")
+
+    built = build_index(io.BytesIO(data), "abc", name="a.txt", index_dir=index_dir)
+    path = os.path.join(index_dir, "abc.json")
+    assert os.path.exists(path) and not os.path.exists(path + ".tmp")
+
+    class Unreadable:
+        def read(self, size):
+            raise AssertionError("캐시가 있으면 파일을 다시 읽지 않아야 함")
+
+    loaded = build_index(Unreadable(), "abc", name="b.txt", index_dir=index_dir)
+
+    assert loaded.passages == built.passages
+    assert loaded.name == "b.txt"
+    assert loaded.search("문단3") == built.search("문단3")
+
+
+def test_build_index_rebuilds_a_broken_cache(tmp_path):
+    index_dir = tmp_path / "documents"
+    index_dir.mkdir()
+    (index_dir / "abc.json").write_text("{broken", encoding="utf-8")
+
+    index = build_index(io.BytesIO(b"hello world"), "abc", index_dir=str(index_dir))
+
+    assert index.passages == ["hello world"]
+    assert json.loads((index_dir / "abc.json").read_text(encoding="utf-8"))["passages"] == ["hello world"]
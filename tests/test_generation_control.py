@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+import generation_control
+from generation_control import CancelToken, GenerationRegistry
+
+
+class RecentCalls:
+    """최근 정상 완료된 호출 기록 대신 쓰는 값"""
+
+    def __init__(self, **values):
+        self._values = values
+
+    def values(self, name, kind=None, status="ok"):
+        return self._values.get(name, [])
+
+
+def stats(chunks, ttft, total):
+    return {"chunks": chunks, "time_to_first_token": ttft, "total_seconds": total}
+
+
+def test_cancel_runs_callbacks_once():
+    token = CancelToken("s")
+    closed = []
+    token.on_cancel(lambda: closed.append("a"))
+    token.on_cancel(lambda: 1 / 0)  # 실패해도 나머지는 실행
+    token.on_cancel(lambda: closed.append("b"))
+
+    assert token.cancel("중지") is True
+    assert token.cancel("다시") is False
+
+    assert closed == ["a", "b"]
+    assert token.cancelled and token.reason == "중지"
+    # 이미 취소된 토큰에 등록하면 바로 실행
+    token.on_cancel(lambda: closed.append("late"))
+    assert closed == ["a", "b", "late"]
+
+
+def test_new_generation_cancels_the_previous_one_in_the_same_session():
+    registry = GenerationRegistry()
+    first = registry.start("s")
+    other = registry.start("t")
+
+    second = registry.start("s")
+
+    assert first.reason == "새 요청이 시작됨"
+    assert not second.cancelled and not other.cancelled
+    assert registry.active() == 2
+
+    registry.finish(first)  # 이미 바뀐 생성은 목록에 영향 없음
+    assert registry.active() == 2
+    registry.finish(second)
+    assert registry.active() == 1
+
+
+def test_cancel_by_session():
+    registry = GenerationRegistry()
+    token = registry.start("s")
+    stopped = threading.Event()
+    token.on_cancel(stopped.set)
+
+    assert registry.cancel("s", "중지 버튼") is True
+    assert registry.cancel("s", "중지 버튼") is False
+    assert stopped.is_set() and token.reason == "중지 버튼"
+    assert registry.active() == 0
+
+
+def test_estimates_savings_from_the_stream_speed(monkeypatch):
+    monkeypatch.setattr(generation_control, "metrics",
+                        RecentCalls(completion_tokens=[90, 100, 110], total_seconds=[5.0]))
+    registry = GenerationRegistry()
+
+    # 첫 토큰 0.5초, 이후 1초 동안 20조각 → 초당 20조각으로 남은 80조각
+    saved = registry.record_cancel(stats(chunks=20, ttft=0.5, total=1.5))
+
+    assert saved == (80, pytest.approx(4.0))
+    assert (registry.cancelled, registry.saved_tokens) == (1, 80)
+    assert registry.saved_seconds == pytest.approx(4.0)
+
+
+def test_cancel_before_first_token_uses_typical_duration(monkeypatch):
+    monkeypatch.setattr(generation_control, "metrics",
+                        RecentCalls(completion_tokens=[100], total_seconds=[4.0, 6.0]))
+    registry = GenerationRegistry()
+
+    assert registry.record_cancel(stats(chunks=0, ttft=None, total=2.0)) == (100, pytest.approx(3.0))
+
+
+def test_shared_or_unknown_streams_save_nothing(monkeypatch):
+    monkeypatch.setattr(generation_control, "metrics",
+                        RecentCalls(completion_tokens=[100], total_seconds=[4.0]))
+    registry = GenerationRegistry()
+
+    # 다른 세션과 함께 받던 스트림이라 업스트림은 계속 진행됨
+    assert registry.record_cancel(stats(20, 0.5, 1.5), upstream_closed=False) == (0, 0.0)
+
+    monkeypatch.setattr(generation_control, "metrics", RecentCalls())
+    assert registry.record_cancel(stats(20, 0.5, 1.5)) == (0, 0.0)
+    assert (registry.cancelled, registry.saved_tokens, registry.saved_seconds) == (2, 0, 0.0)
@@ -0,0 +1,167 @@
+from history_manager import HistoryManager, SUMMARY_PREFIX
+
+
+def make_messages(count, size=100):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}번 " + "가" * size}
+        for i in range(count)
+    ]
+
+
+def test_keeps_everything_within_budget():
+    manager = HistoryManager(budgets={"m": 10000})
+    messages = make_messages(6)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert [m["content"] for m in result] == [m["content"] for m in messages]
+    assert state["omitted_count"] == 0
+    assert state["last_request_tokens"] <= state["last_budget"] == 10000
+
+
+def test_summarizes_older_turns_over_budget():
+    calls = []
+
+    def summarizer(previous, dropped):
+        calls.append((previous, len(dropped)))
+        return "요약"
+
+    manager = HistoryManager(budgets={"m": 600}, summarizer=summarizer, summary_reserve=50)
+    messages = make_messages(11)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert result[0] == {"role": "system", "content": SUMMARY_PREFIX + "요약"}
+    assert result[-1]["content"] == messages[-1]["content"]
+    assert state["summarized_count"] + len(result) - 1 == len(messages)
+    assert state["last_request_tokens"] <= 600
+    assert calls == [(None, state["summarized_count"])]
+
+
+def test_summarizer_failure_keeps_turns_for_next_try():
+    def failing(previous, dropped):
+        raise RuntimeError("down")
+
+    manager = HistoryManager(budgets={"m": 600}, summarizer=failing, summary_reserve=50)
+    messages = make_messages(11)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert "summarized_count" not in state and "summary" not in state
+    assert state["summary_error"] == "RuntimeError: down"
+    assert state["omitted_count"] == len(messages) - len(result)
+
+    # 요약기가 살아나면 빠졌던 메시지부터 요약함
+    seen = []
+    manager.summarizer = lambda previous, dropped: seen.extend(dropped) or "요약"
+    manager.build_messages(messages, "m", state)
+    assert seen[0]["content"] == messages[0]["content"]
+    assert "summary_error" not in state
+    assert state["omitted_count"] == 0
+
+
+def test_without_summarizer_keeps_previous_summary():
+    manager = HistoryManager(budgets={"m": 600}, summary_reserve=50)
+    messages = make_messages(11)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert result[-1]["content"] == messages[-1]["content"]
+    assert "summarized_count" not in state
+    assert state["omitted_count"] > 0
+    assert state["last_request_tokens"] <= 600
+
+
+def test_min_recent_does_not_exceed_budget():
+    manager = HistoryManager(budgets={"m": 300}, min_recent=4)
+    messages = make_messages(4, size=120)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert state["last_request_tokens"] <= 300
+    assert result[-1]["content"] == messages[-1]["content"]
+    assert state["omitted_count"] == len(messages) - len(result)
+
+
+def test_latest_question_is_kept_even_when_too_large():
+    manager = HistoryManager(budgets={"m": 50})
+    messages = make_messages(3, size=200)
+    state = {}
+
+    result = manager.build_messages(messages, "m", state)
+
+    assert [m["content"] for m in result] == [messages[-1]["content"]]
+
+
+def test_offset_window_matches_full_history():
+    manager = HistoryManager(budgets={"m": 600}, summarizer=lambda previous, dropped: "요약", summary_reserve=50)
+    messages = make_messages(11)
+    full_state = {}
+    expected = manager.build_messages([dict(m) for m in messages], "m", full_state)
+
+    # 다음 턴: 요약된 지점 바로 앞부터만 넘겨도 같은 결과
+    messages += make_messages(2)
+    window_state = dict(full_state)
+    start = window_state["summarized_count"] - 1
+    from_window = manager.build_messages([dict(m) for m in messages[start:]], "m", window_state, offset=start)
+    from_full = manager.build_messages([dict(m) for m in messages], "m", dict(full_state))
+
+    assert from_window == from_full
+    assert expected[0]["role"] == "system"
+
+
+def test_changed_history_resets_summary():
+    summarized = []
+
+    def summarizer(previous, dropped):
+        summarized.append((previous, [m["content"] for m in dropped]))
+        return "요약"
+
+    manager = HistoryManager(budgets={"m": 600}, summarizer=summarizer, summary_reserve=50)
+    messages = make_messages(11)
+    state = {}
+    manager.build_messages(messages, "m", state)
+
+    # 요약한 마지막 메시지가 바뀌면 이전 요약을 버리고 처음부터 다시 요약함
+    edited = make_messages(11)
+    edited[state["summarized_count"] - 1]["content"] = "바뀐 메시지"
+    manager.build_messages(edited, "m", state)
+
+    assert len(summarized) == 2
+    previous, contents = summarized[-1]
+    assert previous is None
+    assert contents[0] == edited[0]["content"]
+
+
+def test_documents_and_history_share_the_model_budget():
+    from chat_core import ChatPipeline
+    from document_index import DocumentIndex
+    from model_router import ModelRouter
+    from prompt_assembler import PromptAssembler
+
+    manager = HistoryManager(summarizer=lambda previous, dropped: "요약", summary_reserve=50)
+    pipeline = ChatPipeline(manager, ModelRouter(), None, PromptAssembler(), generations=None)
+    # 검색 대상이 되는 큰 문서 (구절 네 개가 질문 앞에 들어감) + 통째로 고정되는 작은 문서
+    large = DocumentIndex("large.txt")
+    for i in range(20):
+        large.add(f"{i}번 구절 예산 " + "나" * 900)
+    small = DocumentIndex("small.txt")
+    for i in range(3):
+        small.add(f"{i}번 메모 " + "다" * 900)
+    messages = make_messages(40, size=300)
+    state = {}
+
+    turn = pipeline.prepare(messages[-1]["content"], messages, state, system_prompt="간결하게 답하세요.",
+                            documents=[large, small], model="gpt-4")
+
+    segments = turn.assembled.segments
+    assert segments["context"] > 1500 and segments["pinned"] > 0 and segments["turns"] > 0
+    assert turn.assembled.total_tokens <= 6000
+    assert state["last_request_tokens"] == turn.assembled.total_tokens
+    assert state["last_budget"] == 6000
+    assert turn.messages[-1]["content"] == messages[-1]["content"]
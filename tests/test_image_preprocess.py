@@ -0,0 +1,99 @@
+import base64
+import struct
+
+import pytest
+
+from image_preprocess import describe, format_bytes, preprocess_image
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+
+def encode(image, extension=".png"):
+    ok, encoded = cv2.imencode(extension, image)
+    assert ok
+    return encoded.tobytes()
+
+
+def noisy_image(width, height, channels=3):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(height, width, channels), dtype=np.uint8)
+
+
+def with_exif(jpeg):
+    """SOI 바로 뒤에 EXIF(APP1) 구간을 끼워 넣습니다."""
+    payload = b"Exif\x00\x00" + b"GPS-SECRET" * 50
+    segment = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    return jpeg[:2] + segment + jpeg[2:]
+
+
+def decoded(result):
+    data = base64.b64decode(result["base64"])
+    return data, cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def test_resizes_to_the_model_resolution():
+    result = preprocess_image(encode(noisy_image(3000, 1500)))
+
+    # 2048x2048 안에 맞춘 뒤 짧은 변 768
+    assert result["original_size"] == (3000, 1500)
+    assert result["size"] == (1536, 768)
+    _, image = decoded(result)
+    assert image.shape[:2] == (768, 1536)
+    assert result["mime_type"] == "image/jpeg"
+    assert result["data_url"] == "data:image/jpeg;base64," + result["base64"]
+
+
+def test_small_images_keep_their_size():
+    result = preprocess_image(encode(noisy_image(300, 200)), image_format="webp")
+
+    assert result["size"] == result["original_size"] == (300, 200)
+    assert result["mime_type"] == "image/webp"
+
+
+def test_strips_metadata():
+    original = with_exif(encode(noisy_image(400, 300), ".jpg"))
+    assert b"GPS-SECRET" in original
+
+    data, image = decoded(preprocess_image(original))
+
+    assert b"Exif" not in data and b"GPS-SECRET" not in data
+    assert image.shape[:2] == (300, 400)
+
+
+def test_transparent_pixels_become_white():
+    image = np.zeros((10, 10, 4), dtype=np.uint8)
+
+    _, result = decoded(preprocess_image(encode(image), image_format="webp", quality=100))
+
+    assert result.shape == (10, 10, 3)
+    assert result.min() > 240
+
+
+def test_reports_bytes_saved():
+    original = encode(noisy_image(3000, 2000))
+
+    result = preprocess_image(original)
+
+    assert result["original_bytes"] == len(original)
+    assert result["encoded_bytes"] == len(base64.b64decode(result["base64"]))
+    assert result["bytes_saved"] == result["original_bytes"] - result["encoded_bytes"] > 0
+    assert result["encode_ms"] >= 0
+    saved = result["bytes_saved"] / result["original_bytes"] * 100
+    assert describe(result).startswith(
+        f"{format_bytes(result['original_bytes'])} → {format_bytes(result['encoded_bytes'])} ({saved:.0f}% 절감, 1152x768"
+    )
+
+
+def test_rejects_unknown_format_and_broken_data():
+    with pytest.raises(ValueError):
+        preprocess_image(b"...", image_format="gif")
+    with pytest.raises(ValueError):
+        preprocess_image(b"not an image")
+
+
+def test_format_bytes():
+    assert format_bytes(512) == "512B"
+    assert format_bytes(2048) == "2.0KB"
+    assert format_bytes(5 * 1024 * 1024) == "5.0MB"
+    assert format_bytes(3 * 1024 ** 3) == "3.0GB"
@@ -0,0 +1,134 @@
+import time
+
+import openai
+import pytest
+
+import openai_client
+from model_router import ModelRouter, RouteDecision, classify_request, parse_tiers, should_fall_back
+
+MESSAGES = [{"role": "user", "content": "안녕하세요"}]
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    monkeypatch.setattr(openai_client, "MAX_RETRIES", 0)
+
+
+def failing_request(mock_openai, failing_models, status):
+    """failing_models에 대한 요청만 모의 서버가 status 오류를 돌려주는 요청 함수"""
+    def request(model):
+        mock_openai.error_status = status
+        mock_openai.error_rate = 1.0 if model in failing_models else 0.0
+        return openai_client.create_chat_completion(model=model, messages=MESSAGES)
+    return request
+
+
+def test_classifies_requests():
+    assert classify_request("안녕")[0] == "fast"
+    assert classify_request("이 코드를 리팩터 해 주세요")[0] == "standard"
+    assert classify_request("설명해 줘", documents=1)[0] == "standard"
+    assert classify_request("이건 뭐야?", images=1)[0] == "vision"
+
+
+def test_parse_tiers():
+    assert parse_tiers("fast=a, b;standard=c;broken;empty=") == {"fast": ["a", "b"], "standard": ["c"]}
+
+
+def test_requested_model_skips_classification():
+    decision = ModelRouter().route("분석해 주세요", requested_model="x")
+
+    assert (decision.tier, decision.models) == ("manual", ["x"])
+
+
+@pytest.mark.parametrize("status", [404, 429, 500, 503])
+def test_falls_back_on_transient_or_missing_model(mock_openai, no_retries, status):
+    router = ModelRouter(tiers={"fast": ["a", "b"]})
+    decision = router.route("안녕")
+
+    response = router.call(decision, failing_request(mock_openai, {"a"}, status))
+
+    assert response.choices[0].message.content
+    assert decision.model == "b"
+    assert [model for model, _ in decision.fallbacks] == ["a"]
+    assert "a" in router.health()
+    assert router.fallback_count == 1
+
+
+@pytest.mark.parametrize("status,error", [(400, openai.BadRequestError),
+                                          (422, openai.UnprocessableEntityError),
+                                          (401, openai.AuthenticationError)])
+def test_client_errors_surface_without_penalty(mock_openai, no_retries, status, error):
+    router = ModelRouter(tiers={"fast": ["a", "b"]})
+    decision = router.route("안녕")
+
+    with pytest.raises(error) as raised:
+        router.call(decision, failing_request(mock_openai, {"a", "b"}, status))
+
+    assert not should_fall_back(raised.value)
+    assert decision.fallbacks == []
+    assert router.health() == {}
+
+
+def test_raises_last_error_when_every_model_fails(mock_openai, no_retries):
+    router = ModelRouter(tiers={"fast": ["a", "b"]})
+    decision = router.route("안녕")
+
+    with pytest.raises(openai.InternalServerError):
+        router.call(decision, failing_request(mock_openai, {"a", "b"}, 500))
+
+    assert set(router.health()) == {"a", "b"}
+
+
+def test_penalized_model_moves_to_the_back():
+    router = ModelRouter(tiers={"fast": ["a", "b", "c"]})
+    router.record_failure("a", RuntimeError("boom"))
+
+    decision = router.route("안녕")
+
+    assert decision.models == ["b", "c", "a"]
+    assert any("a 건너뜀" in reason for reason in decision.reasons)
+
+
+def test_cooldown_doubles_and_expires():
+    router = ModelRouter(error_cooldown=0.2)
+
+    router.record_failure("a", RuntimeError("boom"))
+    first = router.health()["a"][0]
+    router.record_failure("a", RuntimeError("boom"))
+    second = router.health()["a"][0]
+
+    assert 0.1 < first <= 0.2
+    assert 0.3 < second <= 0.4
+    time.sleep(0.45)
+    assert router.health() == {}
+
+
+def test_slow_first_token_penalizes_model():
+    router = ModelRouter(slow_seconds={"fast": 1.0}, slow_cooldown=30)
+    decision = RouteDecision("fast", ["a", "b"], [])
+
+    router.record_success(decision, 0.5)
+    assert router.health() == {}
+    router.record_success(decision, 2.0)
+    assert "a" in router.health()
+
+    # 빠르게 응답하면 다시 정상으로 봄
+    router.record_success(decision, 0.1)
+    assert router.health() == {}
+
+
+@pytest.mark.parametrize("status,penalized", [(400, False), (500, True)])
+def test_failed_stream_penalizes_only_transient_errors(mock_openai, no_retries, status, penalized):
+    from chat_core import ChatPipeline, ChatTurn
+
+    router = ModelRouter(tiers={"fast": ["a"]})
+    pipeline = ChatPipeline(None, router, None, None, generations=None)
+    turn = ChatTurn("안녕", router.route("안녕"), type("Assembled", (), {"messages": MESSAGES})(),
+                    0.7, None, "key", False, None)
+    turn.called_api = True
+    with pytest.raises(openai.APIStatusError) as raised:
+        failing_request(mock_openai, {"a"}, status)("a")
+
+    pipeline.fail(turn, raised.value)
+
+    assert ("a" in router.health()) is penalized
@@ -0,0 +1,70 @@
+import threading
+
+import openai
+import pytest
+
+import openai_client
+from openai_client import create_chat_completion, TextStream, MAX_CONCURRENT_REQUESTS
+
+MESSAGES = [{"role": "user", "content": "안녕하세요"}]
+
+
+def free_slots():
+    """지금 바로 얻을 수 있는 요청 슬롯 수"""
+    taken = 0
+    while openai_client._request_slots.acquire(blocking=False):
+        taken += 1
+    for _ in range(taken):
+        openai_client._request_slots.release()
+    return taken
+
+
+def test_stream_releases_slot_when_finished(mock_openai):
+    stream = create_chat_completion(model="m", messages=MESSAGES, stream=True)
+    assert free_slots() == MAX_CONCURRENT_REQUESTS - 1
+
+    text = "".join(TextStream(stream))
+
+    assert len(text.split()) == mock_openai.response_tokens
+    assert free_slots() == MAX_CONCURRENT_REQUESTS
+    assert stream.trace.upstream_time_to_first_token >= mock_openai.latency
+
+
+def test_concurrent_close_releases_slot_once(mock_openai):
+    for _ in range(10):
+        stream = create_chat_completion(model="m", messages=MESSAGES, stream=True)
+        threads = [threading.Thread(target=stream.close) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert free_slots() == MAX_CONCURRENT_REQUESTS
+
+
+def test_slot_is_free_during_retry_backoff(mock_openai):
+    mock_openai.error_rate = 1.0
+    during_backoff = []
+
+    def on_retry(attempt, delay, error):
+        during_backoff.append((free_slots(), type(error)))
+        mock_openai.error_rate = 0.0
+
+    stream = create_chat_completion(model="m", messages=MESSAGES, stream=True, on_retry=on_retry)
+    list(stream)
+
+    assert during_backoff == [(MAX_CONCURRENT_REQUESTS, openai.RateLimitError)]
+    assert stream.trace.retries == 1
+    assert free_slots() == MAX_CONCURRENT_REQUESTS
+
+
+def test_bad_request_is_not_retried(mock_openai):
+    mock_openai.error_rate = 1.0
+    mock_openai.error_status = 400
+    retries = []
+
+    with pytest.raises(openai.BadRequestError):
+        create_chat_completion(model="m", messages=MESSAGES, on_retry=lambda *args: retries.append(args))
+
+    assert retries == []
+    assert free_slots() == MAX_CONCURRENT_REQUESTS
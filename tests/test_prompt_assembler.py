@@ -0,0 +1,96 @@
+import json
+
+from prompt_assembler import (
+    PromptAssembler, PINNED_HEADER, format_pinned_documents, split_documents,
+)
+
+
+class Document:
+    def __init__(self, name, passages):
+        self.name = name
+        self.passages = passages
+
+    def __len__(self):
+        return len(self.passages)
+
+
+def turns(*contents):
+    return [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": content}
+        for index, content in enumerate(contents)
+    ]
+
+
+def test_orders_stable_segments_first():
+    assembled = PromptAssembler().assemble(
+        turns("질문1", "답1", "질문2"), system_prompt="시스템", pinned="고정", context="구절"
+    )
+
+    assert [m["content"] for m in assembled.messages] == ["시스템", "고정", "질문1", "답1", "구절", "질문2"]
+    assert list(assembled.segments) == ["system", "pinned", "turns", "context", "question"]
+    assert assembled.total_tokens == sum(assembled.segments.values())
+
+
+def test_empty_segments_are_left_out():
+    assembled = PromptAssembler().assemble(turns("질문"))
+
+    assert assembled.messages == [{"role": "user", "content": "질문"}]
+    assert assembled.segments["system"] == assembled.segments["context"] == 0
+
+
+def test_next_turn_reuses_previous_prefix():
+    assembler = PromptAssembler()
+    first = assembler.assemble(turns("질문1"), system_prompt="시스템")
+    second = assembler.assemble(
+        turns("질문1", "답1", "질문2"), system_prompt="시스템", context="구절",
+        previous_digests=first.digests
+    )
+    third = assembler.assemble(
+        turns("질문1", "답1", "질문2", "답2", "질문3"), system_prompt="시스템", context="다른 구절",
+        previous_digests=second.digests
+    )
+
+    # 시스템 프롬프트와 이전 질문까지 같고, 질문마다 바뀌는 구절은 그 뒤에 옴
+    assert second.reused_messages == 2
+    assert second.reused_tokens == first.total_tokens
+    assert second.uncached_tokens == second.total_tokens - second.reused_tokens
+    # 이전 요청의 구절은 질문 바로 앞에 있었으므로 그 앞(시스템, 질문1, 답1)까지만 같음
+    assert third.reused_messages == 3
+
+
+def test_changed_system_prompt_reuses_nothing():
+    assembler = PromptAssembler()
+    first = assembler.assemble(turns("질문"), system_prompt="시스템 A")
+    second = assembler.assemble(turns("질문"), system_prompt="시스템 B", previous_digests=first.digests)
+
+    assert second.reused_messages == 0
+
+
+def test_token_counts_are_cached_by_content():
+    assembler = PromptAssembler(cache_entries=2)
+
+    assembler.assemble(turns("하나", "둘", "셋"))
+
+    assert len(assembler._tokens) == 2
+
+
+def test_split_and_format_documents():
+    small = Document("작은 문서", ["첫 구절", "둘째 구절"])
+    large = Document("큰 문서", [f"구절 {i}" for i in range(20)])
+
+    pinned, searched = split_documents([small, large], max_passages=3)
+
+    assert (pinned, searched) == ([small], [large])
+    assert format_pinned_documents(pinned) == PINNED_HEADER + "### 작은 문서\n첫 구절\n\n둘째 구절"
+    assert format_pinned_documents([]) is None
+
+
+def test_log_writes_segments(tmp_path):
+    path = tmp_path / "logs" / "prompt.jsonl"
+    assembler = PromptAssembler(str(path))
+
+    assembler.log(assembler.assemble(turns("질문"), system_prompt="시스템"), session="s1", model="m")
+
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    assert entry["session"] == "s1" and entry["model"] == "m"
+    assert entry["total_tokens"] == entry["segments"]["system"] + entry["segments"]["question"]
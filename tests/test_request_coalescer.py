@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+
+from openai_client import create_chat_completion, TextStream
+from request_coalescer import RequestCoalescer
+
+
+class FakeUpstream:
+    """조각을 하나씩 내보내는 업스트림 (release()로 다음 조각을 허용)"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.cancelled = threading.Event()
+        self._allowed = threading.Semaphore(0)
+
+    def release(self, count=1):
+        for _ in range(count):
+            self._allowed.release()
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            while not self._allowed.acquire(timeout=0.01):
+                if self.cancelled.is_set():
+                    raise RuntimeError("closed")
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def read_all(subscription, results):
+    thread = threading.Thread(target=lambda: results.append("".join(subscription)))
+    thread.start()
+    return thread
+
+
+def test_identical_requests_share_one_upstream():
+    coalescer = RequestCoalescer()
+    upstream = FakeUpstream(["a", "b", "c"])
+    starts = []
+
+    first = coalescer.subscribe("key", lambda: starts.append(1) or upstream)
+    upstream.release()
+    time.sleep(0.05)
+    # 늦게 붙어도 처음 조각부터 받음
+    second = coalescer.subscribe("key", lambda: starts.append(2) or FakeUpstream(["x"]))
+    results = []
+    threads = [read_all(first, results), read_all(second, results)]
+    upstream.release(2)
+    for thread in threads:
+        thread.join(2)
+
+    assert starts == [1]
+    assert (first.joined, second.joined) == (False, True)
+    assert results == ["abc", "abc"]
+    assert (coalescer.started, coalescer.joined) == (1, 1)
+    assert coalescer.in_flight() == {}
+
+
+def test_different_keys_do_not_share():
+    coalescer = RequestCoalescer()
+
+    first = coalescer.subscribe("a", lambda: iter(["1"]))
+    second = coalescer.subscribe("b", lambda: iter(["2"]))
+
+    assert ("".join(first), "".join(second)) == ("1", "2")
+    assert coalescer.started == 2
+
+
+def test_upstream_error_reaches_every_subscriber():
+    coalescer = RequestCoalescer()
+    upstream = FakeUpstream(["a"], error=ValueError("boom"))
+    first = coalescer.subscribe("key", lambda: upstream)
+    second = coalescer.subscribe("key", lambda: None)
+    upstream.release()
+
+    for subscription in (first, second):
+        with pytest.raises(ValueError):
+            list(subscription)
+
+
+def test_start_error_is_raised_to_caller():
+    coalescer = RequestCoalescer()
+
+    def start():
+        raise ValueError("no connection")
+
+    with pytest.raises(ValueError):
+        coalescer.subscribe("key", start)
+    assert coalescer.in_flight() == {}
+
+
+def test_leaving_subscriber_does_not_stop_others():
+    coalescer = RequestCoalescer()
+    upstream = FakeUpstream(["a", "b"])
+    first = coalescer.subscribe("key", lambda: upstream)
+    second = coalescer.subscribe("key", lambda: None)
+
+    first.close()
+    upstream.release(2)
+
+    assert "".join(second) == "ab"
+    assert not upstream.cancelled.is_set()
+    assert not first.cancelled_upstream
+
+
+def test_last_subscriber_leaving_cancels_upstream():
+    coalescer = RequestCoalescer()
+    upstream = FakeUpstream(["a", "b"])
+    first = coalescer.subscribe("key", lambda: upstream)
+    second = coalescer.subscribe("key", lambda: None)
+
+    first.close()
+    second.close()
+
+    assert upstream.cancelled.wait(1)
+    assert second.cancelled_upstream
+    assert coalescer.cancelled == 1
+    # 끊긴 요청에는 더 붙지 않고 새로 시작함
+    third = coalescer.subscribe("key", lambda: iter(["new"]))
+    assert not third.joined
+    assert "".join(third) == "new"
+
+
+def test_close_from_another_thread_wakes_reader():
+    coalescer = RequestCoalescer()
+    upstream = FakeUpstream(["a", "b"])
+    subscription = coalescer.subscribe("key", lambda: upstream)
+    results = []
+    thread = read_all(subscription, results)
+
+    time.sleep(0.05)
+    subscription.close()
+    thread.join(1)
+
+    assert not thread.is_alive()
+    assert results == [""]
+    assert upstream.cancelled.is_set()
+
+
+def test_shares_streaming_response_from_mock_server(mock_openai):
+    mock_openai.latency = 0.2
+    coalescer = RequestCoalescer()
+    requests_before = mock_openai.requests
+
+    def start():
+        return TextStream(create_chat_completion(
+            model="m", messages=[{"role": "user", "content": "안녕"}], stream=True
+        ))
+
+    subscriptions = [coalescer.subscribe("key", start) for _ in range(3)]
+    results = []
+    threads = [read_all(subscription, results) for subscription in subscriptions]
+    for thread in threads:
+        thread.join(5)
+
+    assert mock_openai.requests - requests_before == 1
+    assert len(set(results)) == 1
+    assert len(results[0].split()) == mock_openai.response_tokens
@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pytest
+
+import openai_client
+from openai_client import create_chat_completion, TextStream
+from request_hedger import RequestHedger
+
+
+class FakeStream:
+    """first_token_seconds 뒤부터 조각을 내보내는 스트림"""
+
+    def __init__(self, name, first_token_seconds, chunks=3, gap=0.01, error=None):
+        self.name = name
+        self.first_token_seconds = first_token_seconds
+        self.chunks = chunks
+        self.gap = gap
+        self.error = error
+        self.cancelled = threading.Event()
+
+    def __iter__(self):
+        if self.cancelled.wait(self.first_token_seconds):
+            raise RuntimeError("closed")
+        if self.error is not None:
+            raise self.error
+        for index in range(self.chunks):
+            if self.cancelled.is_set():
+                raise RuntimeError("closed")
+            yield f"{self.name}{index} "
+            time.sleep(self.gap)
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def opener(stream):
+    def open_stream(on_retry):
+        return stream
+    return open_stream
+
+
+def wait_for_free_slots(expected, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        taken = 0
+        while openai_client._request_slots.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            openai_client._request_slots.release()
+        if taken == expected:
+            return True
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def hedger():
+    return RequestHedger(fixed_delay=0.1)
+
+
+def test_fast_primary_is_not_hedged(hedger):
+    primary = FakeStream("P", 0.01)
+    hedge = FakeStream("H", 0.0)
+
+    stream = hedger.start("a", opener(primary), "b", opener(hedge))
+
+    assert "".join(stream) == "P0 P1 P2 "
+    assert stream.outcome == {"delay": 0.1, "hedged": False, "winner": "primary", "model": "a",
+                              "saved_seconds": None}
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_hedge_wins_and_primary_is_cancelled_at_once(hedger):
+    primary = FakeStream("P", 5.0)
+    hedge = FakeStream("H", 0.01)
+
+    started = time.perf_counter()
+    stream = hedger.start("a", opener(primary), "b", opener(hedge))
+
+    assert primary.cancelled.is_set()
+    assert "".join(stream) == "H0 H1 H2 "
+    assert time.perf_counter() - started < 1.0
+    assert (stream.outcome["winner"], stream.outcome["model"]) == ("hedge", "b")
+    # 첫 요청이 닫힐 때까지 기다린 시간 - 두 번째 요청의 첫 토큰 시간 (기다린 시간 0.1초 정도)
+    saved = stream.outcome["saved_seconds"]
+    assert 0.09 <= saved < 0.5
+    stats = hedger.stats()
+    assert (stats["requests"], stats["hedged"], stats["hedge_rate"], stats["hedge_wins"]) == (1, 1, 1.0, 1)
+    assert stats["saved_seconds"] == saved
+
+
+def test_primary_can_still_win_after_hedge(hedger):
+    primary = FakeStream("P", 0.15)
+    hedge = FakeStream("H", 5.0)
+
+    stream = hedger.start("a", opener(primary), "b", opener(hedge))
+
+    assert "".join(stream) == "P0 P1 P2 "
+    assert stream.outcome["hedged"] and stream.outcome["winner"] == "primary"
+    assert stream.outcome["saved_seconds"] is None
+    assert hedge.cancelled.is_set()
+    assert hedger.stats()["saved_seconds"] == 0.0
+
+
+def test_failed_hedge_falls_back_to_primary(hedger):
+    primary = FakeStream("P", 0.3)
+    hedge = FakeStream("H", 0.0, error=ValueError("hedge failed"))
+
+    stream = hedger.start("a", opener(primary), "b", opener(hedge))
+
+    assert "".join(stream) == "P0 P1 P2 "
+    assert stream.outcome["winner"] == "primary"
+
+
+def test_raises_when_every_attempt_fails(hedger):
+    primary = FakeStream("P", 0.0, error=ValueError("primary failed"))
+
+    with pytest.raises(ValueError, match="primary failed"):
+        hedger.start("a", opener(primary), "b", opener(FakeStream("H", 0.0)))
+
+
+def test_cancel_closes_every_attempt(hedger):
+    primary = FakeStream("P", 0.15, chunks=100, gap=0.05)
+    hedge = FakeStream("H", 5.0)
+    stream = hedger.start("a", opener(primary), "b", opener(hedge))
+
+    stream.cancel()
+
+    assert primary.cancelled.is_set() and hedge.cancelled.is_set()
+
+
+def test_retry_notice_runs_in_caller_thread(hedger):
+    threads = []
+
+    def open_primary(on_retry):
+        on_retry(1, 0.5, RuntimeError("429"))
+        return FakeStream("P", 0.0)
+
+    stream = hedger.start("a", open_primary, "b", opener(FakeStream("H", 0.0)),
+                          on_retry=lambda *args: threads.append(threading.current_thread()))
+
+    assert "".join(stream) == "P0 P1 P2 "
+    assert threads == [threading.main_thread()]
+
+
+def test_delay_uses_default_until_enough_samples():
+    hedger = RequestHedger(min_samples=10 ** 6, default_delay=2.5)
+
+    assert hedger.delay() == 2.5
+
+
+def test_losing_request_to_mock_server_frees_its_slot(mock_openai):
+    hedger = RequestHedger(fixed_delay=0.1)
+    messages = [{"role": "user", "content": "안녕"}]
+
+    def open_primary(on_retry):
+        # 업스트림이 늦게 응답하는 경우
+        time.sleep(0.5)
+        return TextStream(create_chat_completion(model="a", messages=messages, stream=True))
+
+    def open_hedge(on_retry):
+        return TextStream(create_chat_completion(model="b", messages=messages, stream=True))
+
+    stream = hedger.start("a", open_primary, "b", open_hedge)
+    text = "".join(stream)
+
+    assert stream.outcome["winner"] == "hedge"
+    assert len(text.split()) == mock_openai.response_tokens
+    assert stream.trace.upstream_time_to_first_token >= mock_openai.latency
+    # 늦게 열린 첫 요청도 바로 닫혀서 슬롯이 모두 돌아옴
+    assert wait_for_free_slots(openai_client.MAX_CONCURRENT_REQUESTS)
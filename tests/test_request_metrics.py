@@ -0,0 +1,113 @@
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from request_metrics import MetricsRegistry, percentile, start_http_server
+
+
+def chunk(text=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def usage(prompt, completion, cached=None):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+def streamed_call(registry, kind="chat", model="m", error=None, retries=0, texts=("안녕", "하세요"),
+                  completed=True):
+    trace = registry.start(kind, model, stream=True, messages=[{"role": "user", "content": "hi"}])
+    for _ in range(retries):
+        trace.retried()
+    trace.acquired(0.25)
+    for text in texts:
+        trace.observe_chunk(chunk(text))
+    trace.observe_chunk(chunk(usage=usage(10, 2, cached=4)))
+    trace.completed = completed and error is None
+    trace.finish(error)
+    return trace
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+    assert percentile([0, 10], 99) == pytest.approx(9.9)
+
+
+def test_records_stream_calls():
+    registry = MetricsRegistry(pid=1)
+
+    trace = streamed_call(registry)
+    trace.finish()  # 두 번째 finish는 무시
+    streamed_call(registry, error=RuntimeError("boom"))
+    # 재시도 끝에 받은 스트림을 첫 토큰 전에 닫음
+    streamed_call(registry, retries=2, texts=(), completed=False)
+
+    summary = registry.summary("chat")
+    assert (summary["calls"], summary["errors"], summary["cancelled"]) == (3, 1, 1)
+    assert summary["retries"] == 2
+    assert summary["prompt_tokens"] == 30 and summary["cached_prompt_tokens"] == 12
+    assert summary["queue_wait"]["p50"] == 0.25
+    assert summary["response_bytes"] == 2 * len("안녕하세요".encode("utf-8"))
+    assert trace.upstream_time_to_first_token is not None
+    assert trace.upstream_time_to_first_token <= registry.values("time_to_first_token")[0]
+    assert registry.upstream_requests() == registry.upstream_requests("chat") == 5
+    assert registry.summary("vision")["calls"] == 0
+
+
+def test_estimates_tokens_without_usage():
+    registry = MetricsRegistry(pid=1)
+    trace = registry.start("chat", "m", stream=True, messages=[{"role": "user", "content": "hello world"}])
+    trace.observe_chunk(chunk("a"))
+    trace.observe_chunk(chunk("b"))
+    trace.completed = True
+    trace.finish()
+
+    call = registry.recent[-1]
+    assert call["completion_tokens"] == 2
+    assert call["prompt_tokens"] > 0
+    # 슬롯을 얻은 기록이 없으면 서버 첫 토큰 시간은 알 수 없음
+    assert trace.upstream_time_to_first_token is None
+
+
+def test_renders_prometheus_text_with_pid_label():
+    registry = MetricsRegistry(pid=4242)
+    streamed_call(registry, model="gpt-4")
+    streamed_call(registry, kind="summary", error=ValueError("x"))
+
+    text = registry.render_prometheus()
+
+    lines = text.splitlines()
+    assert 'openai_requests_total{pid="4242",kind="chat",model="gpt-4",status="ok"} 1' in lines
+    assert 'openai_requests_total{pid="4242",kind="summary",model="m",status="error"} 1' in lines
+    assert 'openai_cached_prompt_tokens_total{pid="4242",kind="chat"} 4' in lines
+    assert 'openai_queue_wait_seconds_bucket{pid="4242",kind="chat",le="0.25"} 1' in lines
+    assert 'openai_queue_wait_seconds_bucket{pid="4242",kind="chat",le="0.1"} 0' in lines
+    assert 'openai_queue_wait_seconds_bucket{pid="4242",kind="chat",le="+Inf"} 1' in lines
+    assert 'openai_queue_wait_seconds_count{pid="4242",kind="chat"} 1' in lines
+    assert "# TYPE openai_request_seconds histogram" in lines
+    # 값이 있는 모든 시계열에 pid 라벨이 붙음
+    assert all('pid="4242"' in line for line in lines if not line.startswith("#"))
+
+
+def test_writes_the_textfile_and_serves_http(tmp_path):
+    path = tmp_path / "metrics" / "openai.prom"
+    registry = MetricsRegistry(str(path), write_interval=0, pid=1)
+
+    streamed_call(registry)
+
+    assert path.read_text(encoding="utf-8") == registry.render_prometheus()
+    registry.remove_file()
+    assert not path.exists()
+
+    server = start_http_server(registry, 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode("utf-8") == registry.render_prometheus()
+    finally:
+        server.shutdown()
@@ -0,0 +1,74 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, replay_response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def test_key_depends_on_request():
+    messages = [{"role": "user", "content": "안녕", "token_count": 5}]
+    key = ResponseCache.make_key("m", 0, None, messages)
+
+    # 메시지의 부가 정보는 키에 영향을 주지 않음
+    assert key == ResponseCache.make_key("m", 0.0, None, [{"role": "user", "content": "안녕"}])
+    assert key != ResponseCache.make_key("other", 0, None, messages)
+    assert key != ResponseCache.make_key("m", 0.5, None, messages)
+    assert key != ResponseCache.make_key("m", 0, "시스템", messages)
+
+
+def test_only_deterministic_requests_are_cacheable(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+    assert cache.is_cacheable(0)
+    assert not cache.is_cacheable(0.7)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.put("a", "응답")
+
+    clock.now += 59
+    assert cache.get("a") == "응답"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("a", "A")
+    clock.now += 1
+    cache.put("b", "B")
+    clock.now += 1
+    cache.get("a")
+    clock.now += 1
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert len(cache) == 2
+
+
+def test_replay_response_returns_original_text():
+    text = "캐시된 응답을 조각으로 나눠 다시 보냅니다." * 3
+
+    chunks = list(replay_response(text, chunk_size=7))
+
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 7 for chunk in chunks)
@@ -0,0 +1,158 @@
+import sqlite3
+
+import pytest
+
+from session_store import SessionStore, SQLiteSessionStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+
+def add_messages(store, session, count):
+    for index in range(count):
+        store.append_message(session, "user" if index % 2 == 0 else "assistant", f"메시지 {index}")
+
+
+def test_keeps_only_recent_messages_in_memory(path):
+    store = SQLiteSessionStore(path, recent_messages=4)
+    session = store.create_session("시스템")
+
+    add_messages(store, session, 10)
+
+    assert session.message_count == 10
+    assert [m["content"] for m in session.recent] == [f"메시지 {i}" for i in range(6, 10)]
+    assert session.recent_offset == 6
+
+
+def test_pages_are_read_from_disk(path):
+    store = SQLiteSessionStore(path, recent_messages=4)
+    session = store.create_session()
+    add_messages(store, session, 10)
+
+    page = store.load_messages(session.session_id, 2, 5)
+    tail = store.messages_from(session, 3)
+
+    assert [m["content"] for m in page] == ["메시지 2", "메시지 3", "메시지 4"]
+    assert [m["content"] for m in tail] == [f"메시지 {i}" for i in range(3, 10)]
+    assert store.messages_from(session, 8) == session.recent[2:]
+
+
+def test_meta_is_stored_with_message(path):
+    store = SQLiteSessionStore(path)
+    session = store.create_session()
+
+    store.append_message(session, "assistant", "답", meta={"model": "m"})
+
+    assert store.load_messages(session.session_id, 0) == [
+        {"role": "assistant", "content": "답", "meta": {"model": "m"}}
+    ]
+
+
+def test_reloads_when_another_process_changes_session(path):
+    first = SQLiteSessionStore(path)
+    second = SQLiteSessionStore(path)
+    session = first.create_session()
+    add_messages(first, session, 2)
+
+    other = second.get_session(session.session_id)
+    second.append_message(other, "user", "다른 프로세스")
+    second.update_session(other, state={"summary": "요약"})
+
+    reloaded = first.get_session(session.session_id)
+    assert reloaded.version == other.version
+    assert reloaded.message_count == 3
+    assert reloaded.recent[-1]["content"] == "다른 프로세스"
+    assert reloaded.state == {"summary": "요약"}
+
+
+def test_unchanged_session_is_served_from_memory(path):
+    store = SQLiteSessionStore(path)
+    session = store.create_session()
+    add_messages(store, session, 2)
+
+    assert store.get_session(session.session_id) is session
+    assert store.hits == 1
+
+
+def test_concurrent_appends_keep_sequence(path):
+    first = SQLiteSessionStore(path)
+    second = SQLiteSessionStore(path)
+    session = first.create_session()
+    other = second.get_session(session.session_id)
+
+    first.append_message(session, "user", "하나")
+    second.append_message(other, "user", "둘")
+
+    assert [m["content"] for m in first.load_messages(session.session_id, 0)] == ["하나", "둘"]
+    # 번호가 어긋난 세션은 메모리에서 빠지고 다음에 다시 읽음
+    assert second.get_session(session.session_id) is not other
+    assert first.get_session(session.session_id).message_count == 2
+
+
+def test_lists_only_sessions_of_the_same_owner(path):
+    store = SQLiteSessionStore(path)
+    mine = store.create_session(owner="me")
+    theirs = store.create_session(owner="other")
+    empty = store.create_session(owner="me")
+    add_messages(store, mine, 2)
+    add_messages(store, theirs, 2)
+
+    assert [row[0] for row in store.list_sessions("me")] == [mine.session_id]
+    assert [row[0] for row in store.list_sessions("other")] == [theirs.session_id]
+    assert store.list_sessions(None) == []
+    assert empty.session_id not in [row[0] for row in store.list_sessions("me")]
+
+
+def test_adds_owner_column_to_old_store(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sessions (session_id TEXT PRIMARY KEY, system_prompt TEXT, state TEXT, "
+        "message_count INTEGER NOT NULL DEFAULT 0, version INTEGER NOT NULL DEFAULT 0, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO sessions VALUES ('old', NULL, '{}', 2, 2, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteSessionStore(path)
+    session = store.create_session(owner="me")
+    add_messages(store, session, 1)
+
+    assert [row[0] for row in store.list_sessions("me")] == [session.session_id]
+    assert store.get_session("old").message_count == 2
+
+
+def test_evicts_least_recently_used_sessions(path):
+    store = SQLiteSessionStore(path, max_sessions=2)
+    first = store.create_session()
+    second = store.create_session()
+    store.get_session(first.session_id)
+    store.create_session()
+
+    assert store.cached_sessions() == 2
+    assert store.evictions == 1
+    # 내려간 세션도 저장소에서 다시 읽을 수 있음
+    assert store.get_session(second.session_id) is not second
+    assert store.get_session(second.session_id).session_id == second.session_id
+
+
+def test_delete_session(path):
+    store = SQLiteSessionStore(path)
+    session = store.create_session()
+    add_messages(store, session, 2)
+
+    store.delete_session(session.session_id)
+
+    assert store.get_session(session.session_id) is None
+    assert store.load_messages(session.session_id, 0) == []
+
+
+def test_store_backends_must_implement_storage_methods():
+    class Incomplete(SessionStore):
+        def _create(self, session_id, system_prompt, owner):
+            pass
+
+    with pytest.raises(TypeError, match="_load_range"):
+        Incomplete()
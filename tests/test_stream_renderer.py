@@ -0,0 +1,84 @@
+import stream_renderer
+from stream_renderer import StreamRenderer, CURSOR
+
+
+class RecordingPlaceholder:
+    def __init__(self):
+        self.painted = []
+
+    def markdown(self, text):
+        self.painted.append(text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repaints_only_after_the_interval(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stream_renderer.time, "perf_counter", clock)
+    placeholder = RecordingPlaceholder()
+    renderer = StreamRenderer(placeholder, repaint_interval=0.1, repaint_chars=1000)
+
+    renderer.write("가")  # 첫 조각은 바로 그림
+    for delta in "나다라":
+        clock.now += 0.01
+        renderer.write(delta)
+    clock.now += 0.1
+    renderer.write("마")
+
+    assert placeholder.painted == ["가" + CURSOR, "가나다라마" + CURSOR]
+    assert renderer.chunks == 5
+
+
+def test_repaints_when_enough_text_is_pending(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stream_renderer.time, "perf_counter", clock)
+    placeholder = RecordingPlaceholder()
+    renderer = StreamRenderer(placeholder, repaint_interval=60, repaint_chars=10)
+
+    renderer.write("a")
+    renderer.write("b" * 5)
+    renderer.write("c" * 5)
+
+    assert placeholder.painted == ["a" + CURSOR, "a" + "b" * 5 + "c" * 5 + CURSOR]
+
+
+def test_final_flush_paints_everything_without_cursor(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stream_renderer.time, "perf_counter", clock)
+    placeholder = RecordingPlaceholder()
+    renderer = StreamRenderer(placeholder, repaint_interval=60, repaint_chars=1000)
+
+    def stream():
+        clock.now += 0.5
+        yield "안녕"
+        yield ""
+        yield "하세요"
+        clock.now += 1.0
+
+    text = renderer.render(stream())
+
+    assert text == "안녕하세요"
+    assert placeholder.painted == ["안녕" + CURSOR, "안녕하세요"]
+    stats = renderer.stats()
+    assert stats["time_to_first_token"] == 0.5
+    assert stats["total_seconds"] == 1.5
+    assert (stats["chunks"], stats["repaints"]) == (2, 2)
+    assert stats["tokens_per_sec"] == stats["completion_tokens"] / 1.0
+
+
+def test_collects_without_placeholder():
+    renderer = StreamRenderer(None)
+
+    assert renderer.render(["a", "b"]) == "ab"
+    assert renderer.stats()["time_to_first_token"] is not None
+
+    empty = StreamRenderer(None)
+    assert empty.render([]) == ""
+    assert empty.stats()["time_to_first_token"] is None
+    assert empty.stats()["tokens_per_sec"] is None
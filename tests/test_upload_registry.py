@@ -0,0 +1,58 @@
+from upload_registry import UploadRegistry, content_hash
+
+
+def counting_processor(calls):
+    def process(data):
+        calls.append(data)
+        return data.decode().upper()
+    return process
+
+
+def test_same_content_is_processed_once():
+    calls = []
+    registry = UploadRegistry()
+    process = counting_processor(calls)
+
+    key, result = registry.register(b"report", process)
+    again_key, again = registry.register(b"report", process)
+
+    assert key == again_key == content_hash(b"report")
+    assert result == again == "REPORT"
+    assert calls == [b"report"]
+    assert (registry.processed_count, registry.reused_count) == (1, 1)
+    assert registry.get(key) == "REPORT"
+
+
+def test_evicts_least_recently_used_entries():
+    calls = []
+    registry = UploadRegistry(max_entries=2)
+    process = counting_processor(calls)
+
+    a, _ = registry.register(b"a", process)
+    b, _ = registry.register(b"b", process)
+    registry.register(b"a", process)  # a를 최근 사용으로 옮김
+    registry.register(b"c", process)
+
+    assert len(registry) == 2
+    assert registry.get(b) is None
+    assert registry.get(a) == "A"
+
+    # 밀려난 내용은 다시 처리함
+    registry.register(b"b", process)
+    assert calls == [b"a", b"b", b"c", b"b"]
+    assert registry.get(a) is None
+
+
+def test_insert_is_claimed_once_even_after_eviction():
+    registry = UploadRegistry(max_entries=1)
+    key, _ = registry.register(b"a", bytes.upper)
+
+    assert registry.claim_insert(key) is True
+    assert registry.claim_insert(key) is False
+
+    registry.register(b"b", bytes.upper)
+    assert registry.get(key) is None
+    assert registry.claim_insert(key) is False
+
+    registry.reset_inserted()
+    assert registry.claim_insert(key) is True
@@ -0,0 +1,58 @@
+"""
+업로드된 파일을 내용 해시 기준으로 한 번만 처리하도록 관리하는 모듈
+"""
+
+import hashlib
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 20
+
+
+def content_hash(data):
+    """파일 내용의 SHA-256 해시를 반환합니다."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadRegistry:
+    """파일 해시별 처리 결과를 보관하고, 대화에 한 번만 들어가도록 표시합니다."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inserted = set()
+        self.processed_count = 0
+        self.reused_count = 0
+
+    def register(self, data, process):
+        """처음 보는 내용이면 process(data)로 처리해 저장하고 (해시, 결과)를 반환합니다."""
+        key = content_hash(data)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.reused_count += 1
+            return key, self._entries[key]
+
+        result = process(data)
+        self._entries[key] = result
+        self.processed_count += 1
+        while len(self._entries) > self.max_entries:
+            # 삽입 표시는 남겨 두어 같은 파일이 다시 대화에 들어가지 않도록 함
+            self._entries.popitem(last=False)
+        return key, result
+
+    def get(self, key):
+        """저장된 처리 결과를 반환합니다."""
+        return self._entries.get(key)
+
+    def claim_insert(self, key):
+        """아직 대화에 넣지 않은 업로드면 넣은 것으로 표시하고 True를 반환합니다."""
+        if key in self._inserted:
+            return False
+        self._inserted.add(key)
+        return True
+
+    def reset_inserted(self):
+        """대화가 초기화되었을 때 삽입 표시를 지웁니다."""
+        self._inserted.clear()
+
+    def __len__(self):
+        return len(self._entries)